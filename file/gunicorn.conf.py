@@ -0,0 +1,68 @@
+"""Gunicorn settings for the arcade.
+
+    gunicorn -c gunicorn.conf.py src.wsgi:app
+
+The app is preloaded in the master, caches are warmed and the heap is moved
+to the permanent GC generation before forking, so workers share those pages
+copy-on-write instead of each holding a private copy.
+
+In-progress games (src/game_store.py) and snake arenas live in the
+worker's memory, so the default is one worker with GUNICORN_THREADS
+request threads. More workers (GUNICORN_WORKERS) need sticky routing in
+front of gunicorn, e.g. by the session cookie, so every request of a
+player reaches the worker holding their games; otherwise a game started
+on one worker is "not found" on another. Stateless number-guess and
+tic-tac-toe games (src/game_tokens.py) work on any worker.
+"""
+import gc
+import os
+import uuid
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1').lower() in ('1', 'true', 'yes', 'on')
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+# Shared by the master and every worker it forks (preloaded or not): game
+# snapshots (src/game_snapshot.py) are named by it, so the next run claims
+# all of this run's files whatever their pids
+os.environ.setdefault('GAME_SNAPSHOT_BOOT_ID', uuid.uuid4().hex[:12])
+
+if preload_app:
+    # Collections in the master would touch every object header and
+    # un-share the pages; gc is re-enabled in each worker after fork
+    gc.disable()
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from src import wsgi
+    wsgi.warm_caches(wsgi.app)
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from src import wsgi
+    snapshots = wsgi.app.extensions.get('game_snapshots')
+    if snapshots is not None:
+        # Pick up games saved by the worker this one replaces
+        snapshots.load()
+    if not preload_app:
+        return
+    wsgi.reset_after_fork(wsgi.app)
+    gc.enable()
+
+
+def worker_exit(server, worker):
+    # Runs in the worker after it stops accepting requests (SIGTERM, recycle)
+    from src import wsgi
+    snapshots = wsgi.app.extensions.get('game_snapshots')
+    if snapshots is not None:
+        snapshots.save()
@@ -0,0 +1,258 @@
+"""Admin analytics over game_score.
+
+Every report exists twice with identical output: as SQL aggregates, and as
+vectorized group-bys over the columnar cache in src/score_columns.py
+(``columns`` is the dict of arrays from ``ScoreColumns.snapshot()``).
+``run`` picks the cache when there is one. Days are UTC calendar days and
+time windows end at ``now``.
+
+With game_score sharded (src/score_shards.py) the SQL versions run on
+every score database and merge: per-game reports are disjoint, distinct
+players and per-player totals are combined here.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, distinct, func
+from src import score_shards
+from src.models.user import GameScore, db
+from src.score_stats import DEFAULT_DIFFICULTY
+from src.scores import player_names
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DAY = 86400
+
+# Largest (groups x player ids) bitmap for counting distinct players, in
+# bytes; past this a sort (np.unique) is used instead
+PRESENCE_LIMIT = 64 * 2 ** 20
+
+
+def epoch(moment):
+    return int((moment - datetime(1970, 1, 1)).total_seconds())
+
+
+def epoch_day(day):
+    """ISO date of day number ``day`` since the epoch"""
+    return (date(1970, 1, 1) + timedelta(days=int(day))).isoformat()
+
+
+def average(total, count):
+    return round(float(total) / count, 2) if count else 0.0
+
+
+def distinct_players(group, player, groups):
+    """Number of distinct players in each of ``groups`` group codes"""
+    group = group.astype(np.int64)
+    span = int(player.max()) + 1 if len(player) else 1
+    if groups * span <= PRESENCE_LIMIT:
+        seen = np.zeros(groups * span, bool)
+        seen[group * span + player] = True
+        return seen.reshape(groups, span).sum(axis=1)
+    pairs = np.unique((group << 32) | player)
+    return np.bincount(pairs >> 32, minlength=groups)
+
+
+# Per game type: games played, distinct players, total and average points
+
+def games_sql(now):
+    query = db.select(
+        GameScore.game_type, func.count(), func.count(distinct(GameScore.player_id)),
+        func.coalesce(func.sum(GameScore.points), 0)
+    ).group_by(GameScore.game_type)
+    return {game_type: {'games': games, 'players': players, 'total_points': int(total),
+                        'avg_points': average(total, games)}
+            for _, rows in score_shards.fan_out(query)
+            for game_type, games, players, total in rows}
+
+
+def games_columnar(columns, cache, now):
+    game, points = columns['game'], columns['points']
+    kinds = len(cache.game_types)
+    games = np.bincount(game, minlength=kinds)
+    totals = np.bincount(game, weights=points, minlength=kinds)
+    players = distinct_players(game, columns['player_id'], kinds)
+    return {name: {'games': int(games[code]), 'players': int(players[code]),
+                   'total_points': int(totals[code]),
+                   'avg_points': average(totals[code], games[code])}
+            for code, name in enumerate(cache.game_types) if games[code]}
+
+
+# One game's difficulties: all-time averages and a daily trend
+
+def difficulty_sql(now, game_type, days):
+    # Scores recorded without a difficulty count as the default one
+    level = func.coalesce(GameScore.difficulty, DEFAULT_DIFFICULTY)
+    overall = score_shards.execute(db.select(
+        level, func.count(), func.coalesce(func.sum(GameScore.points), 0),
+        func.coalesce(func.sum(GameScore.attempts), 0)
+    ).where(GameScore.game_type == game_type).group_by(level), game_type).all()
+    day = func.date(GameScore.created_at)
+    trend = score_shards.execute(db.select(
+        day, level, func.count(), func.coalesce(func.sum(GameScore.points), 0)
+    ).where(
+        GameScore.game_type == game_type,
+        GameScore.created_at >= now - timedelta(days=days)
+    ).group_by(day, level).order_by(day, level),
+        game_type).all()
+    return {
+        'difficulties': {difficulty: {'games': games, 'avg_points': average(points, games),
+                                      'avg_attempts': average(attempts, games)}
+                         for difficulty, games, points, attempts in overall},
+        'trend': [{'day': str(day), 'difficulty': difficulty, 'games': games,
+                   'avg_points': average(points, games)}
+                  for day, difficulty, games, points in trend]
+    }
+
+
+def difficulty_columnar(columns, cache, now, game_type, days):
+    result = {'difficulties': {}, 'trend': []}
+    if game_type not in cache.game_types:
+        return result
+    mine = columns['game'] == cache.game_types.index(game_type)
+    level = columns['difficulty'][mine]
+    points, created = columns['points'][mine], columns['created'][mine]
+    levels = len(cache.difficulties)
+
+    games = np.bincount(level, minlength=levels)
+    totals = np.bincount(level, weights=points, minlength=levels)
+    attempts = np.bincount(level, weights=columns['attempts'][mine], minlength=levels)
+    result['difficulties'] = {
+        name: {'games': int(games[code]), 'avg_points': average(totals[code], games[code]),
+               'avg_attempts': average(attempts[code], games[code])}
+        for code, name in enumerate(cache.difficulties) if games[code]}
+
+    recent = created >= epoch(now - timedelta(days=days))
+    day = created[recent] // DAY
+    if not len(day):
+        return result
+    first = day.min()
+    # One bin per (day, difficulty)
+    cell = (day - first) * levels + level[recent]
+    size = int((day.max() - first + 1) * levels)
+    cell_games = np.bincount(cell, minlength=size)
+    cell_points = np.bincount(cell, weights=points[recent], minlength=size)
+    by_name = sorted(range(levels), key=lambda code: cache.difficulties[code])
+    for offset in range(size // levels):
+        for code in by_name:
+            index = offset * levels + code
+            if cell_games[index]:
+                result['trend'].append({
+                    'day': epoch_day(first + offset), 'difficulty': cache.difficulties[code],
+                    'games': int(cell_games[index]),
+                    'avg_points': average(cell_points[index], cell_games[index])})
+    return result
+
+
+# Games played and distinct players per day
+
+def daily_sql(now, days):
+    day = func.date(GameScore.created_at)
+    recent = GameScore.created_at >= now - timedelta(days=days)
+    if len(score_shards.databases()) == 1:
+        rows = score_shards.execute(db.select(
+            day, func.count(), func.count(distinct(GameScore.player_id))
+        ).where(recent).group_by(day).order_by(day)).all()
+    else:
+        # A player can play on one day in several databases
+        games, players = defaultdict(int), defaultdict(set)
+        for _, result in score_shards.fan_out(db.select(
+                day, GameScore.player_id, func.count()
+        ).where(recent).group_by(day, GameScore.player_id)):
+            for played_on, player_id, count in result:
+                games[played_on] += count
+                players[played_on].add(player_id)
+        rows = [(played_on, games[played_on], len(players[played_on]))
+                for played_on in sorted(games)]
+    return [{'day': str(day), 'games': games, 'players': players}
+            for day, games, players in rows]
+
+
+def daily_columnar(columns, cache, now, days):
+    recent = columns['created'] >= epoch(now - timedelta(days=days))
+    day = columns['created'][recent] // DAY
+    if not len(day):
+        return []
+    first = day.min()
+    offset = day - first
+    games = np.bincount(offset)
+    players = distinct_players(offset, columns['player_id'][recent], len(games))
+    return [{'day': epoch_day(first + i), 'games': int(games[i]), 'players': int(players[i])}
+            for i in range(len(games)) if games[i]]
+
+
+# Players whose points grew most in the last ``days`` versus the ``days`` before
+
+def movers_sql(now, days, limit, game_type=None):
+    split = now - timedelta(days=days)
+    recent = func.sum(case((GameScore.created_at >= split, GameScore.points), else_=0))
+    previous = func.sum(case((GameScore.created_at < split, GameScore.points), else_=0))
+    query = db.select(GameScore.player_id, recent, previous).where(
+        GameScore.created_at >= now - timedelta(days=2 * days))
+    if game_type:
+        query = query.where(GameScore.game_type == game_type)
+    query = query.group_by(GameScore.player_id)
+    databases = score_shards.databases([game_type] if game_type else None)
+    if len(databases) == 1:
+        rows = score_shards.execute(query.having(recent > previous).order_by(
+            (recent - previous).desc(), GameScore.player_id).limit(limit),
+            database=databases[0]).all()
+    else:
+        # Per-player sums from every database, added up here
+        totals = defaultdict(lambda: [0, 0])
+        for _, result in score_shards.fan_out(query):
+            for player_id, now_points, before in result:
+                totals[player_id][0] += now_points
+                totals[player_id][1] += before
+        rows = sorted(((player_id, now_points, before)
+                       for player_id, (now_points, before) in totals.items()
+                       if now_points > before),
+                      key=lambda row: (row[2] - row[1], row[0]))[:limit]
+    return movers_result([(player_id, int(now_points), int(before))
+                          for player_id, now_points, before in rows])
+
+
+def movers_columnar(columns, cache, now, days, limit, game_type=None):
+    window = columns['created'] >= epoch(now - timedelta(days=2 * days))
+    if game_type:
+        if game_type not in cache.game_types:
+            return []
+        window &= columns['game'] == cache.game_types.index(game_type)
+    player = columns['player_id'][window]
+    points = columns['points'][window].astype(np.int64)
+    is_recent = columns['created'][window] >= epoch(now - timedelta(days=days))
+    recent = np.bincount(player, weights=np.where(is_recent, points, 0))
+    previous = np.bincount(player, weights=np.where(is_recent, 0, points))
+    change = recent - previous
+    gained = np.nonzero(change > 0)[0]
+    # Biggest change first, lower player_id first on ties
+    top = gained[np.lexsort((gained, -change[gained]))[:limit]]
+    return movers_result([(int(player_id), int(recent[player_id]), int(previous[player_id]))
+                          for player_id in top])
+
+
+def movers_result(rows):
+    names = player_names([player_id for player_id, _, _ in rows]) if rows else {}
+    return [{'player_id': player_id, 'player_name': names.get(player_id), 'points': recent,
+             'previous_points': previous, 'change': recent - previous}
+            for player_id, recent, previous in rows]
+
+
+REPORTS = {
+    'games': (games_sql, games_columnar),
+    'difficulty': (difficulty_sql, difficulty_columnar),
+    'daily': (daily_sql, daily_columnar),
+    'movers': (movers_sql, movers_columnar),
+}
+
+
+def run(report, cache=None, now=None, **params):
+    """Run ``report`` on the columnar cache if given, else in SQL"""
+    sql, columnar = REPORTS[report]
+    now = now or datetime.utcnow()
+    if cache is None:
+        return sql(now, **params)
+    return columnar(cache.snapshot(), cache, now, **params)
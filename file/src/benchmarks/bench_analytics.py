@@ -0,0 +1,83 @@
+"""Admin analytics: SQL aggregates versus the NumPy columnar cache.
+
+Run from the ``file`` directory (needs NumPy):
+
+    python -m src.benchmarks.bench_analytics --sizes 1000000,5000000
+
+Each size gets a fresh SQLite database filled by src.tools.seed_scores
+(six months of scores) plus a few scores recorded without a difficulty.
+Reported per size: time to load the cache and its size, then the median
+time of every report in src/analytics.py both ways, after checking that
+the two give the same answer.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPORTS = [
+    ('games', {}),
+    ('difficulty', {'game_type': 'memory', 'days': 30}),
+    ('daily', {'days': 30}),
+    ('movers', {'days': 7, 'limit': 10}),
+]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000000')
+    parser.add_argument('--players-ratio', type=float, default=0.05)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    from src.main import create_app
+    from src.analytics import run
+    from src.score_columns import ScoreColumns
+    from src.scores import record_score
+    from src.tools.seed_scores import seed
+
+    print(f'{"report":12} {"scores":>10} {"sql ms":>9} {"cache ms":>9} {"speedup":>8}')
+    for size in (int(s) for s in args.sizes.split(',')):
+        workdir = tempfile.mkdtemp(prefix='arcade-bench-')
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "bench.db")}',
+            'AUTO_CREATE_TABLES': True})
+        seed(app, max(10, int(size * args.players_ratio)), size, random_seed=args.seed)
+        with app.app_context():
+            # As /api/scores/add stores {"difficulty": null}
+            for points in (5, 50):
+                record_score(1, 'memory', points, 10, None)
+
+        cache = ScoreColumns(app, refresh=float('inf'))
+        started = time.perf_counter()
+        cache.warm()
+        megabytes = sum(array.nbytes for array in cache.snapshot().values()) / 2 ** 20
+        print(f'# {size:,} scores: cache loaded in {time.perf_counter() - started:.1f}s, '
+              f'{megabytes:.0f} MB', file=sys.stderr)
+
+        now = datetime.utcnow()
+        with app.app_context():
+            for name, params in REPORTS:
+                sql_ms, expected = timed(lambda: run(name, None, now, **params), args.repeat)
+                cache_ms, actual = timed(lambda: run(name, cache, now, **params), args.repeat)
+                if actual != expected:
+                    print(f'# {name}: cache and SQL disagree', file=sys.stderr)
+                print(f'{name:12} {size:>10,} {sql_ms:>9.1f} {cache_ms:>9.1f} '
+                      f'{sql_ms / cache_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""How many snake arenas one core can tick at a fixed rate.
+
+Run from the ``file`` directory:
+
+    python -m src.benchmarks.bench_arenas --arenas 50,200,800 --snakes 16
+
+Each arena is filled with bot snakes that turn at random and rejoin when
+they die, then a single ArenaScheduler ticks all arenas for ``--duration``
+seconds. Reported per run: tick budget usage (share of one core spent
+ticking), mean and worst tick time, skipped ticks and the resulting
+estimate of arenas per core at this tick rate.
+"""
+import argparse
+import random
+import threading
+import time
+
+
+def run_bots(manager, arenas, stop, rng):
+    """Steer the bots like clients would, a few turns per tick interval"""
+    while not stop.is_set():
+        for arena in arenas:
+            with arena.lock:
+                for snake in list(arena.snakes.values()):
+                    if not snake.alive:
+                        arena.leave(snake.player_id)
+                        arena.join('bot')
+                    elif rng.random() < 0.2:
+                        snake.requested = rng.choice(['up', 'down', 'left', 'right'])
+        time.sleep(manager.scheduler.tick_interval)
+
+
+def run(count, args):
+    from src.snake_arena import ArenaManager
+
+    manager = ArenaManager(args.tick_ms / 1000, args.grid, args.snakes)
+    arenas = []
+    for _ in range(count):
+        arena, _ = manager.join('bot')
+        with arena.lock:
+            while arena.join('bot') is not None:
+                pass
+        arenas.append(arena)
+    # Bots never poll, so never count them as idle
+    for arena in arenas:
+        arena.idle_timeout = float('inf')
+
+    stop = threading.Event()
+    bots = threading.Thread(target=run_bots, args=(manager, arenas, stop, random.Random(1)),
+                            daemon=True)
+    bots.start()
+    time.sleep(args.duration)
+    stop.set()
+    return manager.scheduler.stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--arenas', default='50,200,800')
+    parser.add_argument('--snakes', type=int, default=16, help='snakes per arena')
+    parser.add_argument('--grid', type=int, default=48)
+    parser.add_argument('--tick-ms', type=float, default=150)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    print(f'{"arenas":>7} {"budget":>7} {"avg tick us":>12} {"max tick us":>12} '
+          f'{"skipped":>8} {"arenas/core":>12}')
+    for count in (int(c) for c in args.arenas.split(',')):
+        stats = run(count, args)
+        per_core = stats['arenas_per_core']
+        print(f'{count:>7} {stats["budget_usage"]:>7.1%} {stats["avg_tick_us"]:>12.0f} '
+              f'{stats["max_tick_us"]:>12.0f} {stats["skipped_ticks"]:>8} '
+              f'{per_core if per_core is None else round(per_core):>12}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Modeled time-to-interactive of the home page: old request chain vs
+/api/bootstrap vs state inlined into index.html.
+
+Run from the ``file`` directory:
+
+    python -m src.benchmarks.bench_bootstrap --rtt 50
+
+Each page load is a list of rounds; requests inside a round go out in
+parallel, a round starts once the previous one has answered. Server time
+per request is measured through the Flask test client against a seeded
+SQLite database with a logged-in player, and every round adds ``--rtt``
+milliseconds of network latency:
+
+    before     GET /  ->  script.js, styles.css  ->  /api/leaderboard,
+               /api/players/current  ->  /api/leaderboard (best scores)
+    bootstrap  GET /  ->  script.js, styles.css  ->  /api/bootstrap
+    inline     GET / (state embedded)  ->  script.js, styles.css
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+PLANS = {
+    'before': [['/'], ['/script.js', '/styles.css'],
+               ['/api/leaderboard', '/api/players/current'], ['/api/leaderboard']],
+    'bootstrap': [['/'], ['/script.js', '/styles.css'], ['/api/bootstrap']],
+    'inline': [['/'], ['/script.js', '/styles.css']],
+}
+
+
+def timed_get(client, path):
+    started = time.perf_counter()
+    response = client.get(path)
+    response.get_data()
+    assert response.status_code == 200, (path, response.status_code)
+    return (time.perf_counter() - started) * 1000
+
+
+def page_load(client, plan, rtt):
+    total = 0.0
+    for round_paths in plan:
+        total += rtt + max(timed_get(client, path) for path in round_paths)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rtt', type=float, default=50.0, help='round trip time in ms')
+    parser.add_argument('--loads', type=int, default=50)
+    parser.add_argument('--players', type=int, default=2000)
+    parser.add_argument('--scores', type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    from src.main import create_app
+    from src.tools.seed_scores import seed
+
+    path = os.path.join(tempfile.mkdtemp(prefix='arcade-bench-'), 'bench.db')
+    apps = {}
+    for name in PLANS:
+        apps[name] = create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+            'BOOTSTRAP_INLINE': name == 'inline',
+        })
+    seed(apps['before'], args.players, args.scores, random_seed=7)
+
+    print(f'{"mode":10} {"rounds":>6} {"server ms":>10} {"TTI p50 ms":>11} {"TTI p95 ms":>11}')
+    for name, plan in PLANS.items():
+        client = apps[name].test_client()
+        with client.session_transaction() as sess:
+            sess['player_id'] = 1
+        page_load(client, plan, 0)  # warm up
+        server = [page_load(client, plan, 0) for _ in range(args.loads)]
+        tti = sorted(s + args.rtt * len(plan) for s in server)
+        print(f'{name:10} {len(plan):>6} {statistics.median(server):>10.2f} '
+              f'{statistics.median(tti):>11.1f} {tti[int(len(tti) * 0.95) - 1]:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""How stale other workers' caches get, polling versus the cache bus
+(src/cache_bus.py).
+
+Run from the ``file`` directory:
+
+    python -m src.benchmarks.bench_cache_bus --players 20 --refresh 2
+
+One process registers ``--players`` players through /api/players/register,
+``--gap`` seconds apart, while another (a second worker) keeps asking its
+player name index for each new name. Reported per mode: how long after the
+registration the name showed up in the second worker, and how many
+database queries the second worker ran per second of lookups.
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+
+def register(config, players, gap, registered):
+    from src.main import create_app
+
+    client = create_app(config).test_client()
+    for i in range(players):
+        time.sleep(gap)
+        client.post('/api/players/register', json={'name': f'racer{i:04d}', 'password': 'x'})
+        registered.put((i, time.time()))
+
+
+def run(bus, args):
+    from sqlalchemy import event
+    from src.main import create_app
+    from src.models.user import db
+
+    workdir = tempfile.mkdtemp(prefix='arcade-bench-')
+    config = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "bench.db")}',
+        'AUTO_CREATE_TABLES': True,
+        'CACHE_BUS': bus,
+        'CACHE_BUS_PATH': os.path.join(workdir, 'cache-bus'),
+        'PLAYER_INDEX_REFRESH': args.refresh,
+    }
+    app = create_app(config)
+    index = app.extensions['player_index']
+    queries = [0]
+    with app.app_context():
+        index.sync(force=True)
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda *_: queries.__setitem__(0, queries[0] + 1))
+
+    registered = multiprocessing.Queue()
+    writer = multiprocessing.Process(target=register, args=(
+        config, args.players, args.gap, registered))
+    started = time.perf_counter()
+    writer.start()
+    lags = []
+    with app.app_context():
+        for _ in range(args.players):
+            i, at = registered.get()
+            # Lookups as requests would make them, until the name is known
+            while index.available(f'racer{i:04d}'):
+                time.sleep(0.001)
+            lags.append((time.time() - at) * 1000)
+    writer.join()
+    elapsed = time.perf_counter() - started
+    print(f'{"bus" if bus else "polling":8} {statistics.median(lags):>10.1f} {max(lags):>10.1f} '
+          f'{queries[0] / elapsed:>10.1f}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=20)
+    parser.add_argument('--gap', type=float, default=0.25)
+    parser.add_argument('--refresh', type=float, default=2.0,
+                        help='PLAYER_INDEX_REFRESH for the polling run')
+    args = parser.parse_args(argv)
+
+    print(f'{"mode":8} {"p50 ms":>10} {"max ms":>10} {"queries/s":>10}')
+    for bus in (False, True):
+        run(bus, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Byte and CPU trade-off of gzip for each dynamic JSON endpoint.
+
+Run from the ``file`` directory:
+
+    python -m src.benchmarks.bench_compression --scores 100000
+
+For every endpoint the raw body is compressed at several levels and the
+output size and compression time per response are reported next to the
+response time with compression disabled.
+"""
+import argparse
+import gzip
+import os
+import tempfile
+import time
+
+LEVELS = (1, 6, 9)
+
+
+def measure(client, method, url, json=None, repeat=20):
+    """Return (raw_body, median request ms) with compression disabled"""
+    samples = []
+    body = b''
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.open(url, method=method, json=json,
+                               headers={'Accept-Encoding': 'identity'})
+        samples.append((time.perf_counter() - started) * 1000)
+        body = response.get_data()
+    samples.sort()
+    return body, samples[len(samples) // 2]
+
+
+def gzip_cost(body, level, repeat=200):
+    """Return (compressed size, microseconds per compression)"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        compressed = gzip.compress(body, compresslevel=level, mtime=0)
+    return len(compressed), (time.perf_counter() - started) / repeat * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scores', type=int, default=100000)
+    parser.add_argument('--players', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='arcade-bench-')
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(workdir, "bench.db")}'
+
+    from src.main import create_app
+    from src.models.user import db, User
+    from src.tools.seed_scores import seed
+
+    app = create_app({'AUTO_CREATE_TABLES': True})
+
+    seed(app, args.players, args.scores, random_seed=1)
+    with app.app_context():
+        db.session.execute(db.insert(User.__table__), [
+            {'username': f'user{i}', 'email': f'user{i}@example.com'}
+            for i in range(args.users)
+        ])
+        db.session.commit()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['player_id'] = 1
+
+    game = client.post('/api/games/memory/start', json={'difficulty': 'hard'}).get_json()
+    # Flip a card so the board response carries the full revealed list
+    client.post('/api/games/memory/flip', json={'game_id': game['game_id'], 'card_index': 0})
+    snake = client.post('/api/games/snake/start', json={}).get_json()
+
+    cases = [
+        ('GET /api/users', 'GET', '/api/users', None),
+        ('GET /api/leaderboard', 'GET', '/api/leaderboard', None),
+        ('GET /api/leaderboard/snake', 'GET', '/api/leaderboard/snake', None),
+        ('GET /api/players/best-scores', 'GET', '/api/players/best-scores', None),
+        ('POST memory/hide-cards (hard)', 'POST', '/api/games/memory/hide-cards',
+         {'game_id': game['game_id']}),
+        ('POST snake/move (per tick)', 'POST', '/api/games/snake/move',
+         {'game_id': snake['game_id'], 'direction': 'down'}),
+    ]
+
+    min_size = app.config['COMPRESS_MIN_SIZE']
+    header = f'{"endpoint":30} {"raw B":>9} {"req ms":>8}'
+    for level in LEVELS:
+        header += f' {"gz" + str(level) + " B":>9} {"us":>7}'
+    print(header + '  compressed?')
+    for label, method, url, body in cases:
+        raw, request_ms = measure(client, method, url, body,
+                                  1 if 'snake' in url else args.repeat)
+        line = f'{label:30} {len(raw):>9,} {request_ms:>8.2f}'
+        for level in LEVELS:
+            size, micros = gzip_cost(raw, level)
+            line += f' {size:>9,} {micros:>7.1f}'
+        view = app.view_functions.get(app.url_map.bind('').match(url, method)[0])
+        compressed = len(raw) >= min_size and not getattr(view, 'skip_compression', False)
+        print(line + f'  {"yes" if compressed else "no"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Concurrent leaderboard reads against score writes, default vs tuned engine.
+
+Run from the ``file`` directory:
+
+    python -m src.benchmarks.bench_db_concurrency --readers 8 --writers 2
+
+Each mode gets its own SQLite file (WAL is persistent per file). Readers
+hit /api/leaderboard/<game>, writers play Rock Paper Scissors rounds (each
+one records a score server-side), all through the Flask test client in
+separate threads.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+GAMES = ['number_guess', 'rps', 'tictactoe', 'memory', 'snake']
+
+
+def worker(app, kind, player_id, stop, results):
+    client = app.test_client()
+    if kind == 'write':
+        with client.session_transaction() as sess:
+            sess['player_id'] = player_id
+    latencies = []
+    errors = 0
+    rng = random.Random(player_id)
+    while not stop.is_set():
+        game = rng.choice(GAMES)
+        started = time.perf_counter()
+        if kind == 'read':
+            response = client.get(f'/api/leaderboard/{game}')
+        else:
+            response = client.post('/api/games/rps/play', json={
+                'choice': rng.choice(['rock', 'paper', 'scissors'])})
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            errors += 1
+    results.append((kind, latencies, errors))
+
+
+def run(tuned, args):
+    from src.main import create_app
+    from src.tools.seed_scores import seed
+
+    workdir = tempfile.mkdtemp(prefix='arcade-bench-')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "bench.db")}',
+        'DB_ENGINE_TUNING': tuned,
+        'AUTO_CREATE_TABLES': True,
+    })
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    seed(app, args.players, args.scores, random_seed=7)
+
+    stop = threading.Event()
+    results = []
+    threads = [threading.Thread(target=worker, args=(app, 'read', i + 1, stop, results))
+               for i in range(args.readers)]
+    threads += [threading.Thread(target=worker, args=(app, 'write', i + 1, stop, results))
+                for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    for kind in ('read', 'write'):
+        latencies = sorted(l for k, ls, _ in results if k == kind for l in ls)
+        errors = sum(e for k, _, e in results if k == kind)
+        if not latencies:
+            continue
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f'{"tuned" if tuned else "default":8} {kind:6} {len(latencies) / args.duration:>9.0f} '
+              f'{statistics.median(latencies):>9.2f} {p99:>9.2f} {errors:>7}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--players', type=int, default=2000)
+    parser.add_argument('--scores', type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    print(f'{"engine":8} {"kind":6} {"req/s":>9} {"p50 ms":>9} {"p99 ms":>9} {"errors":>7}')
+    for tuned in (False, True):
+        run(tuned, args)
+
+
+if __name__ == '__main__':
+    main()
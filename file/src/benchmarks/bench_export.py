@@ -0,0 +1,73 @@
+"""Streaming exports: throughput and peak memory versus export size.
+
+Run from the ``file`` directory:
+
+    python -m src.benchmarks.bench_export --sizes 10000,1000000
+
+Each size gets a fresh SQLite database filled by src.tools.seed_scores.
+The scores export is then read through the test client one chunk at a
+time, as a WSGI server would send it, in each format, with and without
+gzip. Reported: rows per second, body size, and the peak Python heap
+allocated while streaming (tracemalloc), which should not grow with the
+number of rows.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def stream_export(client, path, headers):
+    """Read a streamed response piece by piece; (bytes, pieces)"""
+    response = client.get(path, headers=headers, buffered=False)
+    if response.status_code != 200:
+        raise SystemExit(f'{path}: HTTP {response.status_code}')
+    size = pieces = 0
+    for piece in response.response:
+        size += len(piece)
+        pieces += 1
+    response.close()
+    return size, pieces
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10000,1000000')
+    parser.add_argument('--players-ratio', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    from src.main import create_app
+    from src.tools.seed_scores import seed
+
+    token = 'bench'
+    print(f'{"format":8} {"gzip":>4} {"rows":>10} {"rows/s":>10} {"MB":>8} {"peak heap KB":>13}')
+    for size in (int(s) for s in args.sizes.split(',')):
+        workdir = tempfile.mkdtemp(prefix='arcade-bench-')
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "bench.db")}',
+            'AUTO_CREATE_TABLES': True,
+            'ADMIN_TOKEN': token})
+        seed(app, max(10, int(size * args.players_ratio)), size, random_seed=args.seed)
+        print(f'# {size:,} scores seeded', file=sys.stderr)
+        client = app.test_client()
+
+        for fmt in ('ndjson', 'csv'):
+            for gzip in (False, True):
+                headers = {'X-Admin-Token': token}
+                if gzip:
+                    headers['Accept-Encoding'] = 'gzip'
+                tracemalloc.start()
+                started = time.perf_counter()
+                body, _ = stream_export(client, f'/api/admin/export/scores?format={fmt}', headers)
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f'{fmt:8} {"yes" if gzip else "no":>4} {size:>10,} {size / elapsed:>10,.0f} '
+                      f'{body / 2 ** 20:>8.1f} {peak / 1024:>13,.0f}')
+
+
+if __name__ == '__main__':
+    main()
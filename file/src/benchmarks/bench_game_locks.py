@@ -0,0 +1,136 @@
+"""Multi-threaded stress test and throughput benchmark for the game store.
+
+Run from the ``file`` directory:
+
+    python -m src.benchmarks.bench_game_locks --threads 1,4,16
+
+All threads hammer the *same* few memory and snake games with overlapping
+flips and ticks (like double clicks or overlapping timers). After each run
+the game invariants are checked and the exit status is non-zero if any is
+violated. ``--unlocked`` replaces the striped locks with no-ops for
+comparison; races then depend on thread switches landing mid-update, so
+they show up intermittently. Throughput is reported in requests per second.
+"""
+import argparse
+import contextlib
+import random
+import sys
+import threading
+import time
+
+SHARED_GAMES = 4
+
+
+def check_memory(game):
+    problems = []
+    matched = bin(game['matched']).count('1')
+    if matched != game['matches'] * 2:
+        problems.append(f'matched cards {matched} != 2 * matches {game["matches"]}')
+    if game['moves'] < game['matches']:
+        problems.append('fewer moves than matches')
+    if game['matched'] & ~game['revealed']:
+        problems.append('matched cards hidden')
+    values = [game['cards'][i] for i in range(len(game['cards'])) if game['matched'] >> i & 1]
+    if any(values.count(value) != 2 for value in values):
+        problems.append('matched cards do not form pairs')
+    return problems
+
+
+def check_snake(game):
+    problems = []
+    body = [tuple(segment) for segment in game['snake']]
+    if len(set(body)) != len(body):
+        problems.append('snake overlaps itself')
+    if len(body) != 1 + game['score'] // 10:
+        problems.append(f'length {len(body)} does not match score {game["score"]}')
+    for (x1, y1), (x2, y2) in zip(body, body[1:]):
+        if abs(x1 - x2) + abs(y1 - y2) != 1:
+            problems.append('snake body is not contiguous')
+            break
+    return problems
+
+
+def play(client, shared, stop, counter, rng):
+    requests = 0
+    while not stop.is_set():
+        kind, game_id, size = rng.choice(shared)
+        if kind == 'memory':
+            response = client.post('/api/games/memory/flip', json={
+                'game_id': game_id, 'card_index': rng.randrange(size * size)})
+            if response.get_json().get('status') == 'no_match':
+                client.post('/api/games/memory/hide-cards', json={'game_id': game_id})
+                requests += 1
+        else:
+            client.post('/api/games/snake/move', json={
+                'game_id': game_id,
+                'direction': rng.choice(['up', 'down', 'left', 'right'])})
+        requests += 1
+    counter.append(requests)
+
+
+def start_games(client, count):
+    games = []
+    for _ in range(count):
+        memory = client.post('/api/games/memory/start', json={'difficulty': 'hard'}).get_json()
+        games.append(('memory', memory['game_id'], memory['grid_size']))
+        snake = client.post('/api/games/snake/start', json={}).get_json()
+        games.append(('snake', snake['game_id'], snake['grid_size']))
+    return games
+
+
+def run(app, threads, duration, game_sessions):
+    client = app.test_client()
+    shared = start_games(client, SHARED_GAMES)
+    stop = threading.Event()
+    counter = []
+    workers = [threading.Thread(target=play, args=(app.test_client(), shared, stop, counter,
+                                                   random.Random(i)))
+               for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    time.sleep(duration)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    problems = []
+    for kind, game_id, _ in shared:
+        game = game_sessions[game_id]
+        check = check_memory if kind == 'memory' else check_snake
+        problems += [f'{kind} {game_id[:8]}: {p}' for p in check(game)]
+    return sum(counter) / elapsed, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', default='1,4,16')
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--unlocked', action='store_true',
+                        help='replace the striped locks with no-ops')
+    parser.add_argument('--switch-interval', type=float, default=1e-6,
+                        help='sys.setswitchinterval, small values surface races')
+    args = parser.parse_args(argv)
+
+    from src.main import create_app
+    from src.routes.games import game_sessions
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    if args.unlocked:
+        game_sessions.lock = lambda game_id: contextlib.nullcontext()
+    sys.setswitchinterval(args.switch_interval)
+
+    failed = False
+    print(f'{"threads":>7} {"req/s":>9}  invariants')
+    for threads in (int(t) for t in args.threads.split(',')):
+        throughput, problems = run(app, threads, args.duration, game_sessions)
+        print(f'{threads:>7} {throughput:>9,.0f}  {"ok" if not problems else "VIOLATED"}')
+        for problem in problems[:10]:
+            print(f'        {problem}')
+        failed = failed or bool(problems)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Bulk import throughput (src/bulk_import.py) versus one request per player.
+
+Run from the ``file`` directory:
+
+    python -m src.benchmarks.bench_import --rows 1000000
+
+Writes ``--rows`` synthetic players (with ``--duplicates`` of them repeated
+in another letter case) as NDJSON and CSV, then imports each file into a
+fresh SQLite database and reports records per second. For comparison it
+also times ``--baseline`` registrations through /api/players/register.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def write_players(path, fmt, rows, duplicates, rng):
+    with open(path, 'w', encoding='utf-8', newline='') as out:
+        if fmt == 'csv':
+            out.write('name,password,created_at\n')
+        for i in range(rows):
+            name = f'player{i:08d}'
+            if i and rng.random() < duplicates:
+                name = f'PLAYER{rng.randrange(i):08d}'
+            if fmt == 'csv':
+                out.write(f'{name},secret{i},2025-01-01T00:00:00\n')
+            else:
+                out.write(json.dumps({'name': name, 'password': f'secret{i}',
+                                      'created_at': '2025-01-01T00:00:00'}) + '\n')
+
+
+def fresh_app(workdir, name):
+    from src.main import create_app
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, name)}',
+        'AUTO_CREATE_TABLES': True})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--duplicates', type=float, default=0.01)
+    parser.add_argument('--baseline', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    from src import bulk_import
+
+    workdir = tempfile.mkdtemp(prefix='arcade-bench-')
+    print(f'{"method":10} {"records":>10} {"inserted":>10} {"seconds":>8} {"records/s":>10}')
+    for fmt in ('ndjson', 'csv'):
+        path = os.path.join(workdir, f'players.{fmt}')
+        write_players(path, fmt, args.rows, args.duplicates, random.Random(args.seed))
+        app = fresh_app(workdir, f'{fmt}.db')
+        with app.app_context(), open(path, encoding='utf-8', newline='') as lines:
+            started = time.perf_counter()
+            report = bulk_import.run('players', lines, fmt)
+            elapsed = time.perf_counter() - started
+        if report['failed_chunk']:
+            print(f'# {fmt}: {report["failed_chunk"]}', file=sys.stderr)
+        print(f'{fmt:10} {report["read"]:>10,} {report["inserted"]:>10,} {elapsed:>8.1f} '
+              f'{report["read"] / elapsed:>10,.0f}')
+
+    client = fresh_app(workdir, 'register.db').test_client()
+    started = time.perf_counter()
+    for i in range(args.baseline):
+        client.post('/api/players/register', json={'name': f'player{i:08d}', 'password': 'x'})
+    elapsed = time.perf_counter() - started
+    print(f'{"register":10} {args.baseline:>10,} {args.baseline:>10,} {elapsed:>8.1f} '
+          f'{args.baseline / elapsed:>10,.0f}')
+
+
+if __name__ == '__main__':
+    main()
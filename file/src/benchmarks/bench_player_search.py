@@ -0,0 +1,100 @@
+"""Player name search / availability latency as the player count grows.
+
+Run from the ``file`` directory:
+
+    python -m src.benchmarks.bench_player_search --sizes 100000,1000000,3000000
+
+Each size gets a fresh SQLite database of random player names. Reported:
+time to load the in-memory index (src/player_index.py), then median and
+p99 of ``search`` (random 1-3 letter prefixes) and ``available`` (half
+taken, half free names) on the index itself, and the median of the full
+GET /api/players/search request through the Flask test client.
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+
+
+def random_names(count, rng):
+    names = set()
+    while len(names) < count:
+        length = rng.randint(4, 10)
+        name = ''.join(rng.choice(string.ascii_lowercase) for _ in range(length))
+        if rng.random() < 0.5:
+            name = name.capitalize() + str(rng.randint(0, 999))
+        names.add(name)
+    return list(names)
+
+
+def percentiles(samples):
+    samples.sort()
+    return (statistics.median(samples) * 1e6,
+            samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1e6)
+
+
+def run(size, args, rng):
+    from sqlalchemy import insert
+    from src.main import create_app
+    from src.models.user import Player, db
+
+    workdir = tempfile.mkdtemp(prefix='arcade-bench-')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "bench.db")}',
+                      'AUTO_CREATE_TABLES': True})
+    names = random_names(size, rng)
+    with app.app_context():
+        for first in range(0, size, 50000):
+            db.session.execute(insert(Player), [
+                {'name': name, 'password': 'bench'} for name in names[first:first + 50000]])
+        db.session.commit()
+
+        index = app.extensions['player_index']
+        started = time.perf_counter()
+        index.sync(force=True)
+        load = time.perf_counter() - started
+
+        prefixes = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(1, 3)))
+                    for _ in range(args.lookups)]
+        search = []
+        for prefix in prefixes:
+            started = time.perf_counter()
+            index.search(prefix, 10)
+            search.append(time.perf_counter() - started)
+
+        candidates = [rng.choice(names) if i % 2 else f'free-{i}' for i in range(args.lookups)]
+        available = []
+        for name in candidates:
+            started = time.perf_counter()
+            index.available(name)
+            available.append(time.perf_counter() - started)
+
+    client = app.test_client()
+    http = []
+    for prefix in prefixes[:args.lookups // 10]:
+        started = time.perf_counter()
+        client.get(f'/api/players/search?prefix={prefix}')
+        http.append(time.perf_counter() - started)
+    return load, percentiles(search), percentiles(available), statistics.median(http) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100000,1000000')
+    parser.add_argument('--lookups', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    print(f'{"players":>9} {"load s":>7} {"search p50/p99 us":>18} '
+          f'{"available p50/p99 us":>21} {"GET search p50 us":>18}')
+    for size in (int(s) for s in args.sizes.split(',')):
+        load, search, available, http = run(size, args, rng)
+        print(f'{size:>9,} {load:>7.2f} {search[0]:>8.1f} / {search[1]:<7.1f} '
+              f'{available[0]:>10.1f} / {available[1]:<8.1f} {http:>18.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Score percentiles: KLL sketch accuracy and cost versus scanning game_score.
+
+Run from the ``file`` directory:
+
+    python -m src.benchmarks.bench_quantiles --sizes 10000,100000,1000000
+
+For each size, snake-like scores (10 points per food, long tail) are fed
+to a KLLSketch and compared with the exact answer: worst rank error over
+all score values in percent of the count, time per added score and items
+kept. The same scores are then written to a fresh SQLite database, and
+GET /api/stats/snake/percentile is timed against the ``count(points < x)``
+scan it replaces.
+"""
+import argparse
+import bisect
+import os
+import random
+import statistics
+import tempfile
+import time
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run(size, args, rng):
+    from sqlalchemy import func, insert
+    from src.main import create_app
+    from src.models.user import GameScore, Player, db
+    from src.quantiles import KLLSketch
+
+    scores = [10 * int(rng.expovariate(1 / 8)) for _ in range(size)]
+    sketch = KLLSketch(rng=random.Random(args.seed))
+    started = time.perf_counter()
+    for points in scores:
+        sketch.add(points)
+    add_us = (time.perf_counter() - started) / size * 1e6
+    ordered = sorted(scores)
+    error = max(abs(sketch.rank(value) - bisect.bisect_left(ordered, value))
+                for value in set(scores)) / size
+    kept = sum(len(level) for level in sketch.levels)
+
+    workdir = tempfile.mkdtemp(prefix='arcade-bench-')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "bench.db")}',
+                      'AUTO_CREATE_TABLES': True})
+    with app.app_context():
+        db.session.add(Player(name='bench', password='bench'))
+        db.session.commit()
+        for first in range(0, size, 50000):
+            db.session.execute(insert(GameScore), [
+                {'player_id': 1, 'game_type': 'snake', 'points': points, 'attempts': 1,
+                 'difficulty': 'normal'} for points in scores[first:first + 50000]])
+        db.session.commit()
+        app.extensions['score_stats'].sync(force=True)
+        scan_ms = timed(lambda: db.session.query(func.count()).filter(
+            GameScore.game_type == 'snake', GameScore.difficulty == 'normal',
+            GameScore.points < 100).scalar(), args.repeat)
+
+    client = app.test_client()
+    sketch_ms = timed(lambda: client.get('/api/stats/snake/percentile?points=100&difficulty=normal'),
+                      args.repeat)
+    return add_us, error, kept, scan_ms, sketch_ms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    print(f'{"scores":>9} {"add us":>7} {"max rank err":>13} {"items kept":>11} '
+          f'{"scan ms":>8} {"endpoint ms":>12}')
+    for size in (int(s) for s in args.sizes.split(',')):
+        add_us, error, kept, scan_ms, sketch_ms = run(size, args, rng)
+        print(f'{size:>9,} {add_us:>7.2f} {error:>13.2%} {kept:>11} '
+              f'{scan_ms:>8.2f} {sketch_ms:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Time every read endpoint in src/routes/user.py at increasing score volumes.
+
+Run from the ``file`` directory:
+
+    python -m src.benchmarks.bench_read_endpoints --sizes 10000,1000000,10000000
+
+Each size gets a fresh SQLite database filled by src.tools.seed_scores.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+DEFAULT_SIZES = '10000,1000000,10000000'
+
+
+def time_request(client, url, repeat):
+    """Return (median_ms, p95_ms, status) for ``repeat`` GETs of ``url``"""
+    samples = []
+    status = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url)
+        samples.append((time.perf_counter() - started) * 1000)
+        status = response.status_code
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return statistics.median(samples), p95, status
+
+
+# (label, url); the session-bound ones run as the most active player
+ENDPOINTS = [
+    ('GET /api/users', '/api/users'),
+    ('GET /api/users/<id>', '/api/users/1'),
+    ('GET /api/players/current', '/api/players/current'),
+    ('GET /api/players/best-scores', '/api/players/best-scores'),
+    ('GET /api/leaderboard', '/api/leaderboard'),
+    ('GET /api/leaderboard/snake', '/api/leaderboard/snake'),
+    ('GET /api/leaderboard/memory', '/api/leaderboard/memory'),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help='comma separated score counts')
+    parser.add_argument('--players-ratio', type=float, default=0.05,
+                        help='players per score (default one player per 20 scores)')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    workdir = tempfile.mkdtemp(prefix='arcade-bench-')
+    db_path = os.path.join(workdir, 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+
+    from src.main import create_app
+    from src.models.user import db, Player, User
+    from src.tools.seed_scores import seed
+
+    app = create_app({'AUTO_CREATE_TABLES': True})
+
+    with app.app_context():
+        db.session.add(User(username='bench', email='bench@example.com'))
+        db.session.commit()
+
+    print(f'{"endpoint":32} {"scores":>12} {"median ms":>10} {"p95 ms":>10} status')
+    for size in sizes:
+        players = max(10, int(size * args.players_ratio))
+        started = time.perf_counter()
+        with app.app_context():
+            db.session.execute(db.text('DELETE FROM game_score'))
+            Player.query.delete()
+            db.session.commit()
+        seed(app, players, size, random_seed=args.seed, prefix=f'bench{size}_')
+        print(f'# seeded {size:,} scores / {players:,} players in '
+              f'{time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+        with app.app_context():
+            busiest = db.session.execute(db.text(
+                'SELECT player_id FROM game_score GROUP BY player_id '
+                'ORDER BY count(*) DESC LIMIT 1')).scalar()
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['player_id'] = busiest
+            sess['player_name'] = 'bench'
+
+        for label, url in ENDPOINTS:
+            median, p95, status = time_request(client, url, args.repeat)
+            print(f'{label:32} {size:>12,} {median:>10.2f} {p95:>10.2f} {status}')
+
+
+if __name__ == '__main__':
+    main()
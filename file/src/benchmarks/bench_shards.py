@@ -0,0 +1,80 @@
+"""Concurrent score writes for different games, one app.db versus per-game
+shards (src/score_shards.py).
+
+Run from the ``file`` directory:
+
+    python -m src.benchmarks.bench_shards --writers-per-game 2 --duration 10
+
+Each writer is its own process (like a gunicorn worker) recording scores of
+one game with ``record_score``, one commit each. Unsharded, every writer
+queues on the single SQLite write lock; sharded, only writers of the same
+game do.
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from src.scores import GAME_TYPES
+
+
+def writer(config, game_type, player_id, duration, results):
+    from src.main import create_app
+    from src.scores import record_score
+
+    app = create_app(config)
+    latencies = []
+    with app.app_context():
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            record_score(player_id, game_type, 10, 1, 'easy')
+            latencies.append((time.perf_counter() - started) * 1000)
+    results.put((game_type, latencies))
+
+
+def run(sharded, args):
+    from src.main import create_app
+    from src.tools.seed_scores import seed
+
+    workdir = tempfile.mkdtemp(prefix='arcade-bench-')
+    config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(workdir, "bench.db")}'}
+    if sharded:
+        config['SCORE_SHARD_DIR'] = os.path.join(workdir, 'scores')
+    seed(create_app(dict(config, AUTO_CREATE_TABLES=True)), args.players, args.scores,
+         random_seed=7)
+
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=writer, args=(
+        config, game_type, i + 1, args.duration, results))
+        for game_type in GAME_TYPES for i in range(args.writers_per_game)]
+    for process in processes:
+        process.start()
+    latencies = [latency for _ in processes for latency in results.get()[1]]
+    for process in processes:
+        process.join()
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f'{"sharded" if sharded else "app.db":8} {len(processes):>7} '
+          f'{len(latencies) / args.duration:>9.0f} {statistics.median(latencies):>9.2f} '
+          f'{p99:>9.2f}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers-per-game', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--scores', type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    print(f'{"layout":8} {"writers":>7} {"writes/s":>9} {"p50 ms":>9} {"p99 ms":>9}')
+    for sharded in (False, True):
+        run(sharded, args)
+
+
+if __name__ == '__main__':
+    main()
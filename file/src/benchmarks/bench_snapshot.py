@@ -0,0 +1,87 @@
+"""Snapshot write/restore cost for large numbers of in-flight games.
+
+Run from the ``file`` directory:
+
+    python -m src.benchmarks.bench_snapshot --games 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+
+
+def make_game(rng):
+    kind = rng.choice(['number_guess', 'tictactoe', 'memory', 'snake'])
+    if kind == 'number_guess':
+        return {'type': kind, 'target': rng.randint(1, 100), 'min': 1, 'max': 100,
+                'attempts': rng.randint(0, 9), 'max_attempts': 10,
+                'difficulty': 'medium', 'status': 'active'}
+    if kind == 'tictactoe':
+        return {'type': kind, 'board': [rng.choice(['', 'X', 'O']) for _ in range(9)],
+                'current_player': 'X', 'status': 'active', 'winner': None}
+    if kind == 'memory':
+        cards = list(range(1, 19)) * 2
+        rng.shuffle(cards)
+        return {'type': kind, 'cards': cards, 'revealed': 0b110000, 'matched': 0b110000,
+                'grid_size': 6, 'difficulty': 'medium', 'moves': 3, 'matches': 1,
+                'total_pairs': 18, 'status': 'active', 'first_card': None,
+                'second_card': None}
+    return {'type': kind, 'snake': [[10, 10 + i] for i in range(rng.randint(1, 12))],
+            'direction': 'right', 'food': [15, 15], 'score': 0, 'status': 'active',
+            'grid_size': 20}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    from src.game_store import GameStore
+    from src.game_snapshot import SnapshotReader, encode_snapshot, write_snapshot
+
+    rng = random.Random(3)
+    store = GameStore()
+    ids = []
+    for _ in range(args.games):
+        game_id = str(uuid.uuid4())
+        store[game_id] = make_game(rng)
+        ids.append(game_id)
+
+    path = os.path.join(tempfile.mkdtemp(prefix='arcade-bench-'), 'games-bench-1.snap')
+    started = time.perf_counter()
+    with store.locked():
+        written, data = encode_snapshot(store)
+    # Requests wait for the encoding only, not for the disk
+    locked_ms = (time.perf_counter() - started) * 1000
+    write_snapshot(path, data)
+    write_ms = (time.perf_counter() - started) * 1000
+    size = os.path.getsize(path)
+
+    restored = GameStore()
+    started = time.perf_counter()
+    restored.attach_snapshot(SnapshotReader(path))
+    load_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    sample = rng.sample(ids, min(1000, len(ids)))
+    for game_id in sample:
+        assert restored[game_id] == store[game_id]
+    lookup_us = (time.perf_counter() - started) / len(sample) * 1e6
+
+    started = time.perf_counter()
+    for game_id in ids:
+        restored.get(game_id)
+    restore_all_ms = (time.perf_counter() - started) * 1000
+
+    print(f'games written       {written:,}')
+    print(f'file size           {size / 1024 / 1024:.1f} MiB ({size / written:.0f} B/game)')
+    print(f'write               {write_ms:.1f} ms ({locked_ms:.1f} ms with games locked)')
+    print(f'load (map + header) {load_ms:.3f} ms')
+    print(f'first lookup        {lookup_us:.1f} us/game')
+    print(f'restore every game  {restore_all_ms:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Worker startup cost: import time, app construction and time-to-first-request.
+
+Run from the ``file`` directory:
+
+    DATABASE_URL=sqlite:////tmp/arcade.db python -m src.benchmarks.bench_startup
+
+Each sample is a fresh interpreter, like a newly spawned gunicorn worker.
+"create_all" reproduces the old boot path that introspected the schema on
+every start; "factory" is the default create_app() path.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import src.main
+t1 = time.perf_counter()
+app = src.main.create_app({"AUTO_CREATE_TABLES": %(create_all)r})
+t2 = time.perf_counter()
+response = app.test_client().get(%(url)r)
+t3 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "create_app": t2 - t1, "first_request": t3 - t2,
+                  "status": response.status_code}))
+'''
+
+MODES = (('create_all', True), ('factory', False))
+
+
+def run_child(create_all, url):
+    code = CHILD % {'create_all': create_all, 'url': url}
+    cwd = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd, check=True,
+                            capture_output=True, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--url', default='/api/leaderboard/snake')
+    args = parser.parse_args(argv)
+
+    if not os.environ.get('DATABASE_URL'):
+        parser.error('DATABASE_URL must point at an initialised database')
+
+    print(f'{"mode":12} {"import ms":>10} {"create_app ms":>14} {"first req ms":>13} {"total ms":>9}')
+    for mode, create_all in MODES:
+        samples = [run_child(create_all, args.url) for _ in range(args.repeat)]
+        medians = {key: statistics.median(s[key] for s in samples) * 1000
+                   for key in ('import', 'create_app', 'first_request')}
+        total = sum(medians.values())
+        print(f'{mode:12} {medians["import"]:>10.1f} {medians["create_app"]:>14.1f} '
+              f'{medians["first_request"]:>13.1f} {total:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
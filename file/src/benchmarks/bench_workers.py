@@ -0,0 +1,112 @@
+"""Per-worker memory and cold-request latency with and without preloading.
+
+Run from the ``file`` directory (Linux only, reads /proc):
+
+    DATABASE_URL=sqlite:////tmp/arcade.db python -m src.benchmarks.bench_workers
+
+Starts gunicorn with gunicorn.conf.py twice (GUNICORN_PRELOAD=0 and 1) and
+reports each worker's RSS, PSS and private memory plus the latency of the
+first requests after boot.
+"""
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+FILE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def children(pid):
+    found = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            found.append(int(entry))
+    return found
+
+
+def memory_kb(pid):
+    """Return (rss, pss, private) in kB from smaps_rollup"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(':')] = int(parts[1])
+    private = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return values.get('Rss', 0), values.get('Pss', 0), private
+
+
+def wait_for(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError('gunicorn did not start')
+
+
+def run(preload, workers, requests, url):
+    port = free_port()
+    env = dict(os.environ, GUNICORN_PRELOAD='1' if preload else '0',
+               GUNICORN_WORKERS=str(workers), GUNICORN_BIND=f'127.0.0.1:{port}')
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'src.wsgi:app'],
+        cwd=FILE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(port)
+        while len(children(master.pid)) < workers:
+            time.sleep(0.05)
+
+        latencies = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}{url}') as response:
+                response.read()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        stats = [memory_kb(pid) for pid in children(master.pid)]
+        return stats, latencies
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=8,
+                        help='first N requests timed after boot')
+    parser.add_argument('--url', default='/api/leaderboard')
+    args = parser.parse_args(argv)
+
+    print(f'{"preload":8} {"RSS kB":>9} {"PSS kB":>9} {"private kB":>11} '
+          f'{"first ms":>9} {"median ms":>10}')
+    for preload in (False, True):
+        stats, latencies = run(preload, args.workers, args.requests, args.url)
+        rss, pss, private = (statistics.mean(column) for column in zip(*stats))
+        print(f'{str(preload):8} {rss:>9,.0f} {pss:>9,.0f} {private:>11,.0f} '
+              f'{latencies[0]:>9.1f} {statistics.median(latencies):>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
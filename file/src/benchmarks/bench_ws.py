@@ -0,0 +1,162 @@
+"""Game actions per second per core: HTTP POSTs, /api/games/batch and the
+WebSocket channel.
+
+Run from the ``file`` directory (needs gunicorn and websockets):
+
+    python -m src.benchmarks.bench_ws --actions 20000
+
+Starts one single-threaded server of each kind as a subprocess on a shared
+temporary SQLite database: gunicorn with one gthread worker (keep-alive, so
+HTTP is not penalised for reconnecting) and ``src.ws_server``. A logged-in
+client then plays snake moves round a small square (the game never ends),
+one request at a time over HTTP, ``--pipeline`` moves per batch request
+and ``--pipeline`` frames in flight over the socket. Server CPU time is
+read from /proc, so the "per core" column is actions per second of server
+CPU.
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+SQUARE = ['right', 'down', 'left', 'up']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def cpu_seconds(pid):
+    """CPU time of ``pid`` and its live children (gunicorn's worker)"""
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    total = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return total + sum(cpu_seconds(int(child)) for child in f.read().split())
+
+
+def wait_for_port(port, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def http_call(conn, path, body, cookie=None):
+    headers = {'Content-Type': 'application/json'}
+    if cookie:
+        headers['Cookie'] = cookie
+    try:
+        conn.request('POST', path, json.dumps(body), headers)
+        response = conn.getresponse()
+    except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+        # The server dropped the keep-alive connection; reconnect and retry
+        conn.close()
+        conn.request('POST', path, json.dumps(body), headers)
+        response = conn.getresponse()
+    data = response.read()
+    return response, json.loads(data)
+
+
+def bench_http(port, cookie, actions):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    _, game = http_call(conn, '/api/games/snake/start', {}, cookie)
+    started = time.perf_counter()
+    for i in range(actions):
+        http_call(conn, '/api/games/snake/move',
+                  {'game_id': game['game_id'], 'direction': SQUARE[i % 4]}, cookie)
+    return time.perf_counter() - started
+
+
+def bench_batch(port, cookie, actions, size):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    _, game = http_call(conn, '/api/games/snake/start', {}, cookie)
+    started = time.perf_counter()
+    for first in range(0, actions, size):
+        batch = [{'action': 'snake.move', 'game_id': game['game_id'], 'direction': SQUARE[i % 4]}
+                 for i in range(first, min(first + size, actions))]
+        _, reply = http_call(conn, '/api/games/batch', {'actions': batch}, cookie)
+        assert all('result' in r for r in reply['results']), reply
+    return time.perf_counter() - started
+
+
+async def bench_socket(port, cookie, actions, pipeline):
+    from websockets.asyncio.client import connect
+
+    async with connect(f'ws://127.0.0.1:{port}/', additional_headers={'Cookie': cookie},
+                       compression=None) as ws:
+        await ws.send(json.dumps({'id': 0, 'action': 'snake.start'}))
+        game_id = json.loads(await ws.recv())['result']['game_id']
+        started = time.perf_counter()
+        sent = received = 0
+        while received < actions:
+            while sent < actions and sent - received < pipeline:
+                await ws.send(json.dumps({'id': sent, 'action': 'snake.move', 'game_id': game_id,
+                                          'direction': SQUARE[sent % 4]}))
+                sent += 1
+            reply = json.loads(await ws.recv())
+            assert 'result' in reply, reply
+            received += 1
+        return time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--actions', type=int, default=20000)
+    parser.add_argument('--pipeline', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='arcade-bench-')
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{os.path.join(workdir, "bench.db")}',
+               SECRET_KEY='bench', AUTO_CREATE_TABLES='1')
+    http_port, ws_port = free_port(), free_port()
+    servers = {
+        'http': subprocess.Popen([sys.executable, '-m', 'gunicorn', '-k', 'gthread',
+                                  '--threads', '1', '-w', '1', '-b', f'127.0.0.1:{http_port}',
+                                  'src.wsgi:app'], env=env, stderr=subprocess.DEVNULL),
+    }
+    try:
+        wait_for_port(http_port)
+        servers['websocket'] = subprocess.Popen(
+            [sys.executable, '-m', 'src.ws_server', '--host', '127.0.0.1', '--port', str(ws_port)],
+            env=env, stderr=subprocess.DEVNULL)
+        wait_for_port(ws_port)
+
+        conn = http.client.HTTPConnection('127.0.0.1', http_port)
+        response, _ = http_call(conn, '/api/players/register',
+                                {'name': f'bench-{os.getpid()}', 'password': 'bench'})
+        cookie = response.getheader('Set-Cookie').split(';', 1)[0]
+
+        print(f'{"transport":10} {"actions/s":>10} {"server cpu s":>13} {"actions/s/core":>15}')
+        for name in ('http', 'batch', 'websocket'):
+            pid = servers['websocket' if name == 'websocket' else 'http'].pid
+            cpu_before = cpu_seconds(pid)
+            if name == 'http':
+                elapsed = bench_http(http_port, cookie, args.actions)
+            elif name == 'batch':
+                elapsed = bench_batch(http_port, cookie, args.actions, args.pipeline)
+            else:
+                elapsed = asyncio.run(bench_socket(ws_port, cookie, args.actions, args.pipeline))
+            cpu = cpu_seconds(pid) - cpu_before
+            print(f'{name:10} {args.actions / elapsed:>10,.0f} {cpu:>13.2f} '
+                  f'{args.actions / cpu if cpu else float("inf"):>15,.0f}')
+    finally:
+        for server in servers.values():
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
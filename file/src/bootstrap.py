@@ -0,0 +1,36 @@
+"""Inlining the home page's initial state into index.html.
+
+With ``BOOTSTRAP_INLINE`` enabled the catch-all route serves index.html with
+the /api/bootstrap payload embedded as a JSON script tag, so the first paint
+needs no API round trip at all. The page then differs per visitor, so it is
+sent uncached and without the precompressed variants.
+"""
+import json
+
+from flask import Response, session
+from src.models.session import replica_read
+from src.scores import bootstrap_state
+
+SCRIPT_ID = 'bootstrap-data'
+
+
+def embed_state(html, state):
+    """Insert ``state`` as a JSON script tag before </head>"""
+    # '<' escaped so no string in the payload can close the script tag
+    payload = json.dumps(state, separators=(',', ':')).replace('<', '\\u003c')
+    tag = f'<script id="{SCRIPT_ID}" type="application/json">{payload}</script>\n'
+    return html.replace(b'</head>', tag.encode('utf-8') + b'</head>', 1)
+
+
+# Only this page reads the session: static assets stay free of Vary: Cookie
+@replica_read
+def index_with_state(entry):
+    """Response for the index.html ``entry`` with the bootstrap state inlined"""
+    html = entry.data
+    if html is None:
+        with open(entry.path, 'rb') as f:
+            html = f.read()
+    response = Response(embed_state(html, bootstrap_state(session.get('player_id'))),
+                        mimetype=entry.mimetype)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
@@ -0,0 +1,270 @@
+"""Bulk import of players and users from NDJSON or CSV.
+
+Migrating accounts through /api/players/register or /api/users costs a
+query, an insert and a commit per row. Instead, an import streams the
+records, checks them in memory and inserts them IMPORT_BATCH at a time,
+one transaction per chunk. Chunks go in through COPY on PostgreSQL
+(psycopg or psycopg2) and a single executemany everywhere else.
+
+Names and emails are deduplicated against a set of the keys already in the
+database (loaded once per import) plus those seen earlier in the file, so
+duplicates are reported rather than failing a whole chunk. Players are
+unique by ``lower(name)`` like the ``ix_player_name_lower`` index (folded
+with src/player_index.py's ``name_key``, in the database's own way, on both
+sides), users by username and by email (compared case-insensitively).
+
+Every record is numbered by the line it ends on. The report says how far
+the import committed (``committed_through``); if a chunk fails the import
+stops there, and running it again with ``skip`` set to that line picks up
+where it left off. Running the whole file again is also safe: records
+already imported are skipped as duplicates.
+"""
+import csv
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from src import cache_bus
+from src.models.user import Player, User, db
+from src.player_index import name_key
+
+# Records per insert statement and transaction
+IMPORT_BATCH = 10000
+
+# Rejected records listed in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+FORMATS = ('ndjson', 'csv')
+
+
+class BulkImportError(ValueError):
+    """Input the import cannot read at all"""
+
+
+def _text(record, field, limit, required=True):
+    value = record.get(field)
+    if not value:
+        if required:
+            raise ValueError(f'{field} is required')
+        return None
+    value = (value if type(value) is str else str(value)).strip()
+    if not value or len(value) > limit:
+        raise ValueError(f'{field} must be 1 to {limit} characters')
+    return value
+
+
+def _player(record, now, backend):
+    """(unique keys, row) for a player record"""
+    name = _text(record, 'name', 80)
+    # Stored the way /api/players/register stores it
+    password = _text(record, 'password', 120)
+    created_at = _text(record, 'created_at', 40, required=False)
+    try:
+        created_at = datetime.fromisoformat(created_at) if created_at else now
+    except ValueError:
+        raise ValueError('created_at must be an ISO date-time')
+    if created_at.tzinfo is not None:
+        # Stored naive in UTC like datetime.utcnow()
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return (name_key(name, backend),), (name, password, created_at)
+
+
+def _user(record, now, backend):
+    """(unique keys, row) for a user record"""
+    username = _text(record, 'username', 80)
+    email = _text(record, 'email', 120)
+    local, _, domain = email.partition('@')
+    if not local or not domain:
+        raise ValueError('email is not an email address')
+    return (username, email.lower()), (username, email)
+
+
+def _existing_players(backend):
+    return [{name_key(name, backend) for name in db.session.scalars(
+        db.select(Player.name), execution_options={'yield_per': IMPORT_BATCH})}]
+
+
+def _existing_users(backend):
+    usernames, emails = set(), set()
+    for username, email in db.session.execute(
+            db.select(User.username, User.email), execution_options={'yield_per': IMPORT_BATCH}):
+        usernames.add(username)
+        emails.add(email.lower())
+    return [usernames, emails]
+
+
+# kind: (model, columns in table order, record check, loader of the keys
+# already in the database); checks return rows as tuples of those columns,
+# both take the database backend name for name_key
+KINDS = {
+    'players': (Player, ('name', 'password', 'created_at'), _player, _existing_players),
+    'users': (User, ('username', 'email'), _user, _existing_users),
+}
+
+
+def read_records(lines, fmt):
+    """(line number, record) pairs from an iterable of text lines; a record
+    that is not valid JSON comes back as None"""
+    if fmt == 'csv':
+        reader = csv.reader(lines)
+        fields = next(reader, None)
+        if fields is None:
+            return
+        fields = [field.strip() for field in fields]
+        for values in reader:
+            if values:
+                yield reader.line_num, dict(zip(fields, values))
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record
+
+
+def _copy(connection, table, columns, rows):
+    """COPY ``rows`` into ``table`` through the psycopg connection"""
+    buffer = io.StringIO()
+    # Empty unquoted CSV fields are NULL to COPY
+    csv.writer(buffer).writerows(rows)
+    quote = connection.dialect.identifier_preparer
+    sql = (f'COPY {quote.format_table(table)} ({", ".join(quote.quote(c) for c in columns)}) '
+           'FROM STDIN WITH (FORMAT csv)')
+    cursor = connection.connection.cursor()
+    try:
+        if connection.dialect.driver == 'psycopg2':
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+        else:
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+
+def _insert(engine, table, columns, rows):
+    """Insert one chunk in its own transaction"""
+    with engine.begin() as connection:
+        dialect = connection.dialect
+        if dialect.name == 'postgresql' and dialect.driver in ('psycopg', 'psycopg2'):
+            _copy(connection, table, columns, rows)
+        elif dialect.positional:
+            # One executemany straight to the driver, skipping SQLAlchemy's
+            # per-row parameter dicts; only types that need it are converted
+            processors = [(i, process) for i, process in enumerate(
+                table.c[column].type.dialect_impl(dialect).bind_processor(dialect)
+                for column in columns) if process]
+            if processors:
+                converted = []
+                for row in rows:
+                    row = list(row)
+                    for i, process in processors:
+                        row[i] = process(row[i])
+                    converted.append(tuple(row))
+                rows = converted
+            sql = table.insert().compile(dialect=dialect, column_keys=columns).string
+            connection.exec_driver_sql(sql, rows)
+        else:
+            connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+
+def run(kind, lines, fmt='ndjson', skip=0, batch_size=IMPORT_BATCH, progress=None):
+    """Import the ``kind`` records in ``lines`` (in an app context) and
+    return the report; records on lines up to ``skip`` are passed over"""
+    if kind not in KINDS:
+        raise BulkImportError(f'Unknown import: {kind}')
+    if fmt not in FORMATS:
+        raise BulkImportError('format must be ndjson or csv')
+    model, columns, check, existing = KINDS[kind]
+    table = model.__table__
+    engine = db.engine
+    failures = (SQLAlchemyError, engine.dialect.dbapi.Error)
+    backend = engine.dialect.name
+    seen = existing(backend)
+    # Reads are done; the chunks below use their own connections
+    db.session.rollback()
+    now = datetime.utcnow()
+
+    report = {'kind': kind, 'read': 0, 'inserted': 0, 'invalid': 0, 'duplicates': 0,
+              'committed_through': skip, 'errors': [], 'failed_chunk': None}
+
+    def reject(number, field, message):
+        report[field] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'line': number, 'error': message})
+
+    # One writer thread inserts a chunk while the next one is read and
+    # checked (the drivers release the GIL while executing), so at most two
+    # chunks are held and they commit in file order
+    writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bulk-import')
+    pending = None
+
+    def wait():
+        """Wait for the chunk being inserted; False if it failed"""
+        nonlocal pending
+        if pending is None:
+            return True
+        future, count, through = pending
+        pending = None
+        try:
+            future.result()
+        except failures as e:
+            report['failed_chunk'] = {
+                'from_line': report['committed_through'] + 1, 'to_line': through,
+                'error': str(getattr(e, 'orig', None) or e)}
+            return False
+        report['inserted'] += count
+        report['committed_through'] = through
+        if progress:
+            progress(report)
+        return True
+
+    def flush(chunk, through):
+        """Start inserting ``chunk``; False if the previous chunk failed"""
+        nonlocal pending
+        if not wait():
+            return False
+        pending = (writer.submit(_insert, engine, table, columns, chunk), len(chunk), through)
+        return True
+
+    chunk, number = [], skip
+    try:
+        for number, record in read_records(lines, fmt):
+            if number <= skip:
+                continue
+            report['read'] += 1
+            try:
+                if not isinstance(record, dict):
+                    raise ValueError('not a JSON object')
+                keys, row = check(record, now, backend)
+            except ValueError as e:
+                reject(number, 'invalid', str(e))
+                continue
+            if any(key in taken for key, taken in zip(keys, seen)):
+                reject(number, 'duplicates', 'already exists')
+                continue
+            for key, taken in zip(keys, seen):
+                taken.add(key)
+            chunk.append(row)
+            if len(chunk) >= batch_size:
+                if not flush(chunk, number):
+                    return report
+                chunk = []
+        if chunk:
+            flush(chunk, max(number, skip)) and wait()
+        elif wait():
+            # Nothing left to insert (an inserting driver would choke on an
+            # empty executemany); the lines read since were all rejected
+            report['committed_through'] = max(number, skip)
+        return report
+    finally:
+        writer.shutdown()
+        if kind == 'players' and report['inserted']:
+            # Every worker's name index picks the new players up
+            cache_bus.bump('players')
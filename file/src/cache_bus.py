@@ -0,0 +1,116 @@
+"""Cross-worker cache invalidation through shared generation counters.
+
+Each worker keeps caches of database state (player name index, score
+distributions, analytics columns, the live leaderboard stream) and used to
+learn about other workers' writes only by re-querying the database every
+few seconds. The bus is one page of 64-bit counters in a memory-mapped
+file, one counter per namespace in ``NAMESPACES``, mapped by every process
+of the app on the host. A process that commits a change to a namespace
+calls ``bump(namespace)``; a cache compares the counter with the value it
+saw before its last catch-up (``Watch``), which is a read of shared memory:
+no query, no syscall. Caches go back to the database as soon as a counter
+moves, and otherwise only every ``max_age`` seconds (CACHE_BUS_MAX_AGE) as a
+backstop for writes made without the app (another host, an sqlite3 shell).
+
+The file is CACHE_BUS_PATH, by default one per database URL in the temp
+directory, so gunicorn workers (preloaded or not), ``flask`` commands and
+the tools in src/tools all share it. Bumps are serialized with a POSIX
+record lock on the file. Counters are only compared for equality, so they
+survive restarts as they are. With CACHE_BUS off the caches poll on their
+own ``refresh`` intervals as before.
+"""
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from flask import current_app
+
+# One counter slot each; only ever append, running processes may share the
+# file with an older release during a deploy
+NAMESPACES = ('scores', 'players', 'player_deletes')
+
+SLOT_SIZE = 8
+MAP_SIZE = mmap.PAGESIZE
+
+
+def default_path(database_uri):
+    """Bus file shared by every process using ``database_uri``"""
+    digest = hashlib.sha1((database_uri or '').encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f'arcade-cache-bus-{digest}')
+
+
+class CacheBus:
+    """Per-host generation counters, one per namespace"""
+
+    def __init__(self, app, path, max_age=60.0):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < MAP_SIZE:
+            # Zero-filled; growing it twice at once is harmless
+            os.ftruncate(self._fd, MAP_SIZE)
+        self._map = mmap.mmap(self._fd, MAP_SIZE)
+        self._counters = memoryview(self._map).cast('Q')
+        app.extensions['cache_bus'] = self
+
+    def generation(self, namespace):
+        """Current counter of ``namespace``"""
+        return self._counters[NAMESPACES.index(namespace)]
+
+    def bump(self, namespace):
+        """Tell every process that ``namespace`` changed; call after commit"""
+        slot = NAMESPACES.index(namespace)
+        with self._lock:
+            if fcntl is not None:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, SLOT_SIZE, slot * SLOT_SIZE)
+            try:
+                self._counters[slot] = (self._counters[slot] + 1) % 2 ** 64
+            finally:
+                if fcntl is not None:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN, SLOT_SIZE, slot * SLOT_SIZE)
+
+
+class Watch:
+    """When one cache of ``namespace`` has to look at the database again.
+
+    With a bus: once the namespace's counter moved since ``start()``, or
+    ``max_age`` seconds after the last catch-up. Without one: every
+    ``refresh`` seconds.
+    """
+
+    def __init__(self, app, namespace, refresh):
+        self.bus = app.extensions.get('cache_bus')
+        self.namespace = namespace
+        self.max_age = self.bus.max_age if self.bus is not None else refresh
+        self._seen = None
+
+    def start(self):
+        """Call right before reading the database, so a bump that lands
+        during the read is still seen as new afterwards"""
+        if self.bus is not None:
+            self._seen = self.bus.generation(self.namespace)
+
+    def due(self, synced_at):
+        """True when the cache last caught up at ``synced_at`` is stale"""
+        if synced_at is None:
+            return True
+        if self.bus is not None and self.bus.generation(self.namespace) != self._seen:
+            return True
+        return time.monotonic() - synced_at >= self.max_age
+
+
+def bump(*namespaces):
+    """``CacheBus.bump`` on the current app's bus, if it has one"""
+    bus = current_app.extensions.get('cache_bus')
+    if bus is not None:
+        for namespace in namespaces:
+            bus.bump(namespace)
@@ -0,0 +1,89 @@
+import click
+
+
+def register_commands(app):
+    """Attach the maintenance commands to ``app.cli``.
+
+    Run from the ``file`` directory, e.g.:
+
+        flask --app src.main:create_app init-db
+    """
+
+    @app.cli.command('init-db')
+    @click.option('--drop', is_flag=True, help='Drop all tables before creating them.')
+    def init_db(drop):
+        """Create (or recreate) the database schema."""
+        from src import score_shards
+        from src.models.user import db
+
+        if drop:
+            db.drop_all()
+        db.create_all()
+        # create_all skips indexes added to tables that already exist
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        # game_score in each shard file when SCORE_SHARD_DIR is set
+        score_shards.create_tables(drop=drop)
+        click.echo('Database schema is up to date.')
+
+    @app.cli.command('sync-replica')
+    def sync_replica():
+        """Copy the primary SQLite database onto the SQLite replica.
+
+        A stand-in for real replication when testing read routing locally;
+        PostgreSQL replicas should use streaming replication instead.
+        """
+        import sqlite3
+        from src.models.user import db
+        from src.models.session import REPLICA_BIND
+
+        engines = db.engines
+        if REPLICA_BIND not in engines:
+            raise click.ClickException('No replica bind configured (DATABASE_REPLICA_URL).')
+        primary, replica = engines[None], engines[REPLICA_BIND]
+        if primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+            raise click.ClickException('sync-replica only supports SQLite files.')
+
+        source = sqlite3.connect(primary.url.database)
+        target = sqlite3.connect(replica.url.database)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        click.echo(f'Copied {primary.url.database} to {replica.url.database}.')
+
+    @app.cli.command('import')
+    @click.argument('kind', type=click.Choice(['players', 'users']))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']),
+                  help='Input format (default: from the file extension, else ndjson).')
+    @click.option('--skip', type=int, default=0,
+                  help='Resume after this line (a previous run\'s committed_through).')
+    @click.option('--batch-size', type=int, default=None, help='Records per insert.')
+    def import_records(kind, path, fmt, skip, batch_size):
+        """Bulk import players or users from an NDJSON or CSV file (see
+        src/bulk_import.py)."""
+        import json
+        import time
+        from src import bulk_import
+
+        if fmt is None:
+            fmt = 'csv' if path.endswith('.csv') else 'ndjson'
+        started = time.perf_counter()
+
+        def progress(report):
+            rate = report['read'] / max(time.perf_counter() - started, 1e-9)
+            click.echo(f'\r{report["inserted"]:,} inserted, through line '
+                       f'{report["committed_through"]:,} ({rate:,.0f} rows/s)', nl=False, err=True)
+
+        with open(path, encoding='utf-8', newline='') as lines:
+            report = bulk_import.run(kind, lines, fmt, skip=skip,
+                                     batch_size=batch_size or bulk_import.IMPORT_BATCH,
+                                     progress=progress)
+        click.echo(err=True)
+        click.echo(json.dumps(report, indent=2))
+        if report['failed_chunk']:
+            raise click.ClickException(
+                f'Stopped at a failed chunk; rerun with --skip {report["committed_through"]}.')
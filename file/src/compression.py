@@ -0,0 +1,82 @@
+import functools
+import gzip
+import zlib
+
+from flask import request
+
+# Defaults, overridable through app.config
+DEFAULT_MIN_SIZE = 256
+DEFAULT_LEVEL = 6
+DEFAULT_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/csv',
+                     'text/event-stream', 'text/plain')
+
+
+def skip_compression(view):
+    """Mark a view whose responses should never be compressed.
+
+    Meant for small high-frequency responses (e.g. the per-tick snake move)
+    where gzip costs more CPU than the bytes it saves.
+    """
+    view.skip_compression = True
+    return view
+
+
+def _gzip_stream(chunks, level):
+    """Compress an iterable of chunks, flushing after each one so streamed
+    responses (SSE, NDJSON) reach the client without buffering"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class Compress:
+    """Negotiated gzip compression for dynamic responses.
+
+    Config keys: ``COMPRESS_MIN_SIZE`` (bytes below which buffered responses
+    are sent as-is), ``COMPRESS_LEVEL`` and ``COMPRESS_MIMETYPES``.
+    Static files are left alone since they are precompressed at build time.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE)
+        app.config.setdefault('COMPRESS_LEVEL', DEFAULT_LEVEL)
+        app.config.setdefault('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)
+        app.after_request(functools.partial(self.after_request, app))
+
+    def after_request(self, app, response):
+        config = app.config
+        if response.mimetype not in config['COMPRESS_MIMETYPES']:
+            return response
+        if response.direct_passthrough or 'Content-Encoding' in response.headers:
+            return response
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return response
+
+        view = app.view_functions.get(request.endpoint)
+        if getattr(view, 'skip_compression', False):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if not request.accept_encodings['gzip']:
+            return response
+
+        level = config['COMPRESS_LEVEL']
+        if response.is_streamed:
+            response.response = _gzip_stream(response.response, level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < config['COMPRESS_MIN_SIZE']:
+                return response
+            response.set_data(gzip.compress(data, compresslevel=level, mtime=0))
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
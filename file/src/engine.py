@@ -0,0 +1,95 @@
+"""Per-backend SQLAlchemy engine settings.
+
+SQLite gets WAL mode and connection pragmas so readers no longer block
+behind writers. PostgreSQL gets a pool sized from the worker's thread count
+plus pre-ping and recycling. Both can be overridden through app.config.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Applied to every new SQLite connection, in order
+DEFAULT_SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('mmap_size', 256 * 1024 * 1024),
+    ('cache_size', -64 * 1024),  # negative = KiB, i.e. 64 MiB per connection
+    ('busy_timeout', 5000),
+    ('temp_store', 'MEMORY'),
+)
+
+
+def backend_name(uri):
+    if not uri:
+        return None
+    return make_url(uri).get_backend_name()
+
+
+def is_memory_sqlite(uri):
+    database = make_url(uri).database
+    return not database or database == ':memory:' or 'mode=memory' in uri
+
+
+def engine_options(config, uri):
+    """Engine keyword arguments for ``uri`` given the app config"""
+    backend = backend_name(uri)
+    if backend == 'postgresql':
+        # One connection per request thread in this process, plus headroom
+        # for short bursts; total server connections are workers * this
+        threads = int(config.get('WEB_THREADS') or 1)
+        pool_size = config.get('DB_POOL_SIZE') or max(2, threads)
+        return {
+            'pool_size': pool_size,
+            'max_overflow': config.get('DB_MAX_OVERFLOW', pool_size),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 10),
+            'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': True,
+        }
+    if backend == 'sqlite' and not is_memory_sqlite(uri):
+        # Let the pysqlite driver wait on locks as long as busy_timeout does
+        return {'connect_args': {'timeout': 5}}
+    return {}
+
+
+def apply_engine_options(app):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS / per-bind options before db.init_app"""
+    config = app.config
+    if not config.get('DB_ENGINE_TUNING', True):
+        return
+    options = engine_options(config, config.get('SQLALCHEMY_DATABASE_URI'))
+    merged = dict(options)
+    merged.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = merged
+
+    binds = config.get('SQLALCHEMY_BINDS') or {}
+    for key, bind in list(binds.items()):
+        if isinstance(bind, str):
+            bind = {'url': bind}
+        options = engine_options(config, bind['url'])
+        options.update(bind)
+        binds[key] = options
+
+
+def _set_sqlite_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def configure_engines(app, db):
+    """Attach connect-time pragmas to every SQLite engine (default and binds)"""
+    if not app.config.get('DB_ENGINE_TUNING', True):
+        return
+    pragmas = tuple(app.config.get('SQLITE_PRAGMAS') or DEFAULT_SQLITE_PRAGMAS)
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name != 'sqlite':
+                continue
+            engine_pragmas = pragmas
+            if is_memory_sqlite(str(engine.url)):
+                engine_pragmas = tuple(p for p in pragmas if p[0] != 'journal_mode')
+            event.listen(engine, 'connect', _set_sqlite_pragmas(engine_pragmas))
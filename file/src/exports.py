@@ -0,0 +1,130 @@
+"""Streaming exports of scores and players as NDJSON or CSV.
+
+Rows are fetched with ``stream_results`` and ``yield_per`` (a server-side
+cursor on PostgreSQL, the plain incremental cursor on SQLite) and written
+out one chunk of EXPORT_BATCH rows at a time, so memory stays flat however
+many rows the export has. Each chunk is one piece of the response body;
+the gzip layer (src/compression.py) flushes per piece, so larger pieces
+also compress better.
+
+Scores are read from each score database in turn (src/score_shards.py),
+with player names looked up in the primary per chunk.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from src import score_shards
+from src.models.user import GameScore, Player, db
+from src.scores import player_names
+
+# Rows per database fetch and per response chunk
+EXPORT_BATCH = 2000
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class ExportError(ValueError):
+    """A filter the export cannot apply"""
+
+
+def parse_time(value, name):
+    """``datetime`` from an ISO date or date-time query parameter"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ExportError(f'{name} must be an ISO date, e.g. 2025-01-31')
+
+
+SCORE_COLUMNS = ['id', 'player_id', 'player_name', 'game_type', 'points', 'attempts',
+                 'difficulty', 'created_at']
+
+PLAYER_COLUMNS = ['id', 'name', 'created_at']
+
+
+def _partitions(query, database=None):
+    result = score_shards.execute(
+        query, database=database,
+        execution_options={'stream_results': True, 'yield_per': EXPORT_BATCH})
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def score_export(game_type=None, player_id=None, since=None, until=None):
+    """(columns, chunks of rows) of the matching scores in id order, one
+    score database after the other; ``until`` is exclusive"""
+    query = db.select(
+        GameScore.id, GameScore.player_id, GameScore.game_type, GameScore.points,
+        GameScore.attempts, GameScore.difficulty, GameScore.created_at)
+    if game_type:
+        query = query.where(GameScore.game_type == game_type)
+    if player_id is not None:
+        query = query.where(GameScore.player_id == player_id)
+    if since:
+        query = query.where(GameScore.created_at >= since)
+    if until:
+        query = query.where(GameScore.created_at < until)
+    query = query.order_by(GameScore.id)
+
+    def chunks():
+        for database in score_shards.databases([game_type] if game_type else None):
+            for rows in _partitions(query, database):
+                # Names come from the primary, which may not hold the scores
+                names = player_names({row[1] for row in rows})
+                yield [(row[0], row[1], names.get(row[1])) + tuple(row[2:]) for row in rows]
+    return SCORE_COLUMNS, chunks()
+
+
+def player_export(since=None, until=None):
+    """(columns, chunks of rows) of the players in id order (never their
+    passwords)"""
+    query = db.select(Player.id, Player.name, Player.created_at)
+    if since:
+        query = query.where(Player.created_at >= since)
+    if until:
+        query = query.where(Player.created_at < until)
+    return PLAYER_COLUMNS, _partitions(query.order_by(Player.id))
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+# Only datetimes reach ``default``, so other values skip the Python hook
+_encode = json.JSONEncoder(separators=(',', ':'), default=datetime.isoformat).encode
+
+
+def _ndjson(columns, rows):
+    return ''.join([_encode(dict(zip(columns, row))) + '\n' for row in rows])
+
+
+def _csv(columns, rows, header):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    if header:
+        writer.writerow(columns)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return out.getvalue()
+
+
+def stream(export, fmt):
+    """Generate ``export`` (columns, chunks of rows) in ``fmt`` chunk by chunk"""
+    columns, chunks = export
+    header = True
+    for rows in chunks:
+        if fmt == 'csv':
+            yield _csv(columns, rows, header)
+            header = False
+        else:
+            yield _ndjson(columns, rows)
+    if fmt == 'csv' and header:
+        # No rows: still send the header line
+        yield _csv(columns, [], True)
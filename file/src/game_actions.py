@@ -0,0 +1,81 @@
+"""Game actions named by a string, for clients that send many at once.
+
+Each entry of ACTIONS takes ``(store, message)``, where ``message`` is the
+action's JSON object, and returns ``(game type, result, score)``. ``result``
+is exactly what the matching route in src/routes/games.py returns and
+``score`` is the ``final_score`` tuple to record, set only by the action
+that ended the game. Used by /api/games/batch and the WebSocket channel
+(src/ws_server.py):
+
+    number_guess.start / .guess   tictactoe.start / .move   rps.play
+    memory.start / .flip / .hide  snake.start / .move
+
+Callers hold the game's lock from ``store.lock(game_id)`` where they need it.
+"""
+import uuid
+
+from src.game_engine import (GameError, final_score, flip_card, guess_number, hide_cards,
+                             new_memory, new_number_guess, new_snake, new_tictactoe,
+                             play_rps_round, rps_score, step_snake, tictactoe_move)
+
+
+def start(game, response):
+    """Action creating a game in ``store``"""
+    def action(store, message):
+        state = game(message)
+        game_id = str(uuid.uuid4())
+        store[game_id] = state
+        result = {'game_id': game_id}
+        result.update(response(state))
+        return state['type'], result, None
+    return action
+
+
+def play(move):
+    """Action on an existing game in ``store``"""
+    def action(store, message):
+        game_id = message.get('game_id')
+        state = store.get(game_id) if isinstance(game_id, str) else None
+        if state is None:
+            raise GameError('Game not found', 404)
+        was_active = state['status'] == 'active'
+        result = move(state, message)
+        return state['type'], result, final_score(state) if was_active else None
+    return action
+
+
+def play_rps(store, message):
+    result = play_rps_round(message.get('choice'))
+    return 'rps', result, rps_score(result)
+
+
+ACTIONS = {
+    'number_guess.start': start(
+        lambda m: new_number_guess(m.get('difficulty', 'medium')),
+        lambda g: {'min': g['min'], 'max': g['max'], 'max_attempts': g['max_attempts'],
+                   'difficulty': g['difficulty']}),
+    'number_guess.guess': play(lambda g, m: guess_number(g, m.get('guess'))),
+    'tictactoe.start': start(
+        lambda m: new_tictactoe(),
+        lambda g: {'board': g['board'], 'current_player': 'X'}),
+    'tictactoe.move': play(lambda g, m: tictactoe_move(g, m.get('position'))),
+    'memory.start': start(
+        lambda m: new_memory(m.get('difficulty', 'medium')),
+        lambda g: {'grid_size': g['grid_size'], 'total_pairs': g['total_pairs'],
+                   'difficulty': g['difficulty']}),
+    'memory.flip': play(lambda g, m: flip_card(g, m.get('card_index'))),
+    'memory.hide': play(lambda g, m: hide_cards(g)),
+    'snake.start': start(
+        lambda m: new_snake(),
+        lambda g: {'snake': g['snake'], 'food': g['food'], 'score': 0,
+                   'grid_size': g['grid_size']}),
+    'snake.move': play(lambda g, m: step_snake(g, m.get('direction'))),
+    'rps.play': play_rps,
+}
+
+
+def get_action(name):
+    action = ACTIONS.get(name) if isinstance(name, str) else None
+    if action is None:
+        raise GameError('Unknown action')
+    return action
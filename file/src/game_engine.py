@@ -0,0 +1,506 @@
+"""Game rules, independent of Flask.
+
+Each function takes and mutates a plain game state dict (the same dicts kept
+in ``game_sessions``) and returns the JSON-ready result of the action, so
+the HTTP routes, encrypted stateless tokens and any other transport share one
+implementation. Invalid actions raise GameError.
+"""
+import random
+
+NUMBER_GUESS_RANGES = {
+    'easy': (1, 50),
+    'medium': (1, 100),
+    'hard': (1, 200)
+}
+
+NUMBER_GUESS_MAX_ATTEMPTS = 10
+
+TICTACTOE_LINES = [
+    [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
+    [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
+    [0, 4, 8], [2, 4, 6]              # diagonals
+]
+
+
+class GameError(Exception):
+    """An action the game rules reject; ``status`` is the HTTP status"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def require_active(game):
+    if game['status'] != 'active':
+        raise GameError('Game is not active')
+
+
+def require_difficulty(difficulty):
+    # Unknown names fall back to the medium settings, other types are errors
+    if not isinstance(difficulty, str):
+        raise GameError('Invalid difficulty')
+
+
+# Number guessing
+
+def new_number_guess(difficulty):
+    require_difficulty(difficulty)
+    min_num, max_num = NUMBER_GUESS_RANGES.get(difficulty, (1, 100))
+    return {
+        'type': 'number_guess',
+        'target': random.randint(min_num, max_num),
+        'min': min_num,
+        'max': max_num,
+        'attempts': 0,
+        'max_attempts': NUMBER_GUESS_MAX_ATTEMPTS,
+        'difficulty': difficulty,
+        'status': 'active'
+    }
+
+
+def guess_number(game, guess):
+    """Apply one guess"""
+    require_active(game)
+
+    if not isinstance(guess, int) or isinstance(guess, bool):
+        raise GameError('Invalid guess')
+
+    game['attempts'] += 1
+    target = game['target']
+
+    if guess == target:
+        game['status'] = 'won'
+        return {
+            'result': 'correct',
+            'attempts': game['attempts'],
+            'target': target,
+            'status': 'won'
+        }
+    elif game['attempts'] >= game['max_attempts']:
+        game['status'] = 'lost'
+        return {
+            'result': 'game_over',
+            'attempts': game['attempts'],
+            'target': target,
+            'status': 'lost'
+        }
+    else:
+        hint = 'higher' if guess < target else 'lower'
+        return {
+            'result': 'incorrect',
+            'hint': hint,
+            'attempts': game['attempts'],
+            'remaining': game['max_attempts'] - game['attempts']
+        }
+
+
+# Tic Tac Toe
+
+def new_tictactoe():
+    return {
+        'type': 'tictactoe',
+        'board': ['' for _ in range(9)],
+        'current_player': 'X',
+        'status': 'active',
+        'winner': None
+    }
+
+
+def tictactoe_move(game, position):
+    """Place the player's X and, unless the game ended, the AI's O"""
+    require_active(game)
+
+    # Negative indexes would wrap around to the other end of the board
+    if (not isinstance(position, int) or isinstance(position, bool)
+            or not 0 <= position < len(game['board'])):
+        raise GameError('Invalid position')
+
+    if game['board'][position] != '':
+        raise GameError('Position already taken')
+
+    # Player move
+    game['board'][position] = 'X'
+
+    # Check for win or tie
+    winner = check_tictactoe_winner(game['board'])
+    if winner:
+        game['status'] = 'finished'
+        game['winner'] = winner
+        return {
+            'board': game['board'],
+            'status': 'finished',
+            'winner': winner
+        }
+
+    if '' not in game['board']:
+        game['status'] = 'finished'
+        game['winner'] = 'tie'
+        return {
+            'board': game['board'],
+            'status': 'finished',
+            'winner': 'tie'
+        }
+
+    # AI move
+    ai_position = get_ai_move(game['board'])
+    game['board'][ai_position] = 'O'
+
+    # Check for win again
+    winner = check_tictactoe_winner(game['board'])
+    if winner:
+        game['status'] = 'finished'
+        game['winner'] = winner
+    elif '' not in game['board']:
+        game['status'] = 'finished'
+        game['winner'] = 'tie'
+
+    return {
+        'board': game['board'],
+        'status': game['status'],
+        'winner': game.get('winner'),
+        'ai_move': ai_position
+    }
+
+
+def check_tictactoe_winner(board):
+    """Check for Tic Tac Toe winner"""
+    for combo in TICTACTOE_LINES:
+        if board[combo[0]] == board[combo[1]] == board[combo[2]] != '':
+            return board[combo[0]]
+    return None
+
+
+def get_ai_move(board):
+    """Simple AI for Tic Tac Toe"""
+    # Try to win
+    for i in range(9):
+        if board[i] == '':
+            board[i] = 'O'
+            if check_tictactoe_winner(board) == 'O':
+                board[i] = ''
+                return i
+            board[i] = ''
+
+    # Try to block player
+    for i in range(9):
+        if board[i] == '':
+            board[i] = 'X'
+            if check_tictactoe_winner(board) == 'X':
+                board[i] = ''
+                return i
+            board[i] = ''
+
+    # Take center if available
+    if board[4] == '':
+        return 4
+
+    # Take corners
+    corners = [0, 2, 6, 8]
+    available_corners = [i for i in corners if board[i] == '']
+    if available_corners:
+        return random.choice(available_corners)
+
+    # Take any available space
+    available = [i for i in range(9) if board[i] == '']
+    return random.choice(available)
+
+
+# Rock Paper Scissors
+
+RPS_CHOICES = ['rock', 'paper', 'scissors']
+
+RPS_BEATS = {'rock': 'scissors', 'paper': 'rock', 'scissors': 'paper'}
+
+
+def play_rps_round(player_choice):
+    """Play one round against a random computer choice"""
+    if player_choice not in RPS_CHOICES:
+        raise GameError('Invalid choice')
+
+    computer_choice = random.choice(RPS_CHOICES)
+
+    # Determine winner
+    if player_choice == computer_choice:
+        result = 'tie'
+    elif RPS_BEATS[player_choice] == computer_choice:
+        result = 'win'
+    else:
+        result = 'lose'
+
+    return {
+        'player_choice': player_choice,
+        'computer_choice': computer_choice,
+        'result': result
+    }
+
+
+# Memory
+
+MEMORY_GRID_SIZES = {
+    'easy': 4,     # 4x4 = 16 cards (8 pairs)
+    'medium': 6,   # 6x6 = 36 cards (18 pairs)
+    'hard': 8,     # 8x8 = 64 cards (32 pairs)
+    'expert': 12,  # 12x12 = 144 cards (72 pairs)
+    'master': 16   # 16x16 = 256 cards (128 pairs)
+}
+
+
+def new_memory(difficulty):
+    require_difficulty(difficulty)
+    grid_size = MEMORY_GRID_SIZES.get(difficulty, 6)
+    total_cards = grid_size * grid_size
+    pairs = total_cards // 2
+
+    # Create card deck with pairs
+    cards = list(range(1, pairs + 1)) * 2
+    random.shuffle(cards)
+
+    # revealed / matched are bitsets (bit i = card i) so each flip, hide and
+    # completion check is O(1) whatever the board size
+    return {
+        'type': 'memory',
+        'cards': cards,
+        'revealed': 0,
+        'matched': 0,
+        'grid_size': grid_size,
+        'difficulty': difficulty,
+        'moves': 0,
+        'matches': 0,
+        'total_pairs': pairs,
+        'status': 'active',
+        'first_card': None,
+        'second_card': None
+    }
+
+
+def memory_bits(flags):
+    """Bitset for a revealed/matched value (boolean lists in older games)"""
+    if isinstance(flags, int):
+        return flags
+    return sum(1 << i for i, flag in enumerate(flags) if flag)
+
+
+def _hide_mismatch(game):
+    """Turn the last mismatched pair face down; return the hidden indices"""
+    first, second = game['first_card'], game['second_card']
+    if first is None or second is None:
+        return []
+    game['revealed'] = memory_bits(game['revealed']) & ~((1 << first) | (1 << second))
+    game['first_card'] = None
+    game['second_card'] = None
+    return [first, second]
+
+
+def flip_card(game, card_index):
+    """Flip one card; the second flip of a pair resolves match / no match.
+
+    A mismatched pair left face up is hidden first, so clients need not call
+    hide_cards. Responses only carry the cards that changed: ``hidden`` for
+    that auto-hide and ``pair`` once a pair is resolved.
+    """
+    require_active(game)
+
+    if (not isinstance(card_index, int) or isinstance(card_index, bool)
+            or not 0 <= card_index < len(game['cards'])):
+        raise GameError('Invalid card')
+
+    bit = 1 << card_index
+    if memory_bits(game['matched']) & bit:
+        raise GameError('Card already revealed or matched')
+    hidden = _hide_mismatch(game)
+    revealed = memory_bits(game['revealed'])
+    if revealed & bit:
+        raise GameError('Card already revealed or matched')
+
+    # Flip the card
+    game['revealed'] = revealed | bit
+    card_value = game['cards'][card_index]
+
+    if game['first_card'] is None:
+        # First card of the pair
+        game['first_card'] = card_index
+        return {
+            'card_index': card_index,
+            'card_value': card_value,
+            'status': 'first_card',
+            'hidden': hidden
+        }
+
+    # Second card of the pair
+    first_card = game['first_card']
+    game['moves'] += 1
+
+    if game['cards'][first_card] == card_value:
+        # Match found
+        game['matched'] = memory_bits(game['matched']) | bit | (1 << first_card)
+        game['matches'] += 1
+
+        # Check if game is complete
+        if game['matches'] == game['total_pairs']:
+            game['status'] = 'completed'
+
+        game['first_card'] = None
+
+        return {
+            'card_index': card_index,
+            'card_value': card_value,
+            'status': 'match',
+            'pair': [first_card, card_index],
+            'moves': game['moves'],
+            'matches': game['matches'],
+            'game_status': game['status'],
+            'hidden': hidden
+        }
+
+    # No match - hidden again by hide_cards or the next flip
+    game['second_card'] = card_index
+    return {
+        'card_index': card_index,
+        'card_value': card_value,
+        'status': 'no_match',
+        'pair': [first_card, card_index],
+        'first_card': first_card,
+        'moves': game['moves'],
+        'hidden': hidden
+    }
+
+
+def hide_cards(game):
+    """Turn a mismatched pair face down again (optional, see flip_card)"""
+    return {
+        'hidden': _hide_mismatch(game)
+    }
+
+
+# Snake
+
+SNAKE_GRID_SIZE = 20
+
+SNAKE_FOOD_POINTS = 10
+
+OPPOSITE_DIRECTIONS = {
+    'up': 'down', 'down': 'up',
+    'left': 'right', 'right': 'left'
+}
+
+
+def new_snake():
+    return {
+        'type': 'snake',
+        'snake': [[10, 10]],  # Starting position
+        'direction': 'right',
+        'food': [15, 15],
+        'score': 0,
+        'status': 'active',
+        'grid_size': SNAKE_GRID_SIZE
+    }
+
+
+def turn_snake(current, requested):
+    """Direction after a turn request (reversing onto itself is ignored)"""
+    if (isinstance(requested, str) and requested in OPPOSITE_DIRECTIONS
+            and requested != OPPOSITE_DIRECTIONS.get(current)):
+        return requested
+    return current
+
+
+def next_head(head, direction):
+    """The cell the snake's head moves into"""
+    x, y = head
+    if direction == 'up':
+        y -= 1
+    elif direction == 'down':
+        y += 1
+    elif direction == 'left':
+        x -= 1
+    elif direction == 'right':
+        x += 1
+    return [x, y]
+
+
+def off_grid(cell, grid_size):
+    return cell[0] < 0 or cell[0] >= grid_size or cell[1] < 0 or cell[1] >= grid_size
+
+
+def step_snake(game, direction):
+    """Advance the snake one cell, turning first unless it would reverse"""
+    require_active(game)
+
+    game['direction'] = turn_snake(game['direction'], direction)
+
+    # Move snake
+    head = next_head(game['snake'][0], game['direction'])
+
+    # Check wall collision
+    if off_grid(head, game['grid_size']):
+        game['status'] = 'game_over'
+        return {
+            'status': 'game_over',
+            'score': game['score'],
+            'reason': 'wall_collision'
+        }
+
+    # Check self collision
+    if head in game['snake']:
+        game['status'] = 'game_over'
+        return {
+            'status': 'game_over',
+            'score': game['score'],
+            'reason': 'self_collision'
+        }
+
+    # Add new head
+    game['snake'].insert(0, head)
+
+    # Check food collision
+    if head == game['food']:
+        game['score'] += SNAKE_FOOD_POINTS
+        # Generate new food
+        while True:
+            new_food = [random.randint(0, game['grid_size'] - 1),
+                        random.randint(0, game['grid_size'] - 1)]
+            if new_food not in game['snake']:
+                game['food'] = new_food
+                break
+    else:
+        # Remove tail if no food eaten
+        game['snake'].pop()
+
+    return {
+        'snake': game['snake'],
+        'food': game['food'],
+        'score': game['score'],
+        'status': game['status']
+    }
+
+
+# Scoring
+
+def final_score(game):
+    """(points, attempts, difficulty) for a finished game, else None.
+
+    Mirrors the points the browser used to compute and post itself.
+    """
+    kind = game['type']
+    status = game['status']
+    if kind == 'number_guess' and status in ('won', 'lost'):
+        if status == 'lost':
+            return 0, game['attempts'], game['difficulty']
+        points = max(1, game['max_attempts'] - game['attempts'] + 1)
+        return points, game['attempts'], game['difficulty']
+    if kind == 'tictactoe' and status == 'finished':
+        points = {'X': 3, 'O': 0}.get(game['winner'], 1)
+        return points, 1, 'normal'
+    if kind == 'memory' and status == 'completed':
+        max_moves = game['total_pairs'] * 3  # Generous max moves
+        points = max(1, max_moves - game['moves'] + 1)
+        return points, game['moves'], game.get('difficulty', 'medium')
+    if kind == 'snake' and status == 'game_over':
+        return game['score'], 1, 'normal'
+    return None
+
+
+def rps_score(result):
+    """(points, attempts, difficulty) for one Rock Paper Scissors round"""
+    return (1 if result['result'] == 'win' else 0), 1, 'normal'
@@ -0,0 +1,244 @@
+"""Snapshot and restore of in-flight game sessions across restarts.
+
+File layout (little endian)::
+
+    header   b'GSNP' | u16 format | u8 python major | u8 python minor | u32 count
+    index    count * (16 byte game UUID | u64 offset | u32 length), sorted by UUID
+    records  marshal-encoded game dicts
+
+Loading only maps the file and reads the header; a game is decoded the first
+time its id is looked up (binary search over the index), so restoring 100k
+sessions costs the same as restoring one. Records that were never looked up
+are copied into the next snapshot as raw bytes without being decoded.
+"""
+import glob
+import marshal
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import uuid
+
+MAGIC = b'GSNP'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHBBI')
+INDEX_ENTRY = struct.Struct('<16sQI')
+
+FILE_PATTERN = 'games-*.snap'
+
+# Set once per server (gunicorn.conf.py does, in the master) and inherited
+# by its workers; snapshot files are named by it and the writer's pid
+BOOT_ID_ENV = 'GAME_SNAPSHOT_BOOT_ID'
+
+
+class SnapshotReader:
+    """Read-only view of one snapshot file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, major, minor, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'{path} is not a game snapshot')
+        if (major, minor) != sys.version_info[:2]:
+            # marshal is only stable within one Python version
+            raise ValueError(f'{path} was written by Python {major}.{minor}')
+        self.count = count
+        self.taken = set()
+
+    def _find(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            offset = HEADER.size + middle * INDEX_ENTRY.size
+            probe = self._map[offset:offset + 16]
+            if probe < key:
+                low = middle + 1
+            elif probe > key:
+                high = middle
+            else:
+                return INDEX_ENTRY.unpack_from(self._map, offset)
+        return None
+
+    def take(self, game_id):
+        """Decode and return the game once; later calls return None"""
+        key = game_key(game_id)
+        if key is None or key in self.taken:
+            return None
+        entry = self._find(key)
+        if entry is None:
+            return None
+        self.taken.add(key)
+        _, offset, length = entry
+        return marshal.loads(self._map[offset:offset + length])
+
+    def remaining(self):
+        """Yield (key, raw record) for every game that was not taken"""
+        for i in range(self.count):
+            key, offset, length = INDEX_ENTRY.unpack_from(
+                self._map, HEADER.size + i * INDEX_ENTRY.size)
+            if key not in self.taken:
+                yield key, self._map[offset:offset + length]
+
+
+def game_key(game_id):
+    try:
+        return uuid.UUID(str(game_id)).bytes
+    except ValueError:
+        return None
+
+
+def boot_id():
+    """Id of this server run, shared by its master and workers"""
+    return os.environ.setdefault(BOOT_ID_ENV, uuid.uuid4().hex[:12])
+
+
+def encode_snapshot(store):
+    """(number of games, snapshot bytes) for the active games of ``store``.
+
+    The caller must keep ``store`` from changing meanwhile (hold its locks).
+    """
+    records = {}
+    for reader in store.snapshots:
+        for key, raw in reader.remaining():
+            records[key] = raw
+    for game_id, game in dict.items(store):
+        key = game_key(game_id)
+        if key is not None and game.get('status') == 'active':
+            records[key] = marshal.dumps(game)
+
+    keys = sorted(records)
+    offset = HEADER.size + len(keys) * INDEX_ENTRY.size
+    index = bytearray()
+    for key in keys:
+        index += INDEX_ENTRY.pack(key, offset, len(records[key]))
+        offset += len(records[key])
+
+    data = [HEADER.pack(MAGIC, FORMAT_VERSION, sys.version_info[0], sys.version_info[1],
+                        len(keys)), index]
+    data.extend(records[key] for key in keys)
+    return len(keys), b''.join(data)
+
+
+def write_snapshot(path, data):
+    """Atomically replace ``path`` with the snapshot bytes ``data``"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class GameSnapshots:
+    """Wires snapshotting of a GameStore into the app.
+
+    ``load()`` runs once in each process that serves requests (from
+    gunicorn.conf.py's post_fork, else before the first request; never in
+    the preloading master, whose readers every worker would inherit). It
+    claims the snapshots of processes that are gone, by renaming them so
+    only one worker gets each, maps them into the store and unlinks them
+    (the mapping stays valid), so each saved game is restored once and a
+    replacement worker picks up what its predecessor saved. Files are
+    named ``games-<boot id>-<pid>.snap``: those of an earlier server run
+    are always orphaned, and those of this run whenever their worker is no
+    longer alive. ``save()`` writes this process's games and is called when
+    a worker exits; with ``interval`` set a background thread also saves
+    periodically. Either way the games are encoded to bytes with the store
+    locked and written to disk after the locks are released.
+    """
+
+    def __init__(self, app, store, directory, interval=0):
+        self.store = store
+        self.logger = app.logger
+        self.directory = directory
+        self.interval = interval
+        self._started = False
+        self._loaded_pid = None
+        self.boot_id = boot_id()
+        os.makedirs(directory, exist_ok=True)
+        app.before_request(self._load_once)
+        if interval:
+            app.before_request(self._start_periodic)
+        app.extensions['game_snapshots'] = self
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f'games-{self.boot_id}-{os.getpid()}.snap')
+
+    def _load_once(self):
+        if self._loaded_pid != os.getpid():
+            self.load()
+
+    def load(self):
+        """Attach the snapshots left by exited processes; return the
+        number of games in them"""
+        self._loaded_pid = os.getpid()
+        loaded = 0
+        for path in sorted(glob.glob(os.path.join(self.directory, FILE_PATTERN))):
+            if not self._orphaned(path):
+                continue
+            claimed = f'{path}.{os.getpid()}'
+            try:
+                # Only one process wins the rename
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            try:
+                reader = SnapshotReader(claimed)
+            except (OSError, ValueError, struct.error):
+                continue
+            finally:
+                try:
+                    os.unlink(claimed)
+                except OSError:
+                    pass
+            self.store.attach_snapshot(reader)
+            loaded += reader.count
+        return loaded
+
+    def _orphaned(self, path):
+        """Whether the process that wrote ``path`` has exited"""
+        boot, _, pid = os.path.basename(path)[len('games-'):-len('.snap')].rpartition('-')
+        if boot != self.boot_id:
+            # An earlier run of the server; its pids mean nothing now
+            return True
+        try:
+            pid = int(pid)
+        except ValueError:
+            return False
+        if pid == os.getpid():
+            # Left by an earlier process with this pid
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            # Alive, owned by another user
+            return False
+        return False
+
+    def save(self):
+        """Write this process's games; return how many were saved"""
+        with self.store.locked():
+            if not self.store.has_games():
+                return 0
+            count, data = encode_snapshot(self.store)
+        write_snapshot(self.path, data)
+        return count
+
+    def _start_periodic(self):
+        if self._started:
+            return
+        self._started = True
+        thread = threading.Thread(target=self._periodic, name='game-snapshots', daemon=True)
+        thread.start()
+
+    def _periodic(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.save()
+            except OSError:
+                self.logger.exception('saving game snapshot failed')
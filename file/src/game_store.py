@@ -0,0 +1,74 @@
+import contextlib
+import threading
+
+# Number of locks shared by all games; more stripes means fewer unrelated
+# games contending for the same lock
+DEFAULT_STRIPES = 256
+
+
+class GameStore(dict):
+    """In-memory game sessions keyed by game_id, with striped per-game locks.
+
+    Each game maps to one of a fixed set of locks, so concurrent moves on the
+    same game are serialized while different games almost never contend. A
+    single global lock would serialize the whole arcade; one lock per game
+    would have to be created and cleaned up racily.
+
+    Games restored from a snapshot (see src/game_snapshot.py) are decoded
+    lazily the first time their id is looked up.
+    """
+
+    def __init__(self, stripes=DEFAULT_STRIPES):
+        super().__init__()
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self.snapshots = []
+
+    def lock(self, game_id):
+        """Return the lock guarding ``game_id``"""
+        return self._locks[hash(game_id) % len(self._locks)]
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Hold every stripe, freezing all games (used for snapshots)"""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield self
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    def attach_snapshot(self, reader):
+        self.snapshots.append(reader)
+
+    def has_games(self):
+        return bool(dict.__len__(self)) or any(
+            reader.count > len(reader.taken) for reader in self.snapshots)
+
+    def _restore(self, game_id):
+        game = None
+        # Take from every snapshot so an older copy cannot resurface later
+        for reader in self.snapshots:
+            found = reader.take(game_id)
+            if game is None:
+                game = found
+        if game is not None:
+            dict.__setitem__(self, game_id, game)
+        return game
+
+    def __missing__(self, game_id):
+        game = self._restore(game_id) if self.snapshots else None
+        if game is None:
+            raise KeyError(game_id)
+        return game
+
+    def __contains__(self, game_id):
+        if dict.__contains__(self, game_id):
+            return True
+        return bool(self.snapshots) and self._restore(game_id) is not None
+
+    def get(self, game_id, default=None):
+        try:
+            return self[game_id]
+        except KeyError:
+            return default
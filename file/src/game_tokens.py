@@ -0,0 +1,172 @@
+"""Stateless game tokens for the small turn-based games.
+
+Number-guess and tic-tac-toe states fit in a few bytes, so instead of a
+server-side session the whole state can travel with the client:
+
+    packed state -> AES-GCM (``cryptography``, random IV, key derived from
+    the app SECRET_KEY) -> URL-safe base64
+
+Encryption keeps the guess target hidden; the GCM tag stops tampering.
+Each token carries a per-game nonce, a move counter and its issue time.
+The database keeps the next expected move of every game in play
+(GameTokenMove, one row per game until its last token expires), and a
+move is only applied after advancing it with a compare-and-set. So each
+token is accepted once, by whichever worker or process sees it first,
+and older tokens of the same game are refused: replaying a finished
+game's last move cannot record its score again.
+"""
+import base64
+import hashlib
+import hmac
+import itertools
+import os
+import struct
+import time
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from sqlalchemy.exc import IntegrityError
+
+from src.models.user import GameTokenMove, db
+
+TOKEN_VERSION = 2
+
+# version, game kind, move counter, issued at (epoch seconds), game nonce
+HEADER = struct.Struct('<BBHI8s')
+IV_SIZE = 12
+ASSOCIATED_DATA = b'arcade.game-token'
+
+KIND_CODES = {'number_guess': 1, 'tictactoe': 2}
+KINDS = {code: kind for kind, code in KIND_CODES.items()}
+
+DIFFICULTIES = ['easy', 'medium', 'hard']
+NUMBER_GUESS_STATUSES = ['active', 'won', 'lost']
+NUMBER_GUESS_BODY = struct.Struct('<HHHBBBB')
+
+TICTACTOE_CELLS = ['', 'X', 'O']
+TICTACTOE_STATUSES = ['active', 'finished']
+TICTACTOE_WINNERS = [None, 'X', 'O', 'tie']
+TICTACTOE_BODY = struct.Struct('<IBB')
+
+DEFAULT_MAX_AGE = 3600
+# Claims per process between deletions of expired GameTokenMove rows
+PURGE_EVERY = 1000
+
+
+class InvalidGameToken(Exception):
+    pass
+
+
+def pack_state(game):
+    kind = game['type']
+    if kind == 'number_guess':
+        difficulty = game['difficulty'] if game['difficulty'] in DIFFICULTIES else 'medium'
+        return NUMBER_GUESS_BODY.pack(
+            game['target'], game['min'], game['max'], game['attempts'],
+            game['max_attempts'], DIFFICULTIES.index(difficulty),
+            NUMBER_GUESS_STATUSES.index(game['status']))
+    if kind == 'tictactoe':
+        board = 0
+        for i, cell in enumerate(game['board']):
+            board |= TICTACTOE_CELLS.index(cell) << (2 * i)
+        return TICTACTOE_BODY.pack(board, TICTACTOE_STATUSES.index(game['status']),
+                                   TICTACTOE_WINNERS.index(game['winner']))
+    raise ValueError(f'{kind} games cannot be stateless')
+
+
+def unpack_state(kind, body):
+    if kind == 'number_guess':
+        target, min_num, max_num, attempts, max_attempts, difficulty, status = \
+            NUMBER_GUESS_BODY.unpack(body)
+        return {
+            'type': 'number_guess',
+            'target': target,
+            'min': min_num,
+            'max': max_num,
+            'attempts': attempts,
+            'max_attempts': max_attempts,
+            'difficulty': DIFFICULTIES[difficulty],
+            'status': NUMBER_GUESS_STATUSES[status]
+        }
+    board, status, winner = TICTACTOE_BODY.unpack(body)
+    return {
+        'type': 'tictactoe',
+        'board': [TICTACTOE_CELLS[(board >> (2 * i)) & 3] for i in range(9)],
+        'current_player': 'X',
+        'status': TICTACTOE_STATUSES[status],
+        'winner': TICTACTOE_WINNERS[winner]
+    }
+
+
+class GameTokenCodec:
+    """Encode/decode game state tokens and track the moves played"""
+
+    def __init__(self, secret_key, max_age=DEFAULT_MAX_AGE):
+        if isinstance(secret_key, str):
+            secret_key = secret_key.encode('utf-8')
+        self._aead = AESGCM(hmac.new(secret_key, b'arcade.game-token.encrypt',
+                                     hashlib.sha256).digest())
+        self.max_age = max_age
+        self._claims = itertools.count(1)
+
+    def dumps(self, game):
+        """Return a token for ``game`` (uses and advances its token fields)"""
+        nonce = game.setdefault('nonce', os.urandom(8))
+        game['move'] = game.get('move', -1) + 1
+        plain = HEADER.pack(TOKEN_VERSION, KIND_CODES[game['type']], game['move'] & 0xFFFF,
+                            int(time.time()), nonce) + pack_state(game)
+        iv = os.urandom(IV_SIZE)
+        sealed = iv + self._aead.encrypt(iv, plain, ASSOCIATED_DATA)
+        return base64.urlsafe_b64encode(sealed).rstrip(b'=').decode('ascii')
+
+    def loads(self, token, kind):
+        """Verify ``token`` and return (game, spend_key)"""
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            plain = self._aead.decrypt(raw[:IV_SIZE], raw[IV_SIZE:], ASSOCIATED_DATA)
+            version, kind_code, move, issued, nonce = HEADER.unpack_from(plain)
+            if version != TOKEN_VERSION or KINDS.get(kind_code) != kind:
+                raise InvalidGameToken('Invalid game token')
+            game = unpack_state(kind, plain[HEADER.size:])
+        except (InvalidTag, ValueError, TypeError, IndexError, struct.error):
+            raise InvalidGameToken('Invalid game token')
+        if time.time() - issued > self.max_age:
+            raise InvalidGameToken('Game token expired')
+        game['nonce'] = nonce
+        game['move'] = move
+        return game, (nonce, move)
+
+    def claim(self, spend_key):
+        """Record the token's move as played; False if it already was (or a
+        later move of the game was), by any process"""
+        nonce, move = spend_key
+        table = GameTokenMove.__table__
+        now = int(time.time())
+        try:
+            with db.engine.begin() as connection:
+                if next(self._claims) % PURGE_EVERY == 0:
+                    connection.execute(table.delete().where(table.c.expires_at < now))
+                if move == 0:
+                    # A game's first move: no row yet, the primary key
+                    # settles two requests racing for it
+                    connection.execute(table.insert().values(
+                        nonce=nonce, move=1, expires_at=now + self.max_age))
+                    return True
+                return connection.execute(
+                    table.update()
+                    .where(table.c.nonce == nonce, table.c.move == move)
+                    .values(move=move + 1, expires_at=now + self.max_age)).rowcount == 1
+        except IntegrityError:
+            return False
+
+    def release(self, spend_key):
+        """Undo claim() for a move that did not count"""
+        nonce, move = spend_key
+        table = GameTokenMove.__table__
+        with db.engine.begin() as connection:
+            if move == 0:
+                connection.execute(table.delete().where(
+                    table.c.nonce == nonce, table.c.move == 1))
+            else:
+                connection.execute(table.update().where(
+                    table.c.nonce == nonce, table.c.move == move + 1).values(move=move))
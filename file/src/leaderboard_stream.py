@@ -0,0 +1,221 @@
+"""Live leaderboard updates over Server-Sent Events.
+
+One publisher thread per worker process watches for new scores and, when
+something changed, recomputes all leaderboards with a single query and
+pushes only the games whose top list changed to every subscriber. N open
+browsers therefore cost one query per change instead of N polls.
+
+Change detection is a version check: ``notify()`` is called when this
+process records a score, and scores written by other workers show up as a
+new ``scores`` generation on the cache bus (src/cache_bus.py), read from
+shared memory every ``interval``. Without the bus the check is
+``max(game_score.id)`` (a primary key lookup per score database). Each subscriber has a small
+bounded queue; a client that falls that far behind is dropped and its
+EventSource reconnects to a fresh snapshot. Idle streams get a comment line
+every ``heartbeat`` seconds so proxies keep them open.
+
+Every stream holds a worker thread for its lifetime, so create_app caps
+``max_subscribers`` at half of the worker's request threads (WEB_THREADS,
+from GUNICORN_THREADS). With a single thread (sync workers) it is 0: the
+stream is off, /api/bootstrap says so, and pages refresh the leaderboard
+by hand instead. On shutdown open streams are cut after the graceful
+timeout and the browsers reconnect elsewhere.
+"""
+import collections
+import json
+import threading
+import time
+
+from sqlalchemy import func
+from src import score_shards
+from src.cache_bus import Watch
+from src.models.user import GameScore, db
+from src.scores import leaderboards
+
+# Updates buffered per subscriber before it counts as a slow consumer
+QUEUE_SIZE = 16
+
+# Sent first on every stream so a dropped client reconnects quickly
+RETRY_MS = 3000
+
+# Returned by Subscriber.wait() once the stream is over
+CLOSED = object()
+
+
+def sse_event(name, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {name}')
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscriber:
+    """One open stream: a bounded queue of encoded events"""
+
+    def __init__(self):
+        self.events = collections.deque()
+        self.ready = threading.Condition()
+        self.closed = False
+
+    def push(self, event):
+        """Queue ``event``; False when the subscriber is too far behind"""
+        with self.ready:
+            if len(self.events) >= QUEUE_SIZE:
+                self.closed = True
+                self.ready.notify()
+                return False
+            self.events.append(event)
+            self.ready.notify()
+            return True
+
+    def wait(self, timeout):
+        """Next event, None after ``timeout`` seconds, or CLOSED"""
+        with self.ready:
+            if not self.events and not self.closed:
+                self.ready.wait(timeout)
+            if self.events:
+                return self.events.popleft()
+            return CLOSED if self.closed else None
+
+
+class LeaderboardStream:
+    """Per-process fan-out of leaderboard changes to SSE subscribers"""
+
+    def __init__(self, app, interval=1.0, heartbeat=15.0, max_subscribers=100):
+        self.app = app
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self.subscribers = set()
+        self.boards = None
+        self.version = 0
+        self._last_seen = None
+        self._refreshed_at = None
+        self._watch = Watch(app, 'scores', interval)
+        self._dirty = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        app.extensions['leaderboard_stream'] = self
+
+    @property
+    def enabled(self):
+        return self.max_subscribers > 0
+
+    def warm(self):
+        """Compute the boards the first subscriber gets (called in the
+        preloading master)"""
+        if self.enabled:
+            self._refresh()
+
+    def notify(self):
+        """A score was recorded in this process; publish without waiting
+        for the next poll"""
+        self._dirty.set()
+
+    def subscribe(self):
+        """A new stream holding the current boards, or None when the worker
+        is full; it starts receiving updates once ``events()`` is iterated"""
+        if len(self.subscribers) >= self.max_subscribers:
+            return None
+        if self.boards is None:
+            with self.app.app_context():
+                self._refresh()
+        subscriber = Subscriber()
+        with self._lock:
+            subscriber.push(sse_event('leaderboard', {'version': self.version, 'games': self.boards},
+                                      self.version))
+        return subscriber
+
+    def _register(self, subscriber):
+        """Start publishing to ``subscriber``; False when the worker filled
+        up since ``subscribe()``"""
+        with self._lock:
+            if len(self.subscribers) >= self.max_subscribers:
+                return False
+            self.subscribers.add(subscriber)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='leaderboard-stream',
+                                                daemon=True)
+                self._thread.start()
+            return True
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self.subscribers.discard(subscriber)
+
+    def events(self, subscriber):
+        """The SSE body for ``subscriber``; it is only registered while the
+        body is being iterated, so a response never sent (HEAD, a client
+        gone before the first chunk) leaves nothing behind"""
+        try:
+            yield f'retry: {RETRY_MS}\n\n'
+            if not self._register(subscriber):
+                # Full after all: the browser reconnects after ``retry``
+                return
+            while True:
+                event = subscriber.wait(self.heartbeat)
+                if event is CLOSED:
+                    return
+                yield event if event is not None else ': ping\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+
+    def _current_version(self):
+        # Newest score id in each score database (src/score_shards.py)
+        return tuple(result.scalar() for _, result in
+                     score_shards.fan_out(db.select(func.max(GameScore.id))))
+
+    def _changed(self):
+        """Whether scores may have changed since the last refresh"""
+        if self._watch.bus is not None:
+            return self._watch.due(self._refreshed_at)
+        return self._current_version() != self._last_seen
+
+    def _refresh(self):
+        """Recompute the boards; return the games whose list changed.
+
+        The queries run without ``_lock``, which subscribers and the
+        publisher take, and only the result is swapped in under it.
+        """
+        self._watch.start()
+        last_seen = self._current_version() if self._watch.bus is None else None
+        refreshed_at = time.monotonic()
+        boards = leaderboards()
+        with self._lock:
+            self._last_seen = last_seen
+            self._refreshed_at = refreshed_at
+            previous = self.boards or {}
+            changed = {game: board for game, board in boards.items()
+                       if previous.get(game) != board}
+            self.boards = boards
+            if changed:
+                self.version += 1
+        return changed
+
+    def _run(self):
+        while True:
+            self._dirty.wait(self.interval)
+            self._dirty.clear()
+            if not self.subscribers:
+                continue
+            try:
+                with self.app.app_context():
+                    changed = None
+                    if self._changed():
+                        changed = self._refresh()
+            except Exception:
+                self.app.logger.exception('leaderboard stream refresh failed')
+                continue
+            if changed:
+                self._publish(sse_event('leaderboard', {'version': self.version, 'games': changed},
+                                        self.version))
+
+    def _publish(self, event):
+        with self._lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            if not subscriber.push(event):
+                # Slow consumer: drop it, the browser reconnects to a snapshot
+                self.unsubscribe(subscriber)
@@ -3,44 +3,194 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
-from flask_cors import CORS
-from src.models.user import db
-from src.routes.user import user_bp
-from src.routes.games import games_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'fallback-key')
-
-# Enable CORS for all routes
-CORS(app)
-
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(games_bp, url_prefix='/api/games')
-
-
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-   db.create_all()
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
+from flask import Flask
+
+STATIC_FOLDER = os.path.join(os.path.dirname(__file__), 'static')
+# Output of src.tools.build_static, served when it has been built
+DIST_FOLDER = os.path.join(os.path.dirname(__file__), 'static_dist')
+
+
+def env_flag(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def default_config():
+    """Configuration read from the environment"""
+    return {
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'fallback-key'),
+        'SQLALCHEMY_DATABASE_URI': os.environ.get('DATABASE_URL'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        # Optional read replica for leaderboard/best-score reads (src/models/session.py)
+        'SQLALCHEMY_BINDS': (
+            {'replica': os.environ['DATABASE_REPLICA_URL']}
+            if os.environ.get('DATABASE_REPLICA_URL') else {}),
+        'DB_REPLICA_PIN_SECONDS': float(os.environ.get('DB_REPLICA_PIN_SECONDS', 5)),
+        # SQLite only: one scores_<game_type>.db per game in this directory
+        # (src/score_shards.py; split app.db first with src.tools.reshard_scores)
+        'SCORE_SHARD_DIR': os.environ.get('SCORE_SHARD_DIR'),
+        # WAL/pragmas on SQLite, sized pool on PostgreSQL (see src/engine.py)
+        'DB_ENGINE_TUNING': env_flag('DB_ENGINE_TUNING', True),
+        'DB_POOL_SIZE': int(os.environ['DB_POOL_SIZE']) if os.environ.get('DB_POOL_SIZE') else None,
+        'WEB_THREADS': int(os.environ.get('GUNICORN_THREADS', 8)),
+        # Gzip large dynamic responses (leaderboards, user lists, big memory boards)
+        'COMPRESS_LEVEL': int(os.environ.get('COMPRESS_LEVEL', 6)),
+        'COMPRESS_MIN_SIZE': int(os.environ.get('COMPRESS_MIN_SIZE', 256)),
+        'STATIC_DIR': os.environ.get('STATIC_DIR') or (
+            DIST_FOLDER if os.path.isdir(DIST_FOLDER) else STATIC_FOLDER),
+        'STATIC_WATCH': env_flag('STATIC_WATCH'),
+        # Shared generation counters telling every worker on the host when
+        # scores or players changed (src/cache_bus.py); with it the caches
+        # below skip their *_REFRESH polls and re-check only on a change or
+        # every CACHE_BUS_MAX_AGE seconds
+        'CACHE_BUS': env_flag('CACHE_BUS', True),
+        'CACHE_BUS_PATH': os.environ.get('CACHE_BUS_PATH'),
+        'CACHE_BUS_MAX_AGE': float(os.environ.get('CACHE_BUS_MAX_AGE', 60)),
+        # /api/leaderboard/stream: change poll interval, idle heartbeat and
+        # open streams allowed per worker (src/leaderboard_stream.py), at
+        # most half of WEB_THREADS; off with a single thread
+        'LEADERBOARD_STREAM_INTERVAL': float(os.environ.get('LEADERBOARD_STREAM_INTERVAL', 1)),
+        'LEADERBOARD_STREAM_HEARTBEAT': float(os.environ.get('LEADERBOARD_STREAM_HEARTBEAT', 15)),
+        'LEADERBOARD_STREAM_MAX_SUBSCRIBERS': int(
+            os.environ.get('LEADERBOARD_STREAM_MAX_SUBSCRIBERS', 100)),
+        # Seconds between catch-ups of the player name index with the database
+        'PLAYER_INDEX_REFRESH': float(os.environ.get('PLAYER_INDEX_REFRESH', 2)),
+        # Score distributions behind /api/stats (src/score_stats.py): seconds
+        # between catch-ups with game_score and between saves
+        'SCORE_STATS_REFRESH': float(os.environ.get('SCORE_STATS_REFRESH', 2)),
+        'SCORE_STATS_PERSIST_INTERVAL': float(os.environ.get('SCORE_STATS_PERSIST_INTERVAL', 60)),
+        # /api/admin is only served when ADMIN_TOKEN is set (X-Admin-Token header)
+        'ADMIN_TOKEN': os.environ.get('ADMIN_TOKEN'),
+        # Columnar NumPy copy of game_score for admin analytics (src/score_columns.py)
+        'ANALYTICS_CACHE': env_flag('ANALYTICS_CACHE'),
+        'ANALYTICS_CACHE_REFRESH': float(os.environ.get('ANALYTICS_CACHE_REFRESH', 5)),
+        # Multiplayer snake arenas: tick period, grid side and snakes per arena
+        'SNAKE_ARENA_TICK_MS': int(os.environ.get('SNAKE_ARENA_TICK_MS', 150)),
+        'SNAKE_ARENA_GRID_SIZE': int(os.environ.get('SNAKE_ARENA_GRID_SIZE', 48)),
+        'SNAKE_ARENA_MAX_PLAYERS': int(os.environ.get('SNAKE_ARENA_MAX_PLAYERS', 16)),
+        # Embed the /api/bootstrap payload in index.html (src/bootstrap.py)
+        'BOOTSTRAP_INLINE': env_flag('BOOTSTRAP_INLINE'),
+        # Directory for in-flight game snapshots across restarts (off when unset)
+        'GAME_SNAPSHOT_DIR': os.environ.get('GAME_SNAPSHOT_DIR'),
+        'GAME_SNAPSHOT_INTERVAL': float(os.environ.get('GAME_SNAPSHOT_INTERVAL', 0)),
+        # Most actions accepted by one /api/games/batch request
+        'GAME_BATCH_MAX_ACTIONS': int(os.environ.get('GAME_BATCH_MAX_ACTIONS', 100)),
+        # Lifetime of stateless number-guess / tic-tac-toe tokens (src/game_tokens.py)
+        'GAME_TOKEN_MAX_AGE': int(os.environ.get('GAME_TOKEN_MAX_AGE', 3600)),
+        # Schema creation belongs to `flask init-db`; only the dev server opts in
+        'AUTO_CREATE_TABLES': env_flag('AUTO_CREATE_TABLES'),
+    }
+
+
+def create_app(config=None):
+    """Build the Flask app.
+
+    ``config`` (a dict) overrides the environment defaults. Extensions and
+    blueprints are imported here rather than at module level so importing
+    this module stays cheap, and the database is not touched unless
+    ``AUTO_CREATE_TABLES`` is set.
+    """
+    from flask_cors import CORS
+    from src.models.user import db
+    from src.routes.user import user_bp
+    from src.routes.games import games_bp, game_sessions
+    from src.routes.admin import admin_bp
+    from src.static_index import StaticIndex
+    from src.compression import Compress
+    from src.cli import register_commands
+    from src.engine import apply_engine_options, configure_engines
+    from src.bootstrap import index_with_state
+    from src.leaderboard_stream import LeaderboardStream
+    from src.snake_arena import ArenaManager
+    from src.player_index import PlayerNameIndex
+    from src.score_stats import ScoreStats
+    from src import score_shards
+
+    app = Flask(__name__, static_folder=STATIC_FOLDER)
+    app.config.update(default_config())
+    if config:
+        app.config.update(config)
+
+    # Enable CORS for all routes
+    CORS(app)
+    Compress(app)
+
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(games_bp, url_prefix='/api/games')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+
+    score_shards.configure(app)
+    apply_engine_options(app)
+    db.init_app(app)
+    configure_engines(app, db)
+    register_commands(app)
+    if app.config['AUTO_CREATE_TABLES']:
+        with app.app_context():
+            db.create_all()
+            score_shards.create_tables()
+
+    if app.config['CACHE_BUS']:
+        from src.cache_bus import CacheBus, default_path
+        try:
+            CacheBus(app, app.config['CACHE_BUS_PATH'] or
+                     default_path(app.config['SQLALCHEMY_DATABASE_URI']),
+                     app.config['CACHE_BUS_MAX_AGE'])
+        except OSError as error:
+            app.logger.warning('Cache bus unavailable (%s); caches will poll the database',
+                               error)
+
+    # Each open stream holds a request thread for good
+    LeaderboardStream(app, app.config['LEADERBOARD_STREAM_INTERVAL'],
+                      app.config['LEADERBOARD_STREAM_HEARTBEAT'],
+                      min(app.config['LEADERBOARD_STREAM_MAX_SUBSCRIBERS'],
+                          app.config['WEB_THREADS'] // 2))
+
+    PlayerNameIndex(app, app.config['PLAYER_INDEX_REFRESH'])
+    if app.config['ANALYTICS_CACHE']:
+        from src.score_columns import ScoreColumns, np
+        if np is None:
+            app.logger.warning('ANALYTICS_CACHE is set but NumPy is not installed; '
+                               'admin analytics will use SQL')
         else:
+            ScoreColumns(app, app.config['ANALYTICS_CACHE_REFRESH'])
+    ScoreStats(app, app.config['SCORE_STATS_REFRESH'], app.config['SCORE_STATS_PERSIST_INTERVAL'])
+
+    app.extensions['snake_arenas'] = ArenaManager(app.config['SNAKE_ARENA_TICK_MS'] / 1000,
+                                                  app.config['SNAKE_ARENA_GRID_SIZE'],
+                                                  app.config['SNAKE_ARENA_MAX_PLAYERS'])
+
+    if app.config['GAME_SNAPSHOT_DIR']:
+        from src.game_snapshot import GameSnapshots
+        GameSnapshots(app, game_sessions, app.config['GAME_SNAPSHOT_DIR'],
+                      app.config['GAME_SNAPSHOT_INTERVAL'])
+
+    # Index the static folder once so the catch-all never stats the filesystem
+    static_index = StaticIndex(app.config['STATIC_DIR'], watch=app.config['STATIC_WATCH'])
+    app.extensions['static_index'] = static_index
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        entry = static_index.lookup(path)
+        if entry is None:
             return "index.html not found", 404
+        if entry is static_index.index_entry and app.config['BOOTSTRAP_INLINE']:
+            return index_with_state(entry)
+        return static_index.respond(entry)
+
+    return app
+
+
+def __getattr__(name):
+    # `from src.main import app` keeps working; the app is built on first use
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    create_app({'AUTO_CREATE_TABLES': True}).run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,66 @@
+import functools
+import time
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# Bind key of the read replica in SQLALCHEMY_BINDS
+REPLICA_BIND = 'replica'
+
+# Cookie-session key holding the time until which reads stay on the primary
+PRIMARY_UNTIL_KEY = 'db_primary_until'
+
+# Session.info key set once an INSERT/UPDATE/DELETE ran through the session
+WROTE_KEY = 'wrote'
+
+
+class RoutingSession(Session):
+    """Session that sends reads of read-only endpoints to the replica.
+
+    Anything that would go to the default (primary) engine is redirected to
+    the ``replica`` bind when the current request was marked with
+    :func:`replica_read`, nothing has been written in this session (pending
+    ORM changes, or any INSERT/UPDATE/DELETE executed through it, even
+    committed since), and the client is not pinned to the primary after a
+    recent write.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or self._flushing or self.new or self.dirty or self.deleted:
+            return engine
+        if self.info.get(WROTE_KEY):
+            return engine
+        if not has_request_context() or not g.get('read_replica'):
+            return engine
+        engines = self._db.engines
+        if REPLICA_BIND in engines and engine is engines.get(None):
+            return engines[REPLICA_BIND]
+        return engine
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _note_writes(state):
+    # Runs before the statement's bind is chosen, so the DML itself and
+    # every later read of this session (one per request) use the primary
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info[WROTE_KEY] = True
+
+
+def replica_read(view):
+    """Serve this view's queries from the read replica when one is configured"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if session.get(PRIMARY_UNTIL_KEY, 0) < time.time():
+            g.read_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def pin_to_primary():
+    """Keep this client's reads on the primary for DB_REPLICA_PIN_SECONDS so it
+    sees its own writes despite replication lag"""
+    if REPLICA_BIND not in (current_app.config.get('SQLALCHEMY_BINDS') or {}):
+        return
+    session[PRIMARY_UNTIL_KEY] = time.time() + current_app.config.get('DB_REPLICA_PIN_SECONDS', 5)
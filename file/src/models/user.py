@@ -1,7 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from src.models.session import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -37,6 +38,10 @@ class Player(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+# Names are unique regardless of letter case; also serves the lookups that
+# keep src/player_index.py in sync
+db.Index('ix_player_name_lower', db.func.lower(Player.name), unique=True)
+
 class GameScore(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
@@ -60,3 +65,22 @@ class GameScore(db.Model):
             'difficulty': self.difficulty,
             'created_at': self.created_at.isoformat()
         }
+
+class ScoreSketch(db.Model):
+    """Saved score distribution for one game type and difficulty, covering
+    every score up to ``last_score_id`` (see src/score_stats.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    game_type = db.Column(db.String(50), nullable=False)
+    difficulty = db.Column(db.String(20), nullable=False)
+    last_score_id = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('game_type', 'difficulty'),)
+
+class GameTokenMove(db.Model):
+    """Next move expected from a stateless game (src/game_tokens.py); the row
+    outlives the game's last token by at most GAME_TOKEN_MAX_AGE"""
+    nonce = db.Column(db.LargeBinary(8), primary_key=True)
+    move = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.Integer, nullable=False, index=True)
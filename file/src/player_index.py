@@ -0,0 +1,214 @@
+"""In-memory sorted index of player names for search and availability.
+
+/api/players/search (autocomplete) and /api/players/available are asked on
+every keystroke, so they are answered from two parallel sorted lists held
+by each worker: lower-cased names and the names as registered. A prefix
+search is a bisect plus a short scan, O(log n + limit), which stays well
+under a millisecond with millions of players; a few bytes per name beyond
+the strings themselves is the whole cost.
+
+Gunicorn's preloading master loads every name before forking (``warm()``,
+about three seconds per million players) so workers share the lists;
+otherwise the first lookup starts that load in a background thread, with
+lookups answered from the ``lower(name)`` index until it is ready. After that the index catches up with one ``id > last seen``
+primary key range query once another process bumps the ``players``
+generation of the cache bus (src/cache_bus.py), or at most every
+``refresh`` seconds without the bus, which picks up players registered
+through other workers. Registrations in this worker are added
+immediately. Deleted players cannot be caught up with that way: deleting
+bumps the ``player_deletes`` generation as well, and an index that sees it
+move (or whose worker did the deleting, see ``removed()``) loads every
+name again in the background, answering from its old lists meanwhile.
+Without the bus only the deleting worker reloads, and registration checks
+a name the index calls taken against the database before refusing it.
+Names are unique case-insensitively, enforced by the
+``ix_player_name_lower`` index on ``lower(name)``, so an answer from a
+slightly stale index can never let a duplicate in; it only means the
+insert is the one that reports the name as taken. The index folds names
+exactly as that ``lower()`` does (``name_key``), which on SQLite means ASCII
+letters only.
+"""
+import bisect
+import string
+import threading
+import time
+
+from src.cache_bus import Watch
+from src.engine import backend_name
+from src.models.user import Player, db
+
+# Catch-ups bringing more new players than this re-sort the whole index
+BULK_MERGE = 1000
+
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+def name_key(name, backend):
+    """``name`` folded the way ``lower(name)``, and so the
+    ix_player_name_lower index, folds it on ``backend``: SQLite's built-in
+    lower() only knows ASCII letters ("ÉMILE" becomes "Émile"), the other
+    databases fold all of Unicode"""
+    if backend == 'sqlite':
+        return name.translate(ASCII_LOWER)
+    return name.lower()
+
+
+class PlayerNameIndex:
+    """Per-process sorted player names, kept in sync with the database"""
+
+    def __init__(self, app, refresh=2.0):
+        self.app = app
+        self.refresh = refresh
+        self.backend = backend_name(app.config.get('SQLALCHEMY_DATABASE_URI'))
+        self._watch = Watch(app, 'players', refresh)
+        self._deletes_seen = None
+        self._reload = False
+        self._keys = []
+        self._names = []
+        self._last_id = 0
+        self._synced_at = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._loader = None
+        self._loader_lock = threading.Lock()
+        app.extensions['player_index'] = self
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _insert(self, name):
+        """Add ``name`` unless already present; caller holds ``_lock``"""
+        key = name_key(name, self.backend)
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return
+        self._keys.insert(i, key)
+        self._names.insert(i, name)
+
+    @property
+    def loaded(self):
+        return self._synced_at is not None
+
+    def warm(self):
+        """Load every name now (called in the preloading master)"""
+        self.sync(force=True)
+
+    def _deletes(self):
+        bus = self._watch.bus
+        return bus.generation('player_deletes') if bus is not None else None
+
+    def _fetch(self, full=False):
+        full = full or not self.loaded
+        self._watch.start()
+        if full:
+            # Deletions from here on trigger another reload
+            self._reload = False
+            self._deletes_seen = self._deletes()
+        rows = db.session.execute(
+            db.select(Player.id, Player.name)
+            .where(Player.id > (0 if full else self._last_id))
+            .order_by(Player.id)).all()
+        with self._lock:
+            if full and self.loaded:
+                # Reload: start over so deleted names disappear
+                names = {name_key(name, self.backend): name for _, name in rows}
+                self._keys = sorted(names)
+                self._names = [names[key] for key in self._keys]
+            elif not self.loaded or len(rows) > BULK_MERGE:
+                # First load or a bulk import: one sort instead of n
+                # insertions (keeping any names registered while it ran)
+                names = dict(zip(self._keys, self._names))
+                names.update((name_key(name, self.backend), name) for _, name in rows)
+                self._keys = sorted(names)
+                self._names = [names[key] for key in self._keys]
+            else:
+                for _, name in rows:
+                    self._insert(name)
+        if rows:
+            self._last_id = rows[-1][0]
+        elif full:
+            self._last_id = 0
+        self._synced_at = time.monotonic()
+
+    def _load(self):
+        try:
+            with self.app.app_context(), self._sync_lock:
+                self._fetch(full=True)
+        finally:
+            # Let the next lookup start another load (the first one failed
+            # or players were deleted meanwhile)
+            self._loader = None
+
+    def _start_loader(self):
+        with self._loader_lock:
+            if self._loader is None:
+                self._loader = threading.Thread(target=self._load, name='player-index',
+                                                daemon=True)
+                self._loader.start()
+
+    def removed(self):
+        """Players were deleted by this worker; reload every name (others
+        do once they see the ``player_deletes`` bump)"""
+        self._reload = True
+
+    def sync(self, force=False):
+        """Catch up with players added to the database since the last sync.
+
+        The first call starts the full load in a background thread and
+        returns False (answer from the database meanwhile); later calls
+        fetch only new rows once players changed (or ``refresh`` passed),
+        and return True; after deletions they also start a full reload in
+        the background. ``force`` loads or catches up right away.
+        """
+        if not self.loaded and not force:
+            self._start_loader()
+            return self.loaded
+        if self._reload or self._deletes() != self._deletes_seen:
+            self._start_loader()
+        if not force and not self._watch.due(self._synced_at):
+            return True
+        # Whoever holds the lock is already catching up; serve what we have
+        if self._sync_lock.acquire(blocking=force):
+            try:
+                if force or self._watch.due(self._synced_at):
+                    self._fetch()
+            finally:
+                self._sync_lock.release()
+        return True
+
+    def add(self, name):
+        """Record a player registered by this worker"""
+        with self._lock:
+            self._insert(name)
+
+    def search(self, prefix, limit=10):
+        """Up to ``limit`` registered names starting with ``prefix``
+        (case-insensitive), in alphabetical order"""
+        key = name_key(prefix, self.backend)
+        if not self.sync():
+            lowered = db.func.lower(Player.name)
+            return list(db.session.scalars(
+                db.select(Player.name).where(lowered.startswith(key, autoescape=True))
+                .order_by(lowered).limit(limit)))
+        with self._lock:
+            i = bisect.bisect_left(self._keys, key)
+            matches = []
+            while i < len(self._keys) and len(matches) < limit and self._keys[i].startswith(key):
+                matches.append(self._names[i])
+                i += 1
+        return matches
+
+    def available(self, name, confirm=False):
+        """False if ``name`` (in any letter case) is taken. ``confirm``
+        checks a "taken" answer against the database, for callers that must
+        not refuse a name whose player was deleted by another process the
+        index has not heard of (no cache bus)"""
+        key = name_key(name, self.backend)
+        if self.sync():
+            with self._lock:
+                i = bisect.bisect_left(self._keys, key)
+                if not (i < len(self._keys) and self._keys[i] == key):
+                    return True
+            if not confirm:
+                return False
+        return db.session.scalar(
+            db.select(Player.id).where(db.func.lower(Player.name) == key).limit(1)) is None
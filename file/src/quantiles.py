@@ -0,0 +1,180 @@
+"""Mergeable summaries of a stream of scores: a KLL quantile sketch and an
+adaptive histogram.
+
+KLLSketch (Karnin, Lang, Liberty 2016) keeps a stack of compactors. Level h
+holds items that each stand for 2**h scores; when a level is full it is
+sorted and every other item (odd or even positions, chosen at random) moves
+up a level. Adding a score is amortised O(1) and the sketch holds
+O(k log(n / k)) items. Rank queries are off by at most about 1.7% of the
+count with k=200 (99% confidence; under 1% in practice, see
+src/benchmarks/bench_quantiles.py). Up to k scores it is exact.
+
+Histogram counts scores per bucket of ``width`` points. It starts exact
+(width 1) and doubles the width whenever it would exceed ``max_buckets``,
+so it stays small for any score range.
+
+Both merge with another summary of the same kind and round-trip through
+``to_dict`` / ``from_dict`` (plain JSON).
+"""
+import collections
+import math
+import random
+
+# Compactor size at the top level; each level below is ``C`` times smaller
+DEFAULT_K = 200
+C = 2 / 3
+
+# Normalised rank error bound at 99% confidence for DEFAULT_K (from the KLL
+# error analysis as tabulated by Apache DataSketches)
+RANK_ERROR = 0.017
+
+
+class KLLSketch:
+    """Approximate quantiles over a stream of numbers"""
+
+    def __init__(self, k=DEFAULT_K, rng=None):
+        self.k = k
+        self.levels = [[]]
+        self.count = 0
+        self.min = None
+        self.max = None
+        self._size = 0
+        self._max_size = self._capacity(0)
+        self._rng = rng or random.Random()
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return int(math.ceil(self.k * C ** depth)) + 1
+
+    def _grow(self):
+        self.levels.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def add(self, value):
+        self.levels[0].append(value)
+        self._size += 1
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self):
+        for h, level in enumerate(self.levels):
+            if len(level) >= self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self._grow()
+                level.sort()
+                # An odd item out stays behind at this level
+                keep = [level.pop()] if len(level) % 2 else []
+                self.levels[h + 1].extend(level[self._rng.randrange(2)::2])
+                self.levels[h] = keep
+                break
+        self._size = sum(len(level) for level in self.levels)
+
+    def merge(self, other):
+        """Fold ``other`` into this sketch"""
+        while len(self.levels) < len(other.levels):
+            self._grow()
+        for h, level in enumerate(other.levels):
+            self.levels[h].extend(level)
+        self.count += other.count
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self._size = sum(len(level) for level in self.levels)
+        while self._size >= self._max_size:
+            self._compress()
+        return self
+
+    @property
+    def exact(self):
+        """True until the first compaction: every score is still held"""
+        return self._size == self.count
+
+    def rank(self, value):
+        """Estimated number of scores strictly below ``value``"""
+        return sum(sum(1 for item in level if item < value) << h
+                   for h, level in enumerate(self.levels))
+
+    def fraction_below(self, value):
+        return self.rank(value) / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """Estimated score at fraction ``q`` (0..1) of the way up"""
+        if not self.count:
+            return None
+        weighted = sorted((item, 1 << h) for h, level in enumerate(self.levels)
+                          for item in level)
+        total = sum(weight for _, weight in weighted)
+        target = q * total
+        seen = 0
+        for item, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return item
+        return weighted[-1][0]
+
+    def to_dict(self):
+        return {'k': self.k, 'count': self.count, 'min': self.min, 'max': self.max,
+                'levels': self.levels}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['k'])
+        sketch.levels = [list(level) for level in data['levels']] or [[]]
+        sketch.count = data['count']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        sketch._size = sum(len(level) for level in sketch.levels)
+        sketch._max_size = sum(sketch._capacity(h) for h in range(len(sketch.levels)))
+        return sketch
+
+
+class Histogram:
+    """Score counts per bucket of ``width`` points, at most ``max_buckets``"""
+
+    def __init__(self, max_buckets=64, width=1):
+        self.max_buckets = max_buckets
+        self.width = width
+        self.counts = collections.Counter()
+
+    def add(self, value, count=1):
+        self.counts[int(value) // self.width] += count
+        if len(self.counts) > self.max_buckets:
+            self._coarsen(self.width * 2)
+
+    def _coarsen(self, width):
+        while self.width < width or len(self.counts) > self.max_buckets:
+            self.width *= 2
+            merged = collections.Counter()
+            for bucket, count in self.counts.items():
+                merged[bucket // 2] += count
+            self.counts = merged
+
+    def merge(self, other):
+        if other.width > self.width:
+            self._coarsen(other.width)
+        factor = self.width // other.width
+        for bucket, count in other.counts.items():
+            self.counts[bucket // factor] += count
+        if len(self.counts) > self.max_buckets:
+            self._coarsen(self.width * 2)
+        return self
+
+    def buckets(self):
+        """[{'min', 'max', 'count'}] in score order; ``max`` is inclusive"""
+        return [{'min': bucket * self.width, 'max': (bucket + 1) * self.width - 1, 'count': count}
+                for bucket, count in sorted(self.counts.items())]
+
+    def to_dict(self):
+        return {'width': self.width, 'max_buckets': self.max_buckets,
+                'counts': [[bucket, count] for bucket, count in sorted(self.counts.items())]}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data['max_buckets'], data['width'])
+        histogram.counts.update({bucket: count for bucket, count in data['counts']})
+        return histogram
@@ -0,0 +1,113 @@
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from src import analytics, bulk_import, exports
+from src.models.session import replica_read
+import functools
+import hmac
+import io
+
+admin_bp = Blueprint('admin', __name__)
+
+def admin_required(view):
+    """Allow only requests carrying the configured ADMIN_TOKEN in the
+    X-Admin-Token header; without a token the admin API does not exist"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get('ADMIN_TOKEN')
+        if not token:
+            return jsonify({'error': 'Not found'}), 404
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+            return jsonify({'error': 'Admin token required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def report(name, **params):
+    """Run an analytics report on the columnar cache when it is enabled"""
+    cache = current_app.extensions.get('score_columns')
+    return jsonify({
+        'source': 'cache' if cache is not None else 'sql',
+        'report': analytics.run(name, cache, **params)
+    })
+
+def days_param(default):
+    return max(1, min(request.args.get('days', default, type=int), 366))
+
+@admin_bp.route('/analytics/games', methods=['GET'])
+@admin_required
+def analytics_games():
+    """Games played, players and points per game type"""
+    return report('games')
+
+@admin_bp.route('/analytics/difficulty/<game_type>', methods=['GET'])
+@admin_required
+def analytics_difficulty(game_type):
+    """Per-difficulty averages for a game and their daily trend"""
+    return report('difficulty', game_type=game_type, days=days_param(30))
+
+@admin_bp.route('/analytics/daily', methods=['GET'])
+@admin_required
+def analytics_daily():
+    """Games played and active players per day"""
+    return report('daily', days=days_param(30))
+
+@admin_bp.route('/analytics/movers', methods=['GET'])
+@admin_required
+def analytics_movers():
+    """Players whose points grew most in the last ?days= versus the period before"""
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    return report('movers', days=days_param(7), limit=limit,
+                  game_type=request.args.get('game_type'))
+
+# Streaming exports (src/exports.py): ?format=ndjson|csv, ?since= and
+# ?until= ISO dates (until exclusive)
+def export(name, build, **filters):
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in exports.FORMATS:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    try:
+        data = build(since=exports.parse_time(request.args.get('since'), 'since'),
+                     until=exports.parse_time(request.args.get('until'), 'until'),
+                     **filters)
+    except exports.ExportError as e:
+        return jsonify({'error': str(e)}), 400
+
+    response = Response(stream_with_context(exports.stream(data, fmt)),
+                        mimetype=exports.FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{fmt}'
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@admin_bp.route('/export/scores', methods=['GET'])
+@admin_required
+@replica_read
+def export_scores():
+    """Every score, optionally only ?game_type= and ?player_id="""
+    return export('scores', exports.score_export,
+                  game_type=request.args.get('game_type'),
+                  player_id=request.args.get('player_id', type=int))
+
+@admin_bp.route('/export/players', methods=['GET'])
+@admin_required
+@replica_read
+def export_players():
+    """Every player (id, name, created_at)"""
+    return export('players', exports.player_export)
+
+# Bulk import (src/bulk_import.py): an NDJSON or CSV body, ?skip= to resume
+# after the line a previous import committed through
+@admin_bp.route('/import/<kind>', methods=['POST'])
+@admin_required
+def import_records(kind):
+    """Import players or users in bulk"""
+    fmt = request.args.get('format')
+    if fmt is None:
+        fmt = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    try:
+        report = bulk_import.run(kind, lines, fmt, skip=request.args.get('skip', 0, type=int))
+    except bulk_import.BulkImportError as e:
+        return jsonify({'error': str(e)}), 400
+    except UnicodeDecodeError:
+        return jsonify({'error': 'The body must be UTF-8'}), 400
+    # A failed chunk stops the import; the report says where to resume
+    return jsonify(report), 200 if report['failed_chunk'] is None else 500
@@ -1,44 +1,113 @@
-from flask import Blueprint, jsonify, request, session
-import random
+from flask import Blueprint, current_app, jsonify, request, session
+from src.compression import skip_compression
+from src.game_actions import get_action
+from src.game_engine import (OPPOSITE_DIRECTIONS, GameError, final_score, flip_card,
+                             guess_number, hide_cards, new_memory, new_number_guess,
+                             new_snake, new_tictactoe, play_rps_round, rps_score,
+                             step_snake, tictactoe_move)
+from src.game_store import GameStore
+from src.game_tokens import GameTokenCodec, InvalidGameToken
+from src.scores import record_result
+import time
 import uuid
 
 games_bp = Blueprint('games', __name__)
 
 # Game sessions storage (in production, use Redis or database)
-game_sessions = {}
+game_sessions = GameStore()
+
+def game_tokens():
+    """The app's stateless game token codec (see src/game_tokens.py)"""
+    codec = current_app.extensions.get('game_tokens')
+    if codec is None:
+        codec = GameTokenCodec(current_app.config['SECRET_KEY'],
+                               current_app.config.get('GAME_TOKEN_MAX_AGE', 3600))
+        current_app.extensions['game_tokens'] = codec
+    return codec
+
+def finish(game_type, score, result):
+    """Record ``score`` (the ``final_score`` of the game after the move, None
+    while it goes on) and add the player's updated best/total/rank to
+    ``result`` (logged-in players only)"""
+    standing = record_result(game_type, score)
+    if standing:
+        result['standing'] = standing
+    return result
+
+def play_stored(game_id, move):
+    """Apply ``move`` to the stored game ``game_id`` under its lock, so
+    requests for the same game (double clicks, overlapping snake ticks)
+    cannot interleave. The score of a move that ends the game is taken
+    under the lock and recorded after it is released: a finished game no
+    longer changes, and a slow commit must not hold up the other games on
+    the same lock stripe."""
+    if not isinstance(game_id, str):
+        return jsonify({'error': 'Game not found'}), 404
+    with game_sessions.lock(game_id):
+        game = game_sessions.get(game_id)
+        if game is None:
+            return jsonify({'error': 'Game not found'}), 404
+        try:
+            result = move(game)
+        except GameError as e:
+            return jsonify({'error': e.message}), e.status
+        score = final_score(game)
+        if score is None:
+            return jsonify(result)
+    return jsonify(finish(game['type'], score, result))
+
+def play_stateless(token, kind, action):
+    """Apply ``action`` to the state carried in ``token`` and hand back the
+    result with a fresh token while the game is still active"""
+    codec = game_tokens()
+    try:
+        game, spend_key = codec.loads(token, kind)
+    except InvalidGameToken as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # ``game`` is this request's own copy: a rejected move spends nothing
+    try:
+        result = action(game)
+    except GameError as e:
+        return jsonify({'error': e.message}), e.status
+    if not codec.claim(spend_key):
+        return jsonify({'error': 'Game token already used'}), 409
+    try:
+        result = finish(game['type'], final_score(game), result)
+    except Exception:
+        # The move did not count; the same token may be sent again
+        codec.release(spend_key)
+        raise
+    
+    if game['status'] == 'active':
+        result['token'] = codec.dumps(game)
+    return jsonify(result)
 
 @games_bp.route('/number-guess/start', methods=['POST'])
 def start_number_guess():
     """Start a new number guessing game"""
-    game_id = str(uuid.uuid4())
-    difficulty = request.json.get('difficulty', 'medium')
-    
-    # Set range based on difficulty
-    ranges = {
-        'easy': (1, 50),
-        'medium': (1, 100),
-        'hard': (1, 200)
-    }
-    min_num, max_num = ranges.get(difficulty, (1, 100))
-    
-    game_sessions[game_id] = {
-        'type': 'number_guess',
-        'target': random.randint(min_num, max_num),
-        'min': min_num,
-        'max': max_num,
-        'attempts': 0,
-        'max_attempts': 10,
-        'difficulty': difficulty,
-        'status': 'active'
+    data = request.json
+    difficulty = data.get('difficulty', 'medium')
+    try:
+        game = new_number_guess(difficulty)
+    except GameError as e:
+        return jsonify({'error': e.message}), e.status
+    
+    response = {
+        'min': game['min'],
+        'max': game['max'],
+        'max_attempts': game['max_attempts'],
+        'difficulty': difficulty
     }
+    if data.get('stateless'):
+        # The client carries the whole (encrypted, signed) state
+        response['token'] = game_tokens().dumps(game)
+    else:
+        game_id = str(uuid.uuid4())
+        game_sessions[game_id] = game
+        response['game_id'] = game_id
     
-    return jsonify({
-        'game_id': game_id,
-        'min': min_num,
-        'max': max_num,
-        'max_attempts': 10,
-        'difficulty': difficulty
-    })
+    return jsonify(response)
 
 @games_bp.route('/number-guess/guess', methods=['POST'])
 def make_guess():
@@ -47,87 +116,44 @@ def make_guess():
     game_id = data.get('game_id')
     guess = data.get('guess')
     
-    if game_id not in game_sessions:
-        return jsonify({'error': 'Game not found'}), 404
-    
-    game = game_sessions[game_id]
-    if game['status'] != 'active':
-        return jsonify({'error': 'Game is not active'}), 400
-    
-    game['attempts'] += 1
-    target = game['target']
+    if data.get('token'):
+        return play_stateless(data['token'], 'number_guess', lambda game: guess_number(game, guess))
     
-    if guess == target:
-        game['status'] = 'won'
-        return jsonify({
-            'result': 'correct',
-            'attempts': game['attempts'],
-            'target': target,
-            'status': 'won'
-        })
-    elif game['attempts'] >= game['max_attempts']:
-        game['status'] = 'lost'
-        return jsonify({
-            'result': 'game_over',
-            'attempts': game['attempts'],
-            'target': target,
-            'status': 'lost'
-        })
-    else:
-        hint = 'higher' if guess < target else 'lower'
-        return jsonify({
-            'result': 'incorrect',
-            'hint': hint,
-            'attempts': game['attempts'],
-            'remaining': game['max_attempts'] - game['attempts']
-        })
+    return play_stored(game_id, lambda game: guess_number(game, guess))
 
 @games_bp.route('/rps/play', methods=['POST'])
 def play_rps():
     """Play Rock Paper Scissors"""
     data = request.json
-    player_choice = data.get('choice')
-    
-    choices = ['rock', 'paper', 'scissors']
-    if player_choice not in choices:
-        return jsonify({'error': 'Invalid choice'}), 400
-    
-    computer_choice = random.choice(choices)
     
-    # Determine winner
-    if player_choice == computer_choice:
-        result = 'tie'
-    elif (player_choice == 'rock' and computer_choice == 'scissors') or \
-         (player_choice == 'paper' and computer_choice == 'rock') or \
-         (player_choice == 'scissors' and computer_choice == 'paper'):
-        result = 'win'
-    else:
-        result = 'lose'
+    try:
+        result = play_rps_round(data.get('choice'))
+    except GameError as e:
+        return jsonify({'error': e.message}), e.status
     
-    return jsonify({
-        'player_choice': player_choice,
-        'computer_choice': computer_choice,
-        'result': result
-    })
+    standing = record_result('rps', rps_score(result))
+    if standing:
+        result['standing'] = standing
+    return jsonify(result)
 
 @games_bp.route('/tictactoe/start', methods=['POST'])
 def start_tictactoe():
     """Start a new Tic Tac Toe game"""
-    game_id = str(uuid.uuid4())
+    data = request.get_json(silent=True) or {}
+    game = new_tictactoe()
     
-    game_sessions[game_id] = {
-        'type': 'tictactoe',
-        'board': ['' for _ in range(9)],
-        'current_player': 'X',
-        'status': 'active',
-        'winner': None
+    response = {
+        'board': game['board'],
+        'current_player': 'X'
     }
+    if data.get('stateless'):
+        response['token'] = game_tokens().dumps(game)
+    else:
+        game_id = str(uuid.uuid4())
+        game_sessions[game_id] = game
+        response['game_id'] = game_id
     
-    return jsonify({
-        'game_id': game_id,
-        'board': game_sessions[game_id]['board'],
-        'current_player': 'X'
-    })
+    return jsonify(response)
 
 @games_bp.route('/tictactoe/move', methods=['POST'])
 def make_tictactoe_move():
@@ -136,144 +162,26 @@ def make_tictactoe_move():
     game_id = data.get('game_id')
     position = data.get('position')
     
-    if game_id not in game_sessions:
-        return jsonify({'error': 'Game not found'}), 404
-    
-    game = game_sessions[game_id]
-    if game['status'] != 'active':
-        return jsonify({'error': 'Game is not active'}), 400
-    
-    if game['board'][position] != '':
-        return jsonify({'error': 'Position already taken'}), 400
-    
-    # Player move
-    game['board'][position] = 'X'
-    
-    # Check for win or tie
-    winner = check_tictactoe_winner(game['board'])
-    if winner:
-        game['status'] = 'finished'
-        game['winner'] = winner
-        return jsonify({
-            'board': game['board'],
-            'status': 'finished',
-            'winner': winner
-        })
-    
-    if '' not in game['board']:
-        game['status'] = 'finished'
-        game['winner'] = 'tie'
-        return jsonify({
-            'board': game['board'],
-            'status': 'finished',
-            'winner': 'tie'
-        })
-    
-    # AI move
-    ai_position = get_ai_move(game['board'])
-    game['board'][ai_position] = 'O'
-    
-    # Check for win again
-    winner = check_tictactoe_winner(game['board'])
-    if winner:
-        game['status'] = 'finished'
-        game['winner'] = winner
-    elif '' not in game['board']:
-        game['status'] = 'finished'
-        game['winner'] = 'tie'
-    
-    return jsonify({
-        'board': game['board'],
-        'status': game['status'],
-        'winner': game.get('winner'),
-        'ai_move': ai_position
-    })
-
-def check_tictactoe_winner(board):
-    """Check for Tic Tac Toe winner"""
-    winning_combinations = [
-        [0, 1, 2], [3, 4, 5], [6, 7, 8],  # rows
-        [0, 3, 6], [1, 4, 7], [2, 5, 8],  # columns
-        [0, 4, 8], [2, 4, 6]              # diagonals
-    ]
-    
-    for combo in winning_combinations:
-        if board[combo[0]] == board[combo[1]] == board[combo[2]] != '':
-            return board[combo[0]]
-    return None
-
-def get_ai_move(board):
-    """Simple AI for Tic Tac Toe"""
-    # Try to win
-    for i in range(9):
-        if board[i] == '':
-            board[i] = 'O'
-            if check_tictactoe_winner(board) == 'O':
-                board[i] = ''
-                return i
-            board[i] = ''
-    
-    # Try to block player
-    for i in range(9):
-        if board[i] == '':
-            board[i] = 'X'
-            if check_tictactoe_winner(board) == 'X':
-                board[i] = ''
-                return i
-            board[i] = ''
-    
-    # Take center if available
-    if board[4] == '':
-        return 4
-    
-    # Take corners
-    corners = [0, 2, 6, 8]
-    available_corners = [i for i in corners if board[i] == '']
-    if available_corners:
-        return random.choice(available_corners)
+    if data.get('token'):
+        return play_stateless(data['token'], 'tictactoe', lambda game: tictactoe_move(game, position))
     
-    # Take any available space
-    available = [i for i in range(9) if board[i] == '']
-    return random.choice(available)
+    return play_stored(game_id, lambda game: tictactoe_move(game, position))
 
 @games_bp.route('/memory/start', methods=['POST'])
 def start_memory():
     """Start a new Memory Card game"""
     game_id = str(uuid.uuid4())
     difficulty = request.json.get('difficulty', 'medium')
-    
-    # Set grid size based on difficulty
-    grid_sizes = {
-        'easy': 4,    # 4x4 = 16 cards (8 pairs)
-        'medium': 6,  # 6x6 = 36 cards (18 pairs)
-        'hard': 8     # 8x8 = 64 cards (32 pairs)
-    }
-    grid_size = grid_sizes.get(difficulty, 6)
-    total_cards = grid_size * grid_size
-    pairs = total_cards // 2
-    
-    # Create card deck with pairs
-    cards = list(range(1, pairs + 1)) * 2
-    random.shuffle(cards)
-    
-    game_sessions[game_id] = {
-        'type': 'memory',
-        'cards': cards,
-        'revealed': [False] * total_cards,
-        'matched': [False] * total_cards,
-        'grid_size': grid_size,
-        'moves': 0,
-        'matches': 0,
-        'total_pairs': pairs,
-        'status': 'active',
-        'first_card': None,
-        'second_card': None
-    }
+    try:
+        game = new_memory(difficulty)
+    except GameError as e:
+        return jsonify({'error': e.message}), e.status
+    game_sessions[game_id] = game
     
     return jsonify({
         'game_id': game_id,
-        'grid_size': grid_size,
-        'total_pairs': pairs,
+        'grid_size': game['grid_size'],
+        'total_pairs': game['total_pairs'],
         'difficulty': difficulty
     })
 
@@ -281,197 +189,176 @@ def start_memory():
 def flip_memory_card():
     """Flip a card in Memory game"""
     data = request.json
-    game_id = data.get('game_id')
     card_index = data.get('card_index')
     
-    if game_id not in game_sessions:
-        return jsonify({'error': 'Game not found'}), 404
-    
-    game = game_sessions[game_id]
-    if game['status'] != 'active':
-        return jsonify({'error': 'Game is not active'}), 400
-    
-    if game['revealed'][card_index] or game['matched'][card_index]:
-        return jsonify({'error': 'Card already revealed or matched'}), 400
-    
-    # Flip the card
-    game['revealed'][card_index] = True
-    card_value = game['cards'][card_index]
-    
-    if game['first_card'] is None:
-        # First card of the pair
-        game['first_card'] = card_index
-        return jsonify({
-            'card_index': card_index,
-            'card_value': card_value,
-            'status': 'first_card',
-            'revealed': game['revealed']
-        })
-    else:
-        # Second card of the pair
-        game['second_card'] = card_index
-        game['moves'] += 1
-        
-        first_value = game['cards'][game['first_card']]
-        
-        if first_value == card_value:
-            # Match found
-            game['matched'][game['first_card']] = True
-            game['matched'][card_index] = True
-            game['matches'] += 1
-            
-            # Check if game is complete
-            if game['matches'] == game['total_pairs']:
-                game['status'] = 'completed'
-            
-            game['first_card'] = None
-            game['second_card'] = None
-            
-            return jsonify({
-                'card_index': card_index,
-                'card_value': card_value,
-                'status': 'match',
-                'moves': game['moves'],
-                'matches': game['matches'],
-                'game_status': game['status'],
-                'matched': game['matched'],
-                'revealed': game['revealed']
-            })
-        else:
-            # No match - cards will be hidden again
-            return jsonify({
-                'card_index': card_index,
-                'card_value': card_value,
-                'status': 'no_match',
-                'moves': game['moves'],
-                'first_card': game['first_card'],
-                'second_card': card_index,
-                'revealed': game['revealed']
-            })
+    return play_stored(data.get('game_id'), lambda game: flip_card(game, card_index))
 
 @games_bp.route('/memory/hide-cards', methods=['POST'])
 def hide_memory_cards():
     """Hide non-matching cards in Memory game"""
     data = request.json
-    game_id = data.get('game_id')
     
-    if game_id not in game_sessions:
-        return jsonify({'error': 'Game not found'}), 404
-    
-    game = game_sessions[game_id]
-    
-    if game['first_card'] is not None and game['second_card'] is not None:
-        # Hide the cards that didn't match
-        game['revealed'][game['first_card']] = False
-        game['revealed'][game['second_card']] = False
-        game['first_card'] = None
-        game['second_card'] = None
-    
-    return jsonify({
-        'revealed': game['revealed']
-    })
+    return play_stored(data.get('game_id'), hide_cards)
 
 @games_bp.route('/snake/start', methods=['POST'])
 def start_snake():
     """Start a new Snake game"""
     game_id = str(uuid.uuid4())
-    
-    game_sessions[game_id] = {
-        'type': 'snake',
-        'snake': [[10, 10]],  # Starting position
-        'direction': 'right',
-        'food': [15, 15],
-        'score': 0,
-        'status': 'active',
-        'grid_size': 20
-    }
+    game = new_snake()
+    game_sessions[game_id] = game
     
     return jsonify({
         'game_id': game_id,
-        'snake': game_sessions[game_id]['snake'],
-        'food': game_sessions[game_id]['food'],
+        'snake': game['snake'],
+        'food': game['food'],
         'score': 0,
-        'grid_size': 20
+        'grid_size': game['grid_size']
     })
 
 @games_bp.route('/snake/move', methods=['POST'])
+@skip_compression
 def move_snake():
     """Move snake and update game state"""
     data = request.json
-    game_id = data.get('game_id')
     direction = data.get('direction')
     
-    if game_id not in game_sessions:
-        return jsonify({'error': 'Game not found'}), 404
-    
-    game = game_sessions[game_id]
-    if game['status'] != 'active':
-        return jsonify({'error': 'Game is not active'}), 400
-    
-    # Update direction (prevent reverse direction)
-    opposite_directions = {
-        'up': 'down', 'down': 'up',
-        'left': 'right', 'right': 'left'
-    }
-    
-    if direction and direction != opposite_directions.get(game['direction']):
-        game['direction'] = direction
-    
-    # Move snake
-    head = game['snake'][0].copy()
-    
-    if game['direction'] == 'up':
-        head[1] -= 1
-    elif game['direction'] == 'down':
-        head[1] += 1
-    elif game['direction'] == 'left':
-        head[0] -= 1
-    elif game['direction'] == 'right':
-        head[0] += 1
-    
-    # Check wall collision
-    if (head[0] < 0 or head[0] >= game['grid_size'] or 
-        head[1] < 0 or head[1] >= game['grid_size']):
-        game['status'] = 'game_over'
-        return jsonify({
-            'status': 'game_over',
-            'score': game['score'],
-            'reason': 'wall_collision'
-        })
-    
-    # Check self collision
-    if head in game['snake']:
-        game['status'] = 'game_over'
-        return jsonify({
-            'status': 'game_over',
-            'score': game['score'],
-            'reason': 'self_collision'
-        })
-    
-    # Add new head
-    game['snake'].insert(0, head)
-    
-    # Check food collision
-    if head == game['food']:
-        game['score'] += 10
-        # Generate new food
-        while True:
-            new_food = [random.randint(0, game['grid_size']-1), 
-                       random.randint(0, game['grid_size']-1)]
-            if new_food not in game['snake']:
-                game['food'] = new_food
+    return play_stored(data.get('game_id'), lambda game: step_snake(game, direction))
+
+@games_bp.route('/batch', methods=['POST'])
+def run_batch():
+    """Run an ordered list of game actions (see src/game_actions.py) in one
+    request, e.g. for bots driving many games at once.
+
+    Each action gets its own entry in ``results``: ``{'result': ...}`` or
+    ``{'error': ..., 'status': ...}``; a failed action does not stop the
+    ones after it unless ``stop_on_error`` is set. A ``game_id`` of ``"$N"``
+    refers to the game started by action N of the same batch.
+    """
+    data = request.get_json(silent=True) or {}
+    actions = data.get('actions')
+    if not isinstance(actions, list) or not actions:
+        return jsonify({'error': 'actions must be a non-empty list'}), 400
+    limit = current_app.config['GAME_BATCH_MAX_ACTIONS']
+    if len(actions) > limit:
+        return jsonify({'error': f'At most {limit} actions per batch'}), 413
+    
+    results = []
+    for message in actions:
+        try:
+            if not isinstance(message, dict):
+                raise GameError('Malformed action')
+            game_id = message.get('game_id')
+            if isinstance(game_id, str) and game_id.startswith('$'):
+                message = dict(message, game_id=batch_game_id(results, game_id))
+            elif game_id is not None and not isinstance(game_id, str):
+                raise GameError('Game not found', 404)
+            action = get_action(message.get('action'))
+            with game_sessions.lock(message.get('game_id')):
+                game_type, result, score = action(game_sessions, message)
+            standing = record_result(game_type, score)
+            if standing:
+                result['standing'] = standing
+            results.append({'result': result})
+        except GameError as e:
+            results.append({'error': e.message, 'status': e.status})
+            if data.get('stop_on_error'):
                 break
-    else:
-        # Remove tail if no food eaten
-        game['snake'].pop()
+        except (TypeError, ValueError):
+            # Fields of the wrong type the engine did not check; the games
+            # earlier actions started must still be reported
+            results.append({'error': 'Malformed action', 'status': 400})
+            if data.get('stop_on_error'):
+                break
+    
+    return jsonify({'results': results})
+
+def batch_game_id(results, reference):
+    """Resolve ``"$N"`` to the game_id returned by action N of the batch"""
+    try:
+        return results[int(reference[1:])]['result']['game_id']
+    except (ValueError, IndexError, KeyError):
+        raise GameError(f'No game started by action {reference}')
+
+# Multiplayer snake arenas (src/snake_arena.py)
+
+def snake_arenas():
+    return current_app.extensions['snake_arenas']
+
+def arena_player():
+    """The request data and the arena and snake named by its arena_id /
+    player_id, or an error response"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    arena_id, player_id = data.get('arena_id'), data.get('player_id')
+    arena = snake_arenas().get(arena_id) if isinstance(arena_id, str) else None
+    if arena is None:
+        return data, None, None, (jsonify({'error': 'Arena not found'}), 404)
+    snake = arena.snakes.get(player_id) if isinstance(player_id, str) else None
+    if snake is None:
+        return data, None, None, (jsonify({'error': 'Player not in arena'}), 404)
+    return data, arena, snake, None
+
+@games_bp.route('/snake/arena/join', methods=['POST'])
+def join_snake_arena():
+    """Join a shared snake arena (a new one is opened when all are full)"""
+    data = request.get_json(silent=True) or {}
+    name = (data.get('name') or session.get('player_name') or 'Guest')[:20]
+    arena, snake = snake_arenas().join(name)
     
     return jsonify({
-        'snake': game['snake'],
-        'food': game['food'],
-        'score': game['score'],
-        'status': game['status']
+        'arena_id': arena.arena_id,
+        'player_id': snake.player_id,
+        'id': snake.player_id[:8],
+        'grid_size': arena.grid_size,
+        'tick_ms': snake_arenas().scheduler.tick_interval * 1000
     })
 
+@games_bp.route('/snake/arena/move', methods=['POST'])
+@skip_compression
+def move_in_snake_arena():
+    """Queue a turn for the next tick and return the arena as of the last one"""
+    data, arena, snake, error = arena_player()
+    if error:
+        return error
+    direction = data.get('direction')
+    if direction is not None and not (isinstance(direction, str)
+                                      and direction in OPPOSITE_DIRECTIONS):
+        return jsonify({'error': 'Invalid direction'}), 400
+    
+    with arena.lock:
+        snake.last_seen = time.monotonic()
+        if snake.alive and direction:
+            snake.requested = direction
+        state = arena.state
+        # The player's score is saved by the first poll after the snake died
+        record = not snake.alive and not snake.recorded
+        if record:
+            snake.recorded = True
+        you = {'alive': snake.alive, 'score': snake.score, 'reason': snake.reason}
+    
+    if record:
+        standing = record_result('snake', (you['score'], 1, 'arena'))
+        if standing:
+            you['standing'] = standing
+    return jsonify({'arena': state, 'you': you})
+
+@games_bp.route('/snake/arena/leave', methods=['POST'])
+def leave_snake_arena():
+    """Remove the player's snake from the arena"""
+    _, arena, snake, error = arena_player()
+    if error:
+        return error
+    
+    with arena.lock:
+        arena.leave(snake.player_id)
+    return jsonify({'message': 'Left arena'})
+
+@games_bp.route('/snake/arena/stats', methods=['GET'])
+def snake_arena_stats():
+    """Tick scheduler load for this worker"""
+    return jsonify(snake_arenas().scheduler.stats())
+
 @games_bp.route('/leaderboard', methods=['GET'])
 def get_leaderboard():
     """Get leaderboard data"""
@@ -1,10 +1,16 @@
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, Response, current_app, jsonify, request, session
 from src.models.user import User, Player, GameScore, db
-from sqlalchemy import desc, func
+from src.models.session import replica_read, pin_to_primary
+from src import cache_bus, score_shards
+from src.scores import (SERVER_RECORDED, bootstrap_state, leaderboard, leaderboards,
+                        record_score, scores_changed)
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 
 user_bp = Blueprint('user', __name__)
 
 @user_bp.route('/users', methods=['GET'])
+@replica_read
 def get_users():
     users = User.query.all()
     return jsonify([user.to_dict() for user in users])
@@ -19,6 +25,7 @@ def create_user():
     return jsonify(user.to_dict()), 201
 
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
+@replica_read
 def get_user(user_id):
     user = User.query.get_or_404(user_id)
     return jsonify(user.to_dict())
@@ -40,6 +47,29 @@ def delete_user(user_id):
     return '', 204
 
 # Player routes
+def player_index():
+    """The worker's player name index (see src/player_index.py)"""
+    return current_app.extensions['player_index']
+
+@user_bp.route('/players/search', methods=['GET'])
+@replica_read
+def search_players():
+    """Player names starting with ?prefix= (autocomplete)"""
+    prefix = request.args.get('prefix', '').strip()
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    if not prefix or limit < 1:
+        return jsonify({'players': []})
+    return jsonify({'players': player_index().search(prefix, limit)})
+
+@user_bp.route('/players/available', methods=['GET'])
+@replica_read
+def player_name_available():
+    """Whether ?name= can still be registered"""
+    name = request.args.get('name', '').strip()
+    if not name:
+        return jsonify({'error': 'Name is required'}), 400
+    return jsonify({'name': name, 'available': player_index().available(name)})
+
 @user_bp.route('/players/register', methods=['POST'])
 def register_player():
     """Register a new player"""
@@ -50,15 +80,22 @@ def register_player():
     if not name or not password:
         return jsonify({'error': 'Name and password are required'}), 400
     
-    # Check if player already exists
-    existing_player = Player.query.filter_by(name=name).first()
-    if existing_player:
+    # Check if player already exists (in any letter case)
+    index = player_index()
+    if not index.available(name, confirm=True):
         return jsonify({'error': 'Player name already exists'}), 400
     
-    # Create new player
+    # Create new player; the unique lower(name) index settles races
     player = Player(name=name, password=password)
     db.session.add(player)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Player name already exists'}), 400
+    index.add(player.name)
+    cache_bus.bump('players')
+    pin_to_primary()
     
     # Store player in session
     session['player_id'] = player.id
@@ -127,76 +164,109 @@ def add_score():
     
     if not game_type:
         return jsonify({'error': 'Game type is required'}), 400
+    if game_type in SERVER_RECORDED:
+        # Recorded by the game endpoints on the final move
+        return jsonify({'error': 'Scores for this game are recorded by the server'}), 400
     
     # Create new score
-    score = GameScore(
-        player_id=session['player_id'],
-        game_type=game_type,
-        points=points,
-        attempts=attempts,
-        difficulty=difficulty
-    )
-    db.session.add(score)
-    db.session.commit()
+    score = record_score(session['player_id'], game_type, points, attempts, difficulty)
+    scores_changed()
+    # Read-your-own-writes: the follow-up leaderboard fetches hit the primary
+    pin_to_primary()
     
+    score['player_name'] = session.get('player_name')
+    score['created_at'] = score['created_at'].isoformat()
     return jsonify({
         'message': 'Score added successfully',
-        'score': score.to_dict()
+        'score': score
     }), 201
 
 @user_bp.route('/leaderboard/<game_type>', methods=['GET'])
+@replica_read
 def get_game_leaderboard(game_type):
     """Get leaderboard for a specific game with aggregated points per player"""
-    # Get aggregated scores for the game type
-    scores = db.session.query(
-        Player.name.label('player_name'),
-        func.sum(GameScore.points).label('total_points')
-    ).join(GameScore).filter(
-        GameScore.game_type == game_type
-    ).group_by(Player.id, Player.name).order_by(
-        desc(func.sum(GameScore.points))
-    ).limit(10).all()
-    
-    # Convert to list of dictionaries
-    leaderboard = []
-    for score in scores:
-        leaderboard.append({
-            'player_name': score.player_name,
-            'points': score.total_points
-        })
-    
-    return jsonify(leaderboard)
+    return jsonify(leaderboard(game_type))
 
 @user_bp.route('/leaderboard', methods=['GET'])
+@replica_read
 def get_all_leaderboards():
     """Get leaderboards for all games with aggregated points per player"""
-    game_types = ['number_guess', 'rps', 'tictactoe', 'memory', 'snake']
-    leaderboards = {}
+    return jsonify(leaderboards())
+
+@user_bp.route('/leaderboard/stream', methods=['GET'])
+def stream_leaderboard():
+    """Server-Sent Events: a full snapshot, then the games whose
+    leaderboard changed (see src/leaderboard_stream.py)"""
+    stream = current_app.extensions['leaderboard_stream']
+    subscriber = stream.subscribe()
+    if subscriber is None:
+        response = jsonify({'error': 'Too many leaderboard streams, poll /api/leaderboard'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
     
-    for game_type in game_types:
-        # Get aggregated scores for each game type
-        scores = db.session.query(
-            Player.name.label('player_name'),
-            func.sum(GameScore.points).label('total_points')
-        ).join(GameScore).filter(
-            GameScore.game_type == game_type
-        ).group_by(Player.id, Player.name).order_by(
-            desc(func.sum(GameScore.points))
-        ).limit(10).all()
-        
-        # Convert to list of dictionaries
-        game_leaderboard = []
-        for score in scores:
-            game_leaderboard.append({
-                'player_name': score.player_name,
-                'points': score.total_points
-            })
-        
-        leaderboards[game_type] = game_leaderboard
+    response = Response(stream.events(subscriber), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Keep nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# Score distributions (src/score_stats.py)
+def stats_loading():
+    response = jsonify({'error': 'Score statistics are loading, try again shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '2'
+    return response
+
+@user_bp.route('/stats/<game_type>/percentile', methods=['GET'])
+def get_score_percentile(game_type):
+    """Share of recorded scores below ?points= (optionally one ?difficulty=)"""
+    points = request.args.get('points', type=int)
+    if points is None:
+        return jsonify({'error': 'points must be an integer'}), 400
+    difficulty = request.args.get('difficulty')
+    
+    stats = current_app.extensions['score_stats']
+    if not stats.sync():
+        return stats_loading()
+    result = stats.percentile(game_type, difficulty, points)
+    if result is None:
+        return jsonify({'error': 'No scores recorded for this game'}), 404
     
-    return jsonify(leaderboards)
+    percentile, count, error = result
+    return jsonify({
+        'game_type': game_type,
+        'difficulty': difficulty,
+        'points': points,
+        'percentile': percentile,
+        'count': count,
+        'error': error
+    })
+
+@user_bp.route('/stats/<game_type>/distribution', methods=['GET'])
+def get_score_distribution(game_type):
+    """Count, quantiles and histogram of the scores (optionally one ?difficulty=)"""
+    difficulty = request.args.get('difficulty')
+    
+    stats = current_app.extensions['score_stats']
+    if not stats.sync():
+        return stats_loading()
+    summary = stats.summary(game_type, difficulty)
+    if summary is None:
+        return jsonify({'error': 'No scores recorded for this game'}), 404
+    
+    summary.update({'game_type': game_type, 'difficulty': difficulty})
+    return jsonify(summary)
+
+@user_bp.route('/bootstrap', methods=['GET'])
+@replica_read
+def get_bootstrap():
+    """Current player, their best/total/rank per game and all leaderboards
+    in one response, for the home page's first render"""
+    return jsonify(bootstrap_state(session.get('player_id')))
 
 @user_bp.route('/players/best-scores', methods=['GET'])
+@replica_read
 def get_player_best_scores():
     """Get the best scores for the current player in each game"""
     if 'player_id' not in session:
@@ -207,12 +277,12 @@ def get_player_best_scores():
     
     for game_type in game_types:
         # Get the highest score for this player in this game
-        best_score = db.session.query(
+        best_score = score_shards.execute(db.select(
             func.max(GameScore.points).label('max_points')
-        ).filter(
+        ).where(
             GameScore.player_id == session['player_id'],
             GameScore.game_type == game_type
-        ).scalar()
+        ), game_type).scalar()
         
         best_scores[game_type] = best_score if best_score is not None else 0
     
@@ -224,8 +294,9 @@ def clear_duplicate_scores():
     try:
         # This is a simple approach - in production you'd want more sophisticated deduplication
         # For now, we'll just clear all scores to start fresh
-        GameScore.query.delete()
+        score_shards.fan_out(db.delete(GameScore))
         db.session.commit()
+        scores_changed()
         
         return jsonify({'message': 'All scores cleared successfully'}), 200
     except Exception as e:
@@ -249,10 +320,14 @@ def clear_duplicate_players():
         
         # Delete duplicate players and their scores
         for duplicate in duplicates:
-            GameScore.query.filter_by(player_id=duplicate.id).delete()
+            score_shards.fan_out(db.delete(GameScore).where(GameScore.player_id == duplicate.id))
             db.session.delete(duplicate)
         
         db.session.commit()
+        if duplicates:
+            scores_changed()
+            cache_bus.bump('players', 'player_deletes')
+            player_index().removed()
         
         return jsonify({
             'message': f'Removed {len(duplicates)} duplicate players',
@@ -0,0 +1,159 @@
+"""Columnar in-memory copy of game_score for admin analytics.
+
+With NumPy installed and ANALYTICS_CACHE on, the scores table is held as
+one array per column, one element per score (in id order within each
+score database):
+
+    player_id int32   points int32   attempts int32
+    game      int16   (code into ``game_types``)
+    difficulty int16  (code into ``difficulties``)
+    created   int64   (seconds since the epoch, UTC)
+
+about 20 bytes per score. The /api/admin/analytics/* group-bys then run
+as a handful of vectorized passes (masks, bincount) over those arrays
+instead of SQL aggregates; src/analytics.py has both versions and falls
+back to SQL when the cache is off.
+
+The cache is filled in bulk by ``warm()``, which gunicorn's preloading
+master calls before forking so the workers share the arrays
+copy-on-write (without preloading the first analytics request loads it).
+New scores are appended from an ``id > last seen`` query (one per score
+database when game_score is sharded, see src/score_shards.py) that runs
+right away after ``notify()``, which the score recording path calls, or
+once another process bumped the ``scores`` generation of the cache bus
+(src/cache_bus.py); without the bus it also runs every ``refresh``
+seconds. Arrays grow by doubling.
+"""
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from sqlalchemy import String, type_coerce
+from src import score_shards
+from src.cache_bus import Watch
+from src.models.user import GameScore, db
+from src.score_stats import DEFAULT_DIFFICULTY
+
+# Scores read per query while loading
+LOAD_BATCH = 200000
+
+COLUMNS = [('player_id', 'int32'), ('points', 'int32'), ('attempts', 'int32'),
+           ('game', 'int16'), ('difficulty', 'int16'), ('created', 'int64')]
+
+
+class ScoreColumns:
+    """Per-process column arrays of every recorded score"""
+
+    def __init__(self, app, refresh=5.0):
+        if np is None:
+            raise RuntimeError('The analytics cache needs NumPy (pip install numpy)')
+        self.app = app
+        self.refresh = refresh
+        self._watch = Watch(app, 'scores', refresh)
+        self.size = 0
+        self.arrays = {name: np.zeros(1024, dtype) for name, dtype in COLUMNS}
+        self.game_types = []
+        self.difficulties = []
+        self._codes = {'game': {}, 'difficulty': {}}
+        # Last score id loaded per score database
+        self._last_ids = {}
+        self._synced_at = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        app.extensions['score_columns'] = self
+
+    def _encode(self, column, values):
+        """Small-int codes for ``values``, adding codes for new names"""
+        codes = self._codes[column]
+        names = self.game_types if column == 'game' else self.difficulties
+        for value in set(values) - codes.keys():
+            codes[value] = len(names)
+            names.append(value)
+        return [codes[value] for value in values]
+
+    def _append(self, rows):
+        count = len(rows)
+        needed = self.size + count
+        capacity = len(self.arrays['points'])
+        if needed > capacity:
+            while capacity < needed:
+                capacity *= 2
+            grown = {}
+            for name, dtype in COLUMNS:
+                array = np.zeros(capacity, dtype)
+                array[:self.size] = self.arrays[name][:self.size]
+                grown[name] = array
+        else:
+            grown = dict(self.arrays)
+
+        _, player_ids, game_types, difficulties, points, attempts, created = zip(*rows)
+        end = self.size + count
+        grown['player_id'][self.size:end] = player_ids
+        grown['points'][self.size:end] = [value or 0 for value in points]
+        grown['attempts'][self.size:end] = [value or 0 for value in attempts]
+        grown['game'][self.size:end] = self._encode('game', game_types)
+        # Client-scored games may be recorded without one; reported as the
+        # column default, like the SQL versions do
+        grown['difficulty'][self.size:end] = self._encode(
+            'difficulty', [DEFAULT_DIFFICULTY if value is None else value
+                           for value in difficulties])
+        # ISO strings on SQLite, datetimes elsewhere; NumPy parses both
+        grown['created'][self.size:end] = np.array(created, 'datetime64[s]').astype('int64')
+        # Readers take (arrays, size) together under the lock, so they never
+        # see rows half written
+        with self._lock:
+            self.arrays = grown
+            self.size = end
+
+    def _catch_up(self):
+        table = GameScore.__table__
+        self._watch.start()
+        for database in score_shards.databases():
+            while True:
+                # Plain Core rows, and created_at left as the driver returns
+                # it: SQLAlchemy's per-row datetime parsing would dominate
+                rows = score_shards.connection(database).execute(
+                    db.select(table.c.id, table.c.player_id, table.c.game_type,
+                              table.c.difficulty, table.c.points, table.c.attempts,
+                              type_coerce(table.c.created_at, String))
+                    .where(table.c.id > self._last_ids.get(database, 0))
+                    .order_by(table.c.id)
+                    .limit(LOAD_BATCH)).all()
+                if rows:
+                    self._append(rows)
+                    self._last_ids[database] = rows[-1][0]
+                if len(rows) < LOAD_BATCH:
+                    break
+        self._synced_at = time.monotonic()
+
+    def warm(self):
+        """Load every score (called in the preloading master)"""
+        self.sync(force=True)
+
+    def notify(self):
+        """A score was recorded; the next query picks it up"""
+        self._dirty = True
+
+    def sync(self, force=False):
+        if not force and not self._dirty and not self._watch.due(self._synced_at):
+            return
+        # The first load waits; later catch-ups leave it to whoever is at it
+        if self._sync_lock.acquire(blocking=force or self._synced_at is None):
+            try:
+                self._dirty = False
+                with self.app.app_context():
+                    self._catch_up()
+            finally:
+                self._sync_lock.release()
+
+    def snapshot(self):
+        """{column: array} views of every score loaded so far"""
+        self.sync()
+        with self._lock:
+            arrays, size = self.arrays, self.size
+        return {name: array[:size] for name, array in arrays.items()}
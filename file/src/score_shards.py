@@ -0,0 +1,141 @@
+"""Optional split of game_score across SQLite files, one per game type.
+
+SQLite has one write lock per database file, so with every score in
+app.db a burst of snake scores makes memory and tic-tac-toe writes (and
+player registrations) queue behind it. With SCORE_SHARD_DIR set, each
+game type in ``GAME_TYPES`` gets its own file there,
+``scores_<game_type>.db``, registered as the SQLAlchemy bind of the same
+name; scores of any other game type stay in the primary database.
+
+Nothing is routed implicitly. Score queries run through ``execute`` with
+the game type they are about, which picks its database, or through
+``fan_out``, which runs the same statement on every database holding
+scores and leaves merging the results to the caller. Cross-database joins
+are not possible, so score queries select ``player_id`` and look names up
+in the primary afterwards (``scores.player_names``). Without
+SCORE_SHARD_DIR there is a single database, ``None``, and everything
+behaves as before, read replica included.
+
+Shard tables use AUTOINCREMENT with the sequence of shard ``i`` starting
+at ``(i + 1) * ID_BLOCK``, so score ids stay unique across files (and
+above the ids of an unsharded app.db). Caches that catch up by ``id >
+last seen`` keep one last id per database.
+
+An existing app.db is split with ``python -m src.tools.reshard_scores``
+(run it before turning SCORE_SHARD_DIR on, or scores still in app.db are
+not seen by the game's queries).
+"""
+import os
+
+from flask import current_app
+from sqlalchemy import Column, MetaData, Table, text
+
+from src.models.user import GameScore, db
+
+BIND_PREFIX = 'scores_'
+
+# Ids reserved per shard
+ID_BLOCK = 10 ** 12
+
+
+def _game_types():
+    # src.scores imports this module
+    from src.scores import GAME_TYPES
+    return GAME_TYPES
+
+
+def shard_binds(directory):
+    """SQLALCHEMY_BINDS entries for the shard files in ``directory``"""
+    return {f'{BIND_PREFIX}{game_type}':
+            'sqlite:///' + os.path.join(directory, f'{BIND_PREFIX}{game_type}.db')
+            for game_type in _game_types()}
+
+
+def configure(app):
+    """Register the shard binds (before ``db.init_app``)"""
+    directory = app.config.get('SCORE_SHARD_DIR')
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds.update(shard_binds(os.path.abspath(directory)))
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def enabled():
+    return bool(current_app.config.get('SCORE_SHARD_DIR'))
+
+
+def database_for(game_type):
+    """The database holding ``game_type``'s scores: the game type itself
+    when it has a shard, else None (the primary)"""
+    if game_type in _game_types() and enabled():
+        return game_type
+    return None
+
+
+def databases(kinds=None):
+    """Every database holding scores (of the game types ``kinds``, if given)"""
+    if not enabled():
+        return [None]
+    if kinds is None:
+        return [None] + list(_game_types())
+    return list(dict.fromkeys(database_for(game_type) for game_type in kinds))
+
+
+def engine(database):
+    """Engine of ``database``; None means the session's own routing"""
+    return db.engines[f'{BIND_PREFIX}{database}'] if database is not None else None
+
+
+def bind_arguments(database):
+    bind = engine(database)
+    return {'bind': bind} if bind is not None else None
+
+
+def execute(statement, game_type=None, database=None, **kwargs):
+    """``db.session.execute`` on the database of ``game_type`` (or on
+    ``database``) in the session's transaction"""
+    if game_type is not None:
+        database = database_for(game_type)
+    return db.session.execute(statement, bind_arguments=bind_arguments(database), **kwargs)
+
+
+def fan_out(statement, kinds=None, **kwargs):
+    """[(database, result)] of ``statement`` on every database holding
+    scores (of the game types ``kinds``)"""
+    return [(database, execute(statement, database=database, **kwargs))
+            for database in databases(kinds)]
+
+
+def connection(database):
+    """The session's connection to ``database``, for Core queries"""
+    return db.session.connection(bind_arguments=bind_arguments(database))
+
+
+def shard_table():
+    """game_score as created in a shard: no foreign key (player lives in
+    the primary) and AUTOINCREMENT, so the id sequence can start at the
+    shard's block"""
+    source = GameScore.__table__
+    return Table(source.name, MetaData(),
+                 *[Column(column.name, column.type, primary_key=column.primary_key,
+                          nullable=column.nullable) for column in source.columns],
+                 sqlite_autoincrement=True)
+
+
+def create_tables(drop=False):
+    """Create game_score in every shard (``drop`` it first); no-op unless
+    sharding is on"""
+    if not enabled():
+        return
+    table = shard_table()
+    for index, game_type in enumerate(_game_types()):
+        with engine(game_type).begin() as conn:
+            if drop:
+                table.drop(conn, checkfirst=True)
+            table.create(conn, checkfirst=True)
+            conn.execute(text(
+                'INSERT INTO sqlite_sequence (name, seq) SELECT :name, :seq '
+                'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)'),
+                {'name': table.name, 'seq': (index + 1) * ID_BLOCK})
@@ -0,0 +1,242 @@
+"""Score distributions per game type and difficulty, for "you beat X% of
+players" after a game without scanning game_score.
+
+Each worker keeps one ScoreDistribution (a KLL quantile sketch plus an
+adaptive histogram, see src/quantiles.py) per (game_type, difficulty).
+Every score goes into it once, in O(1): gunicorn's preloading master (or
+else the first lookup, in a background thread) restores the distributions
+saved in the score_sketch table and catches up with newer scores; after
+that a lookup catches up with an ``id > last seen`` range query, which
+includes scores written by other workers, once the ``scores`` generation
+of the cache bus moved (src/cache_bus.py), or every ``refresh`` seconds
+without the bus. Every ``persist_interval`` seconds a worker saves its distributions with the last score id they
+cover, so a restart only reads the scores written since. With the score
+table sharded (src/score_shards.py) each database is caught up with its
+own last id, and each saved row holds the last id of its game's database.
+
+Percentiles are "share of recorded scores strictly below ``points``",
+exact while a distribution holds fewer than a few hundred scores and
+within ``quantiles.RANK_ERROR`` of the true share after that. Sketches
+are randomised, so two workers can differ by that much.
+"""
+import json
+import threading
+import time
+
+from sqlalchemy.exc import SQLAlchemyError
+from src import score_shards
+from src.cache_bus import Watch
+from src.models.user import GameScore, ScoreSketch, db
+from src.quantiles import RANK_ERROR, Histogram, KLLSketch
+
+# Scores read per query while catching up
+CATCH_UP_BATCH = 50000
+
+# Difficulty stored for scores recorded without one (the column default)
+DEFAULT_DIFFICULTY = 'medium'
+
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+
+class ScoreDistribution:
+    __slots__ = ('sketch', 'histogram')
+
+    def __init__(self, sketch=None, histogram=None):
+        self.sketch = sketch or KLLSketch()
+        self.histogram = histogram or Histogram()
+
+    def add(self, points):
+        self.sketch.add(points)
+        self.histogram.add(points)
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        self.histogram.merge(other.histogram)
+        return self
+
+    @property
+    def rank_error(self):
+        return 0.0 if self.sketch.exact else RANK_ERROR
+
+    def to_dict(self):
+        return {'sketch': self.sketch.to_dict(), 'histogram': self.histogram.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(KLLSketch.from_dict(data['sketch']), Histogram.from_dict(data['histogram']))
+
+
+class ScoreStats:
+    """Per-process score distributions, kept in sync with game_score"""
+
+    def __init__(self, app, refresh=2.0, persist_interval=60.0):
+        self.app = app
+        self.refresh = refresh
+        self._watch = Watch(app, 'scores', refresh)
+        self.persist_interval = persist_interval
+        self.distributions = {}
+        # Last score id seen per score database
+        self._last_ids = {}
+        self._synced_at = None
+        self._saved_ids = {}
+        self._saved_at = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._loader = None
+        self._loader_lock = threading.Lock()
+        app.extensions['score_stats'] = self
+
+    @property
+    def loaded(self):
+        return self._synced_at is not None
+
+    def warm(self):
+        """Load the distributions now (called in the preloading master)"""
+        self.sync(force=True)
+
+    def _distribution(self, game_type, difficulty):
+        key = (game_type, difficulty or DEFAULT_DIFFICULTY)
+        distribution = self.distributions.get(key)
+        if distribution is None:
+            distribution = self.distributions[key] = ScoreDistribution()
+        return distribution
+
+    def _restore(self):
+        rows = ScoreSketch.query.all()
+        if not rows:
+            return
+        # All rows of a database are saved together; a row left behind by
+        # an older save would double count, so only the newest ones are used
+        last_ids = {}
+        for row in rows:
+            database = score_shards.database_for(row.game_type)
+            last_ids[database] = max(last_ids.get(database, 0), row.last_score_id)
+        with self._lock:
+            for row in rows:
+                if row.last_score_id == last_ids[score_shards.database_for(row.game_type)]:
+                    self.distributions[(row.game_type, row.difficulty)] = (
+                        ScoreDistribution.from_dict(json.loads(row.data)))
+        self._last_ids = dict(last_ids)
+        self._saved_ids = last_ids
+
+    def _catch_up(self):
+        self._watch.start()
+        for database in score_shards.databases():
+            while True:
+                rows = score_shards.execute(
+                    db.select(GameScore.id, GameScore.game_type, GameScore.difficulty,
+                              GameScore.points)
+                    .where(GameScore.id > self._last_ids.get(database, 0))
+                    .order_by(GameScore.id)
+                    .limit(CATCH_UP_BATCH), database=database).all()
+                if rows:
+                    with self._lock:
+                        for _, game_type, difficulty, points in rows:
+                            self._distribution(game_type, difficulty).add(points or 0)
+                    self._last_ids[database] = rows[-1][0]
+                if len(rows) < CATCH_UP_BATCH:
+                    break
+        self._synced_at = time.monotonic()
+        if self._last_ids != self._saved_ids and (
+                self._saved_at is None or self._synced_at - self._saved_at >= self.persist_interval):
+            self._save()
+
+    def _save(self):
+        with self._lock:
+            snapshot = {key: json.dumps(distribution.to_dict(), separators=(',', ':'))
+                        for key, distribution in self.distributions.items()}
+        rows = {(row.game_type, row.difficulty): row for row in ScoreSketch.query.all()}
+        for (game_type, difficulty), data in snapshot.items():
+            row = rows.get((game_type, difficulty))
+            if row is None:
+                row = ScoreSketch(game_type=game_type, difficulty=difficulty)
+                db.session.add(row)
+            row.last_score_id = self._last_ids.get(score_shards.database_for(game_type), 0)
+            row.data = data
+        try:
+            db.session.commit()
+        except SQLAlchemyError:
+            # Another worker saved at the same moment; try again next time
+            db.session.rollback()
+            return
+        self._saved_ids = dict(self._last_ids)
+        self._saved_at = time.monotonic()
+
+    def _load(self):
+        try:
+            with self.app.app_context(), self._sync_lock:
+                self._restore()
+                self._catch_up()
+        finally:
+            if not self.loaded:
+                # Let the next lookup try again
+                self._loader = None
+
+    def sync(self, force=False):
+        """Catch up with new scores; False while the first load is running.
+
+        Catching up (and saving) uses its own app context, so it always
+        talks to the primary and never touches the caller's transaction.
+        """
+        if not self.loaded and not force:
+            with self._loader_lock:
+                if self._loader is None:
+                    self._loader = threading.Thread(target=self._load, name='score-stats',
+                                                    daemon=True)
+                    self._loader.start()
+            return self.loaded
+        if not force and not self._watch.due(self._synced_at):
+            return True
+        # Whoever holds the lock is already catching up; serve what we have
+        if self._sync_lock.acquire(blocking=force):
+            try:
+                with self.app.app_context():
+                    if not self.loaded:
+                        self._restore()
+                    self._catch_up()
+            finally:
+                self._sync_lock.release()
+        return True
+
+    def distribution(self, game_type, difficulty=None):
+        """A merged copy of the distribution for ``game_type`` (one
+        difficulty or all of them), or None without any scores"""
+        with self._lock:
+            parts = [distribution for (kind, level), distribution in self.distributions.items()
+                     if kind == game_type and difficulty in (None, level)]
+            if not parts:
+                return None
+            merged = ScoreDistribution()
+            for part in parts:
+                merged.merge(part)
+        return merged
+
+    def percentile(self, game_type, difficulty, points):
+        """(share of scores below ``points`` in percent, score count, error
+        in percent), or None while loading or without scores"""
+        if not self.sync():
+            return None
+        distribution = self.distribution(game_type, difficulty)
+        if distribution is None:
+            return None
+        sketch = distribution.sketch
+        return (round(100 * sketch.fraction_below(points), 1), sketch.count,
+                round(100 * distribution.rank_error, 1))
+
+    def summary(self, game_type, difficulty=None):
+        """Count, range, quantiles and histogram buckets, or None"""
+        if not self.sync():
+            return None
+        distribution = self.distribution(game_type, difficulty)
+        if distribution is None:
+            return None
+        sketch = distribution.sketch
+        return {
+            'count': sketch.count,
+            'min': sketch.min,
+            'max': sketch.max,
+            'quantiles': {f'p{round(q * 100)}': sketch.quantile(q) for q in QUANTILES},
+            'histogram': {'width': distribution.histogram.width,
+                          'buckets': distribution.histogram.buckets()},
+            'rank_error': round(100 * distribution.rank_error, 1)
+        }
@@ -0,0 +1,202 @@
+"""Score recording done by the server when a game ends.
+
+The game endpoints call ``record_result`` on the terminal move, so points are
+computed from the server's own game state (see ``final_score`` in
+src/game_engine.py) instead of being posted by the browser, and the player's
+updated standing goes back in the same response. The leaderboard and
+standing queries are also what /api/bootstrap serves on page load.
+
+Score queries go through src/score_shards.py so they reach the database
+holding the game's scores; they select player ids and names are looked up
+in the primary with ``player_names``.
+"""
+from datetime import datetime
+
+from flask import current_app, session
+from sqlalchemy import func
+from src import cache_bus, score_shards
+from src.models.session import pin_to_primary
+from src.models.user import GameScore, Player, db
+
+GAME_TYPES = ['number_guess', 'rps', 'tictactoe', 'memory', 'snake']
+
+# Game types whose scores only the server may record
+SERVER_RECORDED = set(GAME_TYPES)
+
+
+def record_score(player_id, game_type, points, attempts, difficulty):
+    """Insert a score in its game's database; return it as a dict"""
+    score = {
+        'player_id': player_id,
+        'game_type': game_type,
+        'points': points,
+        'attempts': attempts,
+        'difficulty': difficulty,
+        'created_at': datetime.utcnow()
+    }
+    result = score_shards.execute(db.insert(GameScore).values(**score), game_type)
+    db.session.commit()
+    score['id'] = result.inserted_primary_key[0]
+    return score
+
+
+def player_names(player_ids):
+    """{player id: name} for ``player_ids``"""
+    if not player_ids:
+        return {}
+    return dict(db.session.execute(
+        db.select(Player.id, Player.name).where(Player.id.in_(player_ids))).all())
+
+
+def scores_changed():
+    """Tell the score caches of every worker (through the cache bus) and
+    this one's right away that a score was just written"""
+    cache_bus.bump('scores')
+    for name in ('leaderboard_stream', 'score_columns'):
+        cache = current_app.extensions.get(name)
+        if cache is not None:
+            cache.notify()
+
+
+def standing(player_id, game_type):
+    """The player's best single score, leaderboard total and rank"""
+    best, total = score_shards.execute(db.select(
+        func.max(GameScore.points), func.coalesce(func.sum(GameScore.points), 0)
+    ).where(
+        GameScore.player_id == player_id,
+        GameScore.game_type == game_type
+    ), game_type).one()
+
+    # Rank as shown on the leaderboard: players with a higher total, plus one
+    totals = db.select(
+        func.sum(GameScore.points).label('total_points')
+    ).where(
+        GameScore.game_type == game_type
+    ).group_by(GameScore.player_id).subquery()
+    ahead = score_shards.execute(db.select(func.count()).select_from(totals).where(
+        totals.c.total_points > total
+    ), game_type).scalar()
+
+    return {'best': best or 0, 'total': total, 'rank': ahead + 1}
+
+
+def record_for(player_id, game_type, result):
+    """Record ``result`` (points, attempts, difficulty) for ``player_id`` and
+    return the score summary (points plus standing)"""
+    points, attempts, difficulty = result
+    record_score(player_id, game_type, points, attempts, difficulty)
+    scores_changed()
+
+    summary = {'points': points}
+    summary.update(standing(player_id, game_type))
+    stats = current_app.extensions.get('score_stats')
+    percentile = stats.percentile(game_type, difficulty, points) if stats else None
+    if percentile is not None:
+        # Share of this game's scores at the same difficulty below this one
+        summary['percentile'] = percentile[0]
+    return summary
+
+
+def record_result(game_type, result):
+    """Record ``result`` for the logged-in player and return the score
+    summary for the response, or None for guests"""
+    player_id = session.get('player_id')
+    if player_id is None or result is None:
+        return None
+
+    summary = record_for(player_id, game_type, result)
+    # Read-your-own-writes for the leaderboard refresh that follows
+    pin_to_primary()
+    return summary
+
+
+def board(rows, names):
+    """Leaderboard entries for (player_id, total_points) rows; scores of
+    players that no longer exist are left out"""
+    return [{'player_name': names[player_id], 'points': total}
+            for player_id, total in rows if player_id in names]
+
+
+def leaderboard(game_type, limit=10):
+    """Top ``limit`` players of one game by total points"""
+    total = func.sum(GameScore.points)
+    rows = score_shards.execute(db.select(
+        GameScore.player_id, total
+    ).where(
+        GameScore.game_type == game_type
+    ).group_by(GameScore.player_id).order_by(total.desc()).limit(limit), game_type).all()
+    return board(rows, player_names({player_id for player_id, _ in rows}))
+
+
+def leaderboards(limit=10):
+    """Top ``limit`` players by total points for every game, in one query
+    per score database"""
+    totals = db.select(
+        GameScore.game_type.label('game_type'),
+        GameScore.player_id.label('player_id'),
+        func.sum(GameScore.points).label('total_points')
+    ).where(
+        GameScore.game_type.in_(GAME_TYPES)
+    ).group_by(GameScore.game_type, GameScore.player_id).subquery()
+    ranked = db.select(
+        totals,
+        func.row_number().over(
+            partition_by=totals.c.game_type,
+            order_by=totals.c.total_points.desc()
+        ).label('position')
+    ).subquery()
+    query = db.select(
+        ranked.c.game_type, ranked.c.player_id, ranked.c.total_points
+    ).where(ranked.c.position <= limit).order_by(
+        ranked.c.game_type, ranked.c.position
+    )
+
+    rows = {game_type: [] for game_type in GAME_TYPES}
+    for _, result in score_shards.fan_out(query, GAME_TYPES):
+        for game_type, player_id, total in result:
+            rows[game_type].append((player_id, total))
+    names = player_names({player_id for board_rows in rows.values()
+                          for player_id, _ in board_rows})
+    return {game_type: board(board_rows, names) for game_type, board_rows in rows.items()}
+
+
+def standings(player_id):
+    """standing() for every game at once: best, total and rank per game"""
+    mine = db.select(
+        GameScore.game_type.label('game_type'),
+        func.max(GameScore.points).label('best'),
+        func.sum(GameScore.points).label('total')
+    ).where(
+        GameScore.player_id == player_id
+    ).group_by(GameScore.game_type).subquery()
+    totals = db.select(
+        GameScore.game_type.label('game_type'),
+        func.sum(GameScore.points).label('total_points')
+    ).group_by(GameScore.game_type, GameScore.player_id).subquery()
+    query = db.select(
+        mine.c.game_type, mine.c.best, mine.c.total,
+        func.count(totals.c.total_points)
+    ).outerjoin(totals, (totals.c.game_type == mine.c.game_type) &
+                (totals.c.total_points > mine.c.total)
+    ).group_by(mine.c.game_type, mine.c.best, mine.c.total)
+
+    result = {game_type: {'best': 0, 'total': 0, 'rank': None} for game_type in GAME_TYPES}
+    for _, rows in score_shards.fan_out(query, GAME_TYPES):
+        for game_type, best, total, ahead in rows:
+            if game_type in result:
+                result[game_type] = {'best': best, 'total': total, 'rank': ahead + 1}
+    return result
+
+
+def bootstrap_state(player_id):
+    """Everything the home page needs on load: the logged-in player (if any),
+    their standing per game, the top leaderboards and whether
+    /api/leaderboard/stream is served"""
+    player = db.session.get(Player, player_id) if player_id is not None else None
+    stream = current_app.extensions.get('leaderboard_stream')
+    return {
+        'player': player.to_dict() if player else None,
+        'standings': standings(player.id) if player else None,
+        'leaderboards': leaderboards(),
+        'leaderboard_stream': bool(stream and stream.enabled)
+    }
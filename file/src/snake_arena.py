@@ -0,0 +1,326 @@
+"""Multiplayer snake arenas advanced by a fixed-rate server tick.
+
+Many snakes share one larger grid. Every tick each snake moves with the
+single-player rules from src/game_engine.py (turn_snake / next_head /
+off_grid, food worth SNAKE_FOOD_POINTS), with two additions:
+
+* collisions are checked against an occupancy grid (one byte per cell), so
+  a move costs O(1) however many snakes share the arena;
+* heads that land on the same cell in the same tick both die.
+
+All arenas of a process are driven by one ArenaScheduler thread holding a
+heap of (next tick deadline, arena). Ticks run at a fixed rate; a tick that
+is already a full interval late is skipped and counted, and the time spent
+ticking versus wall time is reported as the tick budget usage.
+"""
+import collections
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+import uuid
+
+from src.game_engine import SNAKE_FOOD_POINTS, next_head, off_grid, turn_snake
+
+logger = logging.getLogger(__name__)
+
+# Occupancy grid cell values
+EMPTY, BODY, FOOD = 0, 1, 2
+
+
+class ArenaSnake:
+    __slots__ = ('player_id', 'name', 'body', 'direction', 'requested', 'score',
+                 'alive', 'reason', 'recorded', 'last_seen')
+
+    def __init__(self, player_id, name, head, direction):
+        self.player_id = player_id
+        self.name = name
+        self.body = collections.deque([head])
+        self.direction = direction
+        self.requested = None
+        self.score = 0
+        self.alive = True
+        self.reason = None
+        # Set once the score has been saved for a logged-in player
+        self.recorded = False
+        self.last_seen = time.monotonic()
+
+    def to_dict(self):
+        return {
+            'id': self.player_id[:8],
+            'name': self.name,
+            'snake': [list(cell) for cell in self.body],
+            'score': self.score,
+            'alive': self.alive
+        }
+
+
+class Arena:
+    """One shared grid; all methods are called with ``lock`` held"""
+
+    def __init__(self, grid_size=48, max_players=16, food=None, idle_timeout=30.0):
+        self.arena_id = str(uuid.uuid4())
+        self.grid_size = grid_size
+        self.max_players = max_players
+        self.idle_timeout = idle_timeout
+        self.food_target = food or max(1, max_players // 2)
+        self.grid = bytearray(grid_size * grid_size)
+        self.snakes = {}
+        self.food = set()
+        self.tick_count = 0
+        self.lock = threading.Lock()
+        self.closed = False
+        self.state = None
+        self._refresh_state()
+
+    def _cell(self, x, y):
+        return y * self.grid_size + x
+
+    def _random_empty_cell(self):
+        for _ in range(100):
+            x = random.randrange(self.grid_size)
+            y = random.randrange(self.grid_size)
+            if self.grid[self._cell(x, y)] == EMPTY:
+                return x, y
+        return None
+
+    def _spawn_food(self):
+        while len(self.food) < self.food_target:
+            cell = self._random_empty_cell()
+            if cell is None:
+                return
+            self.food.add(cell)
+            self.grid[self._cell(*cell)] = FOOD
+
+    def live_players(self):
+        return sum(1 for snake in self.snakes.values() if snake.alive)
+
+    def join(self, name):
+        """Add a snake on a free cell away from the walls; None when full"""
+        if self.closed or self.live_players() >= self.max_players:
+            return None
+        margin = min(3, self.grid_size // 4)
+        for _ in range(100):
+            x = random.randrange(margin, self.grid_size - margin)
+            y = random.randrange(margin, self.grid_size - margin)
+            if self.grid[self._cell(x, y)] == EMPTY:
+                break
+        else:
+            return None
+        # Head towards the far side so a new snake does not hit a wall at once
+        direction = 'right' if x < self.grid_size // 2 else 'left'
+        snake = ArenaSnake(str(uuid.uuid4()), name, (x, y), direction)
+        self.snakes[snake.player_id] = snake
+        self.grid[self._cell(x, y)] = BODY
+        self._spawn_food()
+        return snake
+
+    def _remove_body(self, snake):
+        for x, y in snake.body:
+            self.grid[self._cell(x, y)] = EMPTY
+
+    def leave(self, player_id):
+        snake = self.snakes.pop(player_id, None)
+        if snake is not None and snake.alive:
+            self._remove_body(snake)
+
+    def tick(self):
+        """Advance every live snake one cell"""
+        self.tick_count += 1
+        moves = []
+        heads = collections.Counter()
+        for snake in self.snakes.values():
+            if not snake.alive:
+                continue
+            snake.direction = turn_snake(snake.direction, snake.requested)
+            snake.requested = None
+            head = tuple(next_head(snake.body[0], snake.direction))
+            moves.append((snake, head))
+            heads[head] += 1
+
+        # Decide every collision against the grid as it was before the tick
+        # (like single-player, moving into a tail that is about to leave
+        # still counts), then apply the moves
+        dead = []
+        for snake, head in moves:
+            if off_grid(head, self.grid_size):
+                snake.reason = 'wall_collision'
+            elif self.grid[self._cell(*head)] == BODY:
+                snake.reason = 'snake_collision'
+            elif heads[head] > 1:
+                snake.reason = 'head_on_collision'
+            else:
+                continue
+            dead.append(snake)
+        for snake in dead:
+            snake.alive = False
+            self._remove_body(snake)
+            snake.body.clear()
+
+        for snake, head in moves:
+            if not snake.alive:
+                continue
+            cell = self._cell(*head)
+            ate = self.grid[cell] == FOOD
+            snake.body.appendleft(head)
+            self.grid[cell] = BODY
+            if ate:
+                snake.score += SNAKE_FOOD_POINTS
+                self.food.discard(head)
+            else:
+                x, y = snake.body.pop()
+                self.grid[self._cell(x, y)] = EMPTY
+        self._spawn_food()
+
+        if self.tick_count % 20 == 0:
+            self._reap_idle()
+        self._refresh_state()
+
+    def _reap_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for player_id in [p for p, s in self.snakes.items() if s.last_seen < cutoff]:
+            self.leave(player_id)
+        if not self.snakes:
+            self.closed = True
+
+    def _refresh_state(self):
+        # Built once per tick and shared by every player polling the arena
+        self.state = {
+            'arena_id': self.arena_id,
+            'tick': self.tick_count,
+            'grid_size': self.grid_size,
+            'snakes': [snake.to_dict() for snake in self.snakes.values()],
+            'food': [list(cell) for cell in self.food]
+        }
+
+
+class ArenaScheduler:
+    """Ticks many arenas from a single thread using a deadline heap"""
+
+    def __init__(self, tick_interval=0.15):
+        self.tick_interval = tick_interval
+        self._heap = []
+        self._order = itertools.count()
+        self._wakeup = threading.Condition()
+        self._thread = None
+        self.started_at = None
+        self.busy = 0.0
+        self.ticks = 0
+        self.skipped = 0
+        self.failed = 0
+        self.max_tick = 0.0
+
+    def add(self, arena):
+        with self._wakeup:
+            heapq.heappush(self._heap, (time.monotonic() + self.tick_interval,
+                                        next(self._order), arena))
+            if self._thread is None:
+                # Started on first use so it lives in the worker, not the
+                # preloading master
+                self.started_at = time.monotonic()
+                self._thread = threading.Thread(target=self._run, name='snake-arenas',
+                                                daemon=True)
+                self._thread.start()
+            self._wakeup.notify()
+
+    def run_due(self, now):
+        """Tick every arena whose deadline has passed; return the next deadline"""
+        while True:
+            with self._wakeup:
+                if not self._heap:
+                    return None
+                deadline, _, arena = self._heap[0]
+                if deadline > now:
+                    return deadline
+                heapq.heappop(self._heap)
+            if arena.closed:
+                continue
+
+            started = time.perf_counter()
+            try:
+                with arena.lock:
+                    arena.tick()
+            except Exception:
+                # The thread drives every arena of the process; losing one
+                # tick of one arena beats stopping them all
+                self.failed += 1
+                logger.exception('tick of snake arena %s failed', arena.arena_id)
+            elapsed = time.perf_counter() - started
+            self.busy += elapsed
+            self.ticks += 1
+            self.max_tick = max(self.max_tick, elapsed)
+
+            # Fixed rate: the next deadline follows the previous one, not
+            # the end of this tick; if a whole interval was lost, skip ahead
+            deadline += self.tick_interval
+            if deadline < now:
+                missed = int((now - deadline) // self.tick_interval) + 1
+                self.skipped += missed
+                deadline += missed * self.tick_interval
+            if not arena.closed:
+                with self._wakeup:
+                    heapq.heappush(self._heap, (deadline, next(self._order), arena))
+
+    def _run(self):
+        while True:
+            next_deadline = self.run_due(time.monotonic())
+            with self._wakeup:
+                timeout = None if next_deadline is None else next_deadline - time.monotonic()
+                if timeout is None or timeout > 0:
+                    self._wakeup.wait(timeout)
+
+    def stats(self):
+        wall = time.monotonic() - self.started_at if self.started_at else 0.0
+        with self._wakeup:
+            arenas = sum(1 for _, _, arena in self._heap if not arena.closed)
+        usage = self.busy / wall if wall else 0.0
+        return {
+            'arenas': arenas,
+            'tick_interval_ms': self.tick_interval * 1000,
+            'ticks': self.ticks,
+            'skipped_ticks': self.skipped,
+            'failed_ticks': self.failed,
+            'avg_tick_us': self.busy / self.ticks * 1e6 if self.ticks else 0.0,
+            'max_tick_us': self.max_tick * 1e6,
+            # Share of one core spent ticking; arenas / usage estimates how
+            # many arenas a core can hold at this tick rate
+            'budget_usage': usage,
+            'arenas_per_core': arenas / usage if usage else None
+        }
+
+
+class ArenaManager:
+    """Matchmaking over the arenas of one process"""
+
+    def __init__(self, tick_interval=0.15, grid_size=48, max_players=16):
+        self.grid_size = grid_size
+        self.max_players = max_players
+        self.scheduler = ArenaScheduler(tick_interval)
+        self.arenas = {}
+        self._lock = threading.Lock()
+
+    def join(self, name):
+        """Put a new snake into an arena with room; returns (arena, snake)"""
+        with self._lock:
+            for arena_id, arena in list(self.arenas.items()):
+                if arena.closed:
+                    del self.arenas[arena_id]
+                    continue
+                with arena.lock:
+                    snake = arena.join(name)
+                if snake is not None:
+                    return arena, snake
+            arena = Arena(self.grid_size, self.max_players)
+            with arena.lock:
+                snake = arena.join(name)
+            self.arenas[arena.arena_id] = arena
+        self.scheduler.add(arena)
+        return arena, snake
+
+    def get(self, arena_id):
+        arena = self.arenas.get(arena_id)
+        if arena is None or arena.closed:
+            return None
+        return arena
@@ -2,6 +2,9 @@
 let currentGame = null;
 let gameData = {};
 let currentPlayer = null;
+let leaderboardData = {};
+let activeLeaderboardGame = 'number_guess';
+let leaderboardStream = null;
 
 // API base URL
 const API_BASE = '/api/games';
@@ -9,10 +12,8 @@ const API_BASE = '/api/games';
 // Initialize the application
 document.addEventListener('DOMContentLoaded', function() {
     initializeNavigation();
-    loadLeaderboard();
     initializeAnimations();
-    checkCurrentPlayer();
-    loadPlayerBestScores();
+    loadBootstrap();
 });
 
 // Navigation functionality
@@ -85,20 +86,34 @@ function initializeAnimations() {
     });
 }
 
-// Player management
-async function checkCurrentPlayer() {
+// Initial page state: current player, their scores and the leaderboards.
+// The server may inline it into index.html; otherwise it is one API call.
+async function loadBootstrap() {
     try {
-        const response = await fetch('/api/players/current');
-        if (response.ok) {
-            const data = await response.json();
-            currentPlayer = data;
-            updatePlayerUI();
+        const inline = document.getElementById('bootstrap-data');
+        let data;
+        if (inline) {
+            data = JSON.parse(inline.textContent);
+        } else {
+            const response = await fetch('/api/bootstrap');
+            data = await response.json();
+        }
+        
+        currentPlayer = data.player;
+        if (currentPlayer) {
+            console.log('Current player:', currentPlayer);
+        }
+        showPlayerBestScores(data.standings);
+        renderLeaderboard(data.leaderboards);
+        if (data.leaderboard_stream) {
+            subscribeLeaderboard(); // Only servers with threads to spare offer it
         }
     } catch (error) {
-        console.log('No player logged in');
+        console.error('Error loading page data:', error);
     }
 }
 
+// Player management
 function updatePlayerUI() {
     // You can add UI updates here to show logged in player
     console.log('Current player:', currentPlayer);
@@ -108,37 +123,34 @@ function updatePlayerUI() {
 // Load player's best scores for each game
 async function loadPlayerBestScores() {
     if (!currentPlayer) {
-        // Reset all points to 0 if no player logged in
-        document.getElementById('number-guess-points').textContent = '0 pts';
-        document.getElementById('rps-points').textContent = '0 pts';
-        document.getElementById('tictactoe-points').textContent = '0 pts';
-        document.getElementById('memory-points').textContent = '0 pts';
-        document.getElementById('snake-points').textContent = '0 pts';
+        showPlayerBestScores(null);
         return;
     }
     
     try {
-        const response = await fetch('/api/leaderboard');
+        const response = await fetch('/api/bootstrap');
         const data = await response.json();
-        
-        // Find current player's best scores
-        const gameTypes = ['number_guess', 'rps', 'tictactoe', 'memory', 'snake'];
-        gameTypes.forEach(gameType => {
-            const scores = data[gameType] || [];
-            const playerScore = scores.find(score => score.player_name === currentPlayer.name);
-            const points = playerScore ? playerScore.points : 0;
-            
-            const gameKey = gameType.replace('_', '-');
-            const pointsElement = document.getElementById(`${gameKey}-points`);
-            if (pointsElement) {
-                pointsElement.textContent = `${points} pts`;
-            }
-        });
+        showPlayerBestScores(data.standings);
     } catch (error) {
         console.error('Error loading player scores:', error);
     }
 }
 
+// Show the player's leaderboard total per game ({best, total, rank} each)
+function showPlayerBestScores(standings) {
+    const gameTypes = ['number_guess', 'rps', 'tictactoe', 'memory', 'snake'];
+    gameTypes.forEach(gameType => {
+        const standing = standings ? standings[gameType] : null;
+        const points = standing ? standing.total : 0;
+        
+        const gameKey = gameType.replace('_', '-');
+        const pointsElement = document.getElementById(`${gameKey}-points`);
+        if (pointsElement) {
+            pointsElement.textContent = `${points} pts`;
+        }
+    });
+}
+
 // Create Player Modal Functions
 function showCreatePlayerModal() {
     const modal = document.getElementById('create-player-modal');
@@ -157,6 +169,35 @@ function closeCreatePlayerModal() {
     document.body.style.overflow = 'auto';
 }
 
+// Tell the player whether the name is free while they type
+let nameCheckTimer = null;
+
+function checkPlayerName() {
+    clearTimeout(nameCheckTimer);
+    const feedback = document.getElementById('registration-feedback');
+    const name = document.getElementById('player-name-input').value.trim();
+    if (!name) {
+        feedback.innerHTML = '';
+        return;
+    }
+    
+    nameCheckTimer = setTimeout(async () => {
+        try {
+            const response = await fetch(`/api/players/available?name=${encodeURIComponent(name)}`);
+            const data = await response.json();
+            // Ignore answers for a name the player has already changed
+            if (!response.ok || document.getElementById('player-name-input').value.trim() !== name) {
+                return;
+            }
+            feedback.innerHTML = data.available
+                ? '<span style="color: #28a745;">This Player Name is available.</span>'
+                : '<span style="color: #dc3545;">This Player Name has been taken. Please make another one.</span>';
+        } catch (error) {
+            console.error('Error checking player name:', error);
+        }
+    }, 250);
+}
+
 async function registerPlayer() {
     const nameInput = document.getElementById('player-name-input');
     const passwordInput = document.getElementById('player-password-input');
@@ -165,6 +206,7 @@ async function registerPlayer() {
     const name = nameInput.value.trim();
     const password = passwordInput.value.trim();
     
+    clearTimeout(nameCheckTimer);
     if (!name || !password) {
         feedback.innerHTML = '<span style="color: #dc3545;">Please enter both name and password!</span>';
         return;
@@ -204,32 +246,36 @@ async function registerPlayer() {
     }
 }
 
-async function addScore(gameType, points, attempts = 0, difficulty = 'medium') {
-    if (!currentPlayer) {
-        console.log('No player logged in, score not saved');
+// The server records the score on the final move and returns the player's
+// updated standing ({points, best, total, rank}) with it
+function showStanding(gameType, standing) {
+    if (!standing) {
         return;
     }
     
-    try {
-        const response = await fetch('/api/scores/add', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                game_type: gameType,
-                points: points,
-                attempts: attempts,
-                difficulty: difficulty
-            })
-        });
-        
-        if (response.ok) {
-            console.log('Score added successfully');
-            loadLeaderboard(); // Refresh leaderboard
-            loadPlayerBestScores(); // Refresh player's best scores
-        }
-    } catch (error) {
-        console.error('Error adding score:', error);
+    const gameKey = gameType.replace('_', '-');
+    const pointsElement = document.getElementById(`${gameKey}-points`);
+    if (pointsElement) {
+        pointsElement.textContent = `${standing.total} pts`;
+    }
+    if (standing.percentile !== undefined) {
+        showPercentile(standing.percentile);
+    }
+    if (!leaderboardStream || leaderboardStream.readyState === EventSource.CLOSED) {
+        loadLeaderboard(); // No live stream, refresh by hand
+    }
+}
+
+// "You beat X% of scores" under the game that just ended
+function showPercentile(percentile) {
+    let note = document.getElementById('standing-percentile');
+    if (!note) {
+        note = document.createElement('div');
+        note.id = 'standing-percentile';
+        note.style.cssText = 'margin-top: 1rem; color: var(--text-gray); text-align: center;';
+        document.getElementById('modal-body').appendChild(note);
     }
+    note.textContent = `You beat ${Math.round(percentile)}% of recorded scores at this difficulty.`;
 }
 
 // Game management functions
@@ -283,6 +329,9 @@ function closeGameModal() {
     if (currentGame === 'snake' && gameData.snakeInterval) {
         clearInterval(gameData.snakeInterval);
     }
+    if (currentGame === 'snake' && gameData.arena && gameData.arena.isRunning) {
+        leaveSnakeArena();
+    }
     
     currentGame = null;
     gameData = {};
@@ -388,11 +437,7 @@ async function makeGuess() {
                 </div>
             `;
             guessInput.disabled = true;
-            
-            // Calculate points based on attempts and difficulty
-            const maxAttempts = gameData.numberGuess.max_attempts || 10;
-            const points = Math.max(1, maxAttempts - data.attempts + 1);
-            await addScore('number_guess', points, data.attempts, gameData.numberGuess.difficulty);
+            showStanding('number_guess', data.standing);
             
         } else if (data.result === 'game_over') {
             feedback.innerHTML = `
@@ -401,8 +446,7 @@ async function makeGuess() {
                 </div>
             `;
             guessInput.disabled = true;
-            // Add 0 points for game over
-            await addScore('number_guess', 0, data.attempts, gameData.numberGuess.difficulty);
+            showStanding('number_guess', data.standing);
         } else {
             feedback.innerHTML = `
                 <div style="color: #ffc107;">
@@ -498,24 +542,20 @@ async function playRPS(choice) {
         setTimeout(async () => {
             let resultText = '';
             let resultColor = '';
-            let points = 0;
             
             if (data.result === 'win') {
                 resultText = '🎉 You Win!';
                 resultColor = '#28a745';
-                points = 1;
                 gameData.rps.playerScore++;
                 document.getElementById('player-score').textContent = gameData.rps.playerScore;
             } else if (data.result === 'lose') {
                 resultText = '😞 You Lose!';
                 resultColor = '#dc3545';
-                points = 0;
                 gameData.rps.computerScore++;
                 document.getElementById('computer-score').textContent = gameData.rps.computerScore;
             } else {
                 resultText = '🤝 It\'s a Tie!';
                 resultColor = '#ffc107';
-                points = 0;
             }
             
             resultDiv.innerHTML += `
@@ -524,8 +564,7 @@ async function playRPS(choice) {
                 </div>
             `;
             
-            // Add score
-            await addScore('rps', points, 1, 'normal');
+            showStanding('rps', data.standing);
             
             // Re-enable buttons
             buttons.forEach(btn => btn.disabled = false);
@@ -614,20 +653,15 @@ async function makeTTTMove(position) {
             const cells = document.querySelectorAll('.ttt-cell');
             cells.forEach(cell => cell.style.pointerEvents = 'none');
             
-            let points = 0;
             if (data.winner === 'X') {
                 statusDiv.innerHTML = '<span style="color: #28a745; font-weight: bold;">🎉 You Win!</span>';
-                points = 3;
             } else if (data.winner === 'O') {
                 statusDiv.innerHTML = '<span style="color: #dc3545; font-weight: bold;">😞 Computer Wins!</span>';
-                points = 0;
             } else {
                 statusDiv.innerHTML = '<span style="color: #ffc107; font-weight: bold;">🤝 It\'s a Tie!</span>';
-                points = 1;
             }
             
-            // Add score
-            await addScore('tictactoe', points, 1, 'normal');
+            showStanding('tictactoe', data.standing);
         } else {
             statusDiv.textContent = 'Your turn! Click a cell to place X.';
         }
@@ -659,6 +693,8 @@ function loadMemoryGame() {
                     <button class="game-button" onclick="startMemoryGame('easy')">Easy (4x4)</button>
                     <button class="game-button" onclick="startMemoryGame('medium')">Medium (6x6)</button>
                     <button class="game-button" onclick="startMemoryGame('hard')">Hard (8x8)</button>
+                    <button class="game-button" onclick="startMemoryGame('expert')">Expert (12x12)</button>
+                    <button class="game-button" onclick="startMemoryGame('master')">Master (16x16)</button>
                 </div>
             </div>
         </div>
@@ -675,10 +711,9 @@ async function startMemoryGame(difficulty) {
         
         const data = await response.json();
         gameData.memory = data;
-        gameData.memory.revealed = [];
         gameData.memory.matched = [];
         gameData.memory.moves = 0;
-        gameData.memory.waitingForHide = false;
+        gameData.memory.pendingHide = null;
         
         const modalBody = document.getElementById('modal-body');
         modalBody.innerHTML = `
@@ -694,7 +729,7 @@ async function startMemoryGame(difficulty) {
                     </div>
                 </div>
                 <div class="game-board">
-                    <div class="memory-grid" id="memory-grid" style="grid-template-columns: repeat(${data.grid_size}, 1fr);">
+                    <div class="memory-grid${data.grid_size > 8 ? ' memory-grid-large' : ''}" id="memory-grid" style="grid-template-columns: repeat(${data.grid_size}, 1fr);">
                         ${Array(data.grid_size * data.grid_size).fill(0).map((_, i) => 
                             `<div class="memory-card" onclick="flipMemoryCard(${i})" data-index="${i}">?</div>`
                         ).join('')}
@@ -709,10 +744,14 @@ async function startMemoryGame(difficulty) {
     }
 }
 
+function hideMemoryCard(index) {
+    const card = document.querySelector(`[data-index="${index}"]`);
+    card.textContent = '?';
+    card.classList.remove('flipped');
+}
+
 async function flipMemoryCard(cardIndex) {
-    if (gameData.memory.waitingForHide || 
-        gameData.memory.revealed.includes(cardIndex) || 
-        gameData.memory.matched.includes(cardIndex)) {
+    if (gameData.memory.matched.includes(cardIndex)) {
         return;
     }
     
@@ -727,6 +766,15 @@ async function flipMemoryCard(cardIndex) {
         });
         
         const data = await response.json();
+        if (!response.ok) {
+            return;
+        }
+        
+        // The server hides the previous mismatched pair on the next flip
+        if (data.hidden.length) {
+            data.hidden.forEach(hideMemoryCard);
+            gameData.memory.pendingHide = null;
+        }
         
         // Update card display
         const card = document.querySelector(`[data-index="${cardIndex}"]`);
@@ -735,16 +783,14 @@ async function flipMemoryCard(cardIndex) {
         
         if (data.status === 'match') {
             // Handle match
+            gameData.memory.matched.push(...data.pair);
             setTimeout(() => {
-                const firstCard = document.querySelector(`[data-index="${data.first_card || gameData.memory.firstCard}"]`);
-                const secondCard = document.querySelector(`[data-index="${cardIndex}"]`);
-                
-                firstCard.classList.remove('flipped');
-                firstCard.classList.add('matched');
-                secondCard.classList.remove('flipped');
-                secondCard.classList.add('matched');
+                data.pair.forEach(index => {
+                    const matchedCard = document.querySelector(`[data-index="${index}"]`);
+                    matchedCard.classList.remove('flipped');
+                    matchedCard.classList.add('matched');
+                });
                 
-                gameData.memory.matched.push(...[data.first_card || gameData.memory.firstCard, cardIndex]);
                 gameData.memory.moves = data.moves;
                 
                 document.getElementById('memory-moves').textContent = data.moves;
@@ -753,41 +799,24 @@ async function flipMemoryCard(cardIndex) {
                 if (data.game_status === 'completed') {
                     document.getElementById('memory-status').innerHTML = 
                         '<span style="color: #28a745; font-weight: bold;">🎉 Congratulations! You completed the game!</span>';
-                    
-                    // Calculate points based on moves and difficulty
-                    const maxMoves = gameData.memory.total_pairs * 3; // Generous max moves
-                    const points = Math.max(1, maxMoves - data.moves + 1);
-                    addScore('memory', points, data.moves, gameData.memory.difficulty);
+                    showStanding('memory', data.standing);
                 }
             }, 500);
             
         } else if (data.status === 'no_match') {
-            // Handle no match
-            gameData.memory.waitingForHide = true;
+            // Handle no match: turn the pair back after a moment unless the
+            // next flip (which hides it server-side) comes first
+            const pair = data.pair;
+            gameData.memory.pendingHide = pair;
             gameData.memory.moves = data.moves;
             document.getElementById('memory-moves').textContent = data.moves;
             
-            setTimeout(async () => {
-                // Hide cards
-                await fetch(`${API_BASE}/memory/hide-cards`, {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ game_id: gameData.memory.game_id })
-                });
-                
-                const firstCard = document.querySelector(`[data-index="${data.first_card}"]`);
-                const secondCard = document.querySelector(`[data-index="${cardIndex}"]`);
-                
-                firstCard.textContent = '?';
-                firstCard.classList.remove('flipped');
-                secondCard.textContent = '?';
-                secondCard.classList.remove('flipped');
-                
-                gameData.memory.waitingForHide = false;
+            setTimeout(() => {
+                if (gameData.memory.pendingHide === pair) {
+                    pair.forEach(hideMemoryCard);
+                    gameData.memory.pendingHide = null;
+                }
             }, 1500);
-        } else {
-            // First card of pair
-            gameData.memory.firstCard = cardIndex;
         }
         
     } catch (error) {
@@ -815,6 +844,7 @@ function loadSnakeGame() {
                 <div style="margin-top: 1rem;">
                     <p>Use WASD or Arrow Keys to move</p>
                     <button class="game-button" onclick="startSnakeGame()">Start Game</button>
+                    <button class="game-button" onclick="joinSnakeArena()" id="arena-btn">Multiplayer Arena</button>
                     <button class="game-button" onclick="pauseSnakeGame()" id="pause-btn" style="display: none;">Pause</button>
                 </div>
                 <div id="snake-status" style="margin-top: 1rem; font-size: 1.1rem;"></div>
@@ -843,6 +873,7 @@ async function startSnakeGame() {
         
         // Show pause button, hide start button
         document.querySelector('button[onclick="startSnakeGame()"]').style.display = 'none';
+        document.getElementById('arena-btn').style.display = 'none';
         document.getElementById('pause-btn').style.display = 'inline-block';
         
         // Start game loop
@@ -898,10 +929,10 @@ async function updateSnakeGame() {
             
             // Show start button, hide pause button
             document.querySelector('button[onclick="startSnakeGame()"]').style.display = 'inline-block';
+            document.getElementById('arena-btn').style.display = 'inline-block';
             document.getElementById('pause-btn').style.display = 'none';
             
-            // Add score
-            await addScore('snake', data.score, 1, 'normal');
+            showStanding('snake', data.standing);
         } else {
             gameData.snake.snake = data.snake;
             gameData.snake.food = data.food;
@@ -947,7 +978,9 @@ function drawSnakeGame() {
 
 function setupSnakeControls() {
     document.addEventListener('keydown', function(e) {
-        if (!gameData.snake || !gameData.snake.isRunning || gameData.snake.isPaused) {
+        // Arena turns are sent with the next poll
+        const target = gameData.arena && gameData.arena.isRunning ? gameData.arena : gameData.snake;
+        if (!target || !target.isRunning || target.isPaused) {
             return;
         }
         
@@ -974,47 +1007,179 @@ function setupSnakeControls() {
         }
         
         if (newDirection) {
-            gameData.snake.direction = newDirection;
+            target.direction = newDirection;
             e.preventDefault();
         }
     });
 }
 
-// Leaderboard functionality
-async function loadLeaderboard() {
+// Multiplayer snake arena: the server ticks every snake at a fixed rate;
+// the page polls once per tick, sending the latest turn with the poll
+async function joinSnakeArena() {
     try {
-        const response = await fetch('/api/leaderboard');
+        const response = await fetch(`${API_BASE}/snake/arena/join`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ name: currentPlayer ? currentPlayer.name : null })
+        });
+        
         const data = await response.json();
+        gameData.arena = data;
+        gameData.arena.isRunning = true;
+        gameData.arena.direction = null;
         
-        // Update leaderboard tabs to include all games
-        const tabsContainer = document.querySelector('.leaderboard-tabs');
-        if (tabsContainer) {
-            tabsContainer.innerHTML = `
-                <button class="tab-button active" data-game="number_guess">Number Guess</button>
-                <button class="tab-button" data-game="rps">Rock Paper Scissors</button>
-                <button class="tab-button" data-game="tictactoe">Tic Tac Toe</button>
-                <button class="tab-button" data-game="memory">Memory</button>
-                <button class="tab-button" data-game="snake">Snake</button>
-            `;
-            
-            // Add click listeners to tabs
-            document.querySelectorAll('.tab-button').forEach(button => {
-                button.addEventListener('click', function() {
-                    document.querySelectorAll('.tab-button').forEach(b => b.classList.remove('active'));
-                    this.classList.add('active');
-                    displayLeaderboard(data[this.dataset.game] || [], this.dataset.game);
-                });
-            });
+        document.getElementById('snake-score').textContent = '0';
+        document.getElementById('snake-length').textContent = '1';
+        document.getElementById('snake-status').textContent = 'Arena joined - other players share this grid';
+        document.querySelector('button[onclick="startSnakeGame()"]').style.display = 'none';
+        document.getElementById('arena-btn').style.display = 'none';
+        
+        gameData.snakeInterval = setInterval(updateSnakeArena, data.tick_ms);
+    } catch (error) {
+        console.error('Error joining snake arena:', error);
+    }
+}
+
+async function updateSnakeArena() {
+    const arena = gameData.arena;
+    if (!arena || !arena.isRunning) {
+        return;
+    }
+    
+    const direction = arena.direction;
+    arena.direction = null;
+    
+    try {
+        const response = await fetch(`${API_BASE}/snake/arena/move`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                arena_id: arena.arena_id,
+                player_id: arena.player_id,
+                direction: direction
+            })
+        });
+        
+        const data = await response.json();
+        if (!response.ok) {
+            arena.isRunning = false;
+            clearInterval(gameData.snakeInterval);
+            return;
         }
         
-        // Display first game's leaderboard by default
-        displayLeaderboard(data.number_guess || [], 'number_guess');
+        drawSnakeArena(data.arena);
+        document.getElementById('snake-score').textContent = data.you.score;
         
+        if (!data.you.alive) {
+            arena.isRunning = false;
+            clearInterval(gameData.snakeInterval);
+            
+            document.getElementById('snake-status').innerHTML = 
+                `<span style="color: #dc3545; font-weight: bold;">Game Over! Final Score: ${data.you.score}</span>`;
+            document.querySelector('button[onclick="startSnakeGame()"]').style.display = 'inline-block';
+            document.getElementById('arena-btn').style.display = 'inline-block';
+            
+            showStanding('snake', data.you.standing);
+            leaveSnakeArena();
+        }
+    } catch (error) {
+        console.error('Error updating snake arena:', error);
+    }
+}
+
+function leaveSnakeArena() {
+    const arena = gameData.arena;
+    arena.isRunning = false;
+    fetch(`${API_BASE}/snake/arena/leave`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ arena_id: arena.arena_id, player_id: arena.player_id })
+    });
+}
+
+function drawSnakeArena(state) {
+    const canvas = document.getElementById('snake-canvas');
+    const ctx = canvas.getContext('2d');
+    const cellSize = canvas.width / state.grid_size;
+    
+    // Clear canvas
+    ctx.fillStyle = 'rgba(26, 26, 46, 0.9)';
+    ctx.fillRect(0, 0, canvas.width, canvas.height);
+    
+    // Draw snakes, ours in the single-player colours
+    state.snakes.forEach(other => {
+        const mine = other.id === gameData.arena.id;
+        if (mine) {
+            document.getElementById('snake-length').textContent = other.snake.length;
+        }
+        other.snake.forEach((segment, index) => {
+            if (mine) {
+                ctx.fillStyle = index === 0 ? '#28A745' : '#007BFF';
+            } else {
+                ctx.fillStyle = index === 0 ? '#ffc107' : '#6c757d';
+            }
+            ctx.fillRect(segment[0] * cellSize, segment[1] * cellSize, cellSize - 1, cellSize - 1);
+        });
+    });
+    
+    // Draw food
+    ctx.fillStyle = '#dc3545';
+    state.food.forEach(cell => {
+        ctx.fillRect(cell[0] * cellSize, cell[1] * cellSize, cellSize - 1, cellSize - 1);
+    });
+}
+
+// Leaderboard functionality
+async function loadLeaderboard() {
+    try {
+        const response = await fetch('/api/leaderboard');
+        renderLeaderboard(await response.json());
     } catch (error) {
         console.error('Error loading leaderboard:', error);
     }
 }
 
+// Live updates: a full snapshot on connect, then only the games that changed
+function subscribeLeaderboard() {
+    if (!window.EventSource) return;
+    
+    leaderboardStream = new EventSource('/api/leaderboard/stream');
+    leaderboardStream.addEventListener('leaderboard', event => {
+        const update = JSON.parse(event.data);
+        renderLeaderboard(Object.assign({}, leaderboardData, update.games));
+    });
+}
+
+function renderLeaderboard(data) {
+    leaderboardData = data;
+    
+    // Update leaderboard tabs to include all games
+    const tabsContainer = document.querySelector('.leaderboard-tabs');
+    if (tabsContainer && !tabsContainer.dataset.ready) {
+        tabsContainer.dataset.ready = 'true';
+        tabsContainer.innerHTML = `
+            <button class="tab-button active" data-game="number_guess">Number Guess</button>
+            <button class="tab-button" data-game="rps">Rock Paper Scissors</button>
+            <button class="tab-button" data-game="tictactoe">Tic Tac Toe</button>
+            <button class="tab-button" data-game="memory">Memory</button>
+            <button class="tab-button" data-game="snake">Snake</button>
+        `;
+        
+        // Add click listeners to tabs
+        document.querySelectorAll('.tab-button').forEach(button => {
+            button.addEventListener('click', function() {
+                document.querySelectorAll('.tab-button').forEach(b => b.classList.remove('active'));
+                this.classList.add('active');
+                activeLeaderboardGame = this.dataset.game;
+                displayLeaderboard(leaderboardData[activeLeaderboardGame] || [], activeLeaderboardGame);
+            });
+        });
+    }
+    
+    // Keep showing the selected game (the first one by default)
+    displayLeaderboard(data[activeLeaderboardGame] || [], activeLeaderboardGame);
+}
+
 function displayLeaderboard(scores, gameType) {
     const tableContainer = document.getElementById('leaderboard-table');
     if (!tableContainer) return;
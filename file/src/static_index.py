@@ -0,0 +1,174 @@
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import Response, request, send_file
+
+# Files up to this size are kept in memory; larger ones are streamed from disk
+MAX_CACHED_SIZE = 256 * 1024
+
+# index.html must revalidate so new deploys are picked up; other assets can be
+# reused for a while without asking the server
+HTML_CACHE_CONTROL = 'no-cache'
+ASSET_CACHE_CONTROL = 'public, max-age=3600'
+# Content-hashed build outputs never change under the same name
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Precompressed siblings written by src.tools.build_static, best first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+MANIFEST_NAME = 'manifest.json'
+
+
+class StaticEntry:
+    """Precomputed metadata (and optionally content) for one static file"""
+
+    __slots__ = ('path', 'size', 'mtime', 'last_modified', 'etag', 'mimetype',
+                 'cache_control', 'data', 'encodings')
+
+    def __init__(self, path, mimetype, cache_control, max_cached_size):
+        stat = os.stat(path)
+        self.path = path
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        self.last_modified = datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        # Content-Encoding -> StaticEntry for precompressed siblings
+        self.encodings = {}
+
+        if self.size <= max_cached_size:
+            with open(path, 'rb') as f:
+                self.data = f.read()
+            self.etag = hashlib.blake2b(self.data, digest_size=12).hexdigest()
+        else:
+            self.data = None
+            self.etag = f'{int(self.mtime * 1000):x}-{self.size:x}'
+
+
+class StaticIndex:
+    """In-memory index of the static folder for the SPA catch-all route.
+
+    The folder is scanned once; lookups never touch the filesystem. With
+    ``watch`` enabled a daemon thread polls for changes and swaps in a fresh
+    index, which is meant for development only.
+    """
+
+    def __init__(self, folder, index_name='index.html', max_cached_size=MAX_CACHED_SIZE,
+                 watch=False, watch_interval=1.0):
+        self.folder = folder
+        self.index_name = index_name
+        self.max_cached_size = max_cached_size
+        self.entries = {}
+        self.index_entry = None
+        self.rescan()
+        if watch:
+            thread = threading.Thread(target=self._watch, args=(watch_interval,),
+                                      name='static-index-watch', daemon=True)
+            thread.start()
+
+    def _load_hashed_names(self):
+        try:
+            with open(os.path.join(self.folder, MANIFEST_NAME)) as f:
+                return set(json.load(f).values())
+        except (OSError, ValueError):
+            return set()
+
+    def _cache_control(self, name, mimetype, hashed_names):
+        if name in hashed_names:
+            return IMMUTABLE_CACHE_CONTROL
+        if mimetype == 'text/html':
+            return HTML_CACHE_CONTROL
+        return ASSET_CACHE_CONTROL
+
+    def rescan(self):
+        """Walk the static folder and atomically replace the index"""
+        entries = {}
+        if self.folder and os.path.isdir(self.folder):
+            hashed_names = self._load_hashed_names()
+            names = {}
+            for root, _, files in os.walk(self.folder):
+                for filename in files:
+                    path = os.path.join(root, filename)
+                    names[os.path.relpath(path, self.folder).replace(os.sep, '/')] = path
+
+            compressed = set()
+            for name, path in names.items():
+                if name == MANIFEST_NAME or name in compressed:
+                    continue
+                mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                cache_control = self._cache_control(name, mimetype, hashed_names)
+                entry = StaticEntry(path, mimetype, cache_control, self.max_cached_size)
+                for encoding, suffix in ENCODINGS:
+                    if name + suffix in names:
+                        compressed.add(name + suffix)
+                        entry.encodings[encoding] = StaticEntry(
+                            names[name + suffix], mimetype, cache_control, self.max_cached_size)
+                entries[name] = entry
+            for name in compressed:
+                entries.pop(name, None)
+        self.entries = entries
+        self.index_entry = entries.get(self.index_name)
+
+    def _signature(self):
+        signature = []
+        for root, _, files in os.walk(self.folder):
+            for filename in files:
+                try:
+                    stat = os.stat(os.path.join(root, filename))
+                except OSError:
+                    continue
+                signature.append((root, filename, stat.st_mtime, stat.st_size))
+        return sorted(signature)
+
+    def _watch(self, interval):
+        last = self._signature()
+        while True:
+            time.sleep(interval)
+            current = self._signature()
+            if current != last:
+                last = current
+                self.rescan()
+
+    def lookup(self, path):
+        """Return the entry for ``path``, falling back to index.html"""
+        if path:
+            entry = self.entries.get(path)
+            if entry is not None:
+                return entry
+        return self.index_entry
+
+    def respond(self, entry):
+        """Build a conditional response for ``entry`` (304 when unchanged).
+
+        Precompressed siblings are negotiated through Accept-Encoding.
+        """
+        variant = entry
+        encoding = None
+        for name, _ in ENCODINGS:
+            if name in entry.encodings and request.accept_encodings[name]:
+                variant = entry.encodings[name]
+                encoding = name
+                break
+        response = self._send(variant)
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        if entry.encodings:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = entry.cache_control
+        return response
+
+    def _send(self, entry):
+        if entry.data is None:
+            response = send_file(entry.path, mimetype=entry.mimetype, etag=entry.etag,
+                                 last_modified=entry.last_modified, conditional=True)
+        else:
+            response = Response(entry.data, mimetype=entry.mimetype)
+            response.set_etag(entry.etag)
+            response.last_modified = entry.last_modified
+            response.make_conditional(request)
+        return response
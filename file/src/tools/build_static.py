@@ -0,0 +1,279 @@
+"""Build the static assets for production.
+
+Run from the ``file`` directory:
+
+    python -m src.tools.build_static
+
+Reads ``src/static`` and writes ``src/static_dist``: JS/CSS are minified,
+every asset except ``index.html`` and ``favicon.ico`` gets a content-hashed
+filename, references in ``index.html`` and the stylesheet are rewritten, and
+compressible files get ``.gz`` (and ``.br`` when the ``brotli`` package is
+installed) siblings. ``manifest.json`` maps original names to hashed ones;
+the server uses it to send those files with immutable caching.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static')
+DIST_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static_dist')
+
+MANIFEST_NAME = 'manifest.json'
+
+# Served under their original names (entry point and browser convention)
+UNHASHED = {'index.html', 'favicon.ico'}
+
+COMPRESSIBLE = ('.html', '.js', '.css', '.svg', '.json', '.ico', '.txt')
+
+# Below this size compression is not worth a second file
+MIN_COMPRESS_SIZE = 512
+
+
+def minify_css(source):
+    """Strip comments and redundant whitespace, leaving string literals alone"""
+    parts = re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', source)
+    out = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            out.append(part)
+            continue
+        part = re.sub(r'/\*.*?\*/', '', part, flags=re.S)
+        part = re.sub(r'\s+', ' ', part)
+        # Spaces before ':' are kept: ".a :hover" differs from ".a:hover"
+        part = re.sub(r'\s*([{};,>])\s*', r'\1', part)
+        part = re.sub(r':\s+', ':', part)
+        part = part.replace(';}', '}')
+        out.append(part)
+    return ''.join(out).strip()
+
+
+def minify_js(source):
+    """Conservative JS minifier: drops comments and collapses whitespace.
+
+    Strings and template literals (including nested ``${}`` expressions) are
+    copied verbatim and line breaks are kept wherever automatic semicolon
+    insertion could depend on them. Regex literals are not recognised, so
+    sources containing them should be minified with ``rjsmin`` instead
+    (used automatically when installed).
+    """
+    out = []
+    i = 0
+    n = len(source)
+    # Stack of contexts: 'code' entries carry the open brace depth of a ${}
+    stack = [['code', 0]]
+    pending_space = ''
+
+    def flush_space(next_char):
+        prev = out[-1][-1] if out and out[-1] else ''
+        if not pending_space or not prev:
+            return
+        if pending_space == '\n':
+            if prev in '{;,([' or next_char in '}])':
+                return
+            out.append('\n')
+        elif (prev.isalnum() or prev in '_$') and (next_char.isalnum() or next_char in '_$'):
+            out.append(' ')
+        elif prev in '+-' and next_char in '+-':
+            out.append(' ')
+
+    while i < n:
+        ch = source[i]
+        context = stack[-1]
+        if context[0] == 'template':
+            if ch == '\\':
+                out.append(source[i:i + 2])
+                i += 2
+            elif ch == '`':
+                out.append(ch)
+                stack.pop()
+                i += 1
+            elif source.startswith('${', i):
+                out.append('${')
+                stack.append(['code', 1])
+                i += 2
+            else:
+                out.append(ch)
+                i += 1
+            continue
+
+        if ch.isspace():
+            if ch == '\n' or '\n' in pending_space:
+                pending_space = '\n'
+            elif not pending_space:
+                pending_space = ' '
+            i += 1
+            continue
+        if source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            if not pending_space:
+                pending_space = ' '
+            continue
+
+        flush_space(ch)
+        pending_space = ''
+
+        if ch in '\'"':
+            j = i + 1
+            while j < n and source[j] != ch:
+                j += 2 if source[j] == '\\' else 1
+            out.append(source[i:j + 1])
+            i = j + 1
+        elif ch == '`':
+            out.append(ch)
+            stack.append(['template', 0])
+            i += 1
+        elif ch == '{' and len(stack) > 1:
+            context[1] += 1
+            out.append(ch)
+            i += 1
+        elif ch == '}' and len(stack) > 1:
+            context[1] -= 1
+            out.append(ch)
+            if context[1] == 0:
+                stack.pop()
+            i += 1
+        else:
+            out.append(ch)
+            i += 1
+    return ''.join(out).strip()
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def hashed_name(name, data):
+    root, ext = os.path.splitext(name)
+    return f'{root}.{content_hash(data)}{ext}'
+
+
+def rewrite_references(text, manifest):
+    """Replace bare references to original asset names with hashed ones"""
+    if not manifest:
+        return text
+    names = '|'.join(re.escape(name) for name in sorted(manifest, key=len, reverse=True))
+    pattern = re.compile(r'(?<=["\'(])(?:\./)?(' + names + r')(?=["\')?#])')
+    return pattern.sub(lambda match: manifest[match.group(1)], text)
+
+
+def minify(name, data):
+    if name.endswith('.js'):
+        try:
+            import rjsmin
+            return rjsmin.jsmin(data.decode('utf-8')).encode('utf-8')
+        except ImportError:
+            return minify_js(data.decode('utf-8')).encode('utf-8')
+    if name.endswith('.css'):
+        try:
+            import rcssmin
+            return rcssmin.cssmin(data.decode('utf-8')).encode('utf-8')
+        except ImportError:
+            return minify_css(data.decode('utf-8')).encode('utf-8')
+    return data
+
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def precompress(path, data, level):
+    """Write .gz/.br siblings when they are smaller than the original"""
+    written = []
+    if not path.endswith(COMPRESSIBLE) or len(data) < MIN_COMPRESS_SIZE:
+        return written
+    compressed = gzip.compress(data, compresslevel=level, mtime=0)
+    if len(compressed) < len(data):
+        write_file(path + '.gz', compressed)
+        written.append((path + '.gz', len(compressed)))
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            write_file(path + '.br', compressed)
+            written.append((path + '.br', len(compressed)))
+    return written
+
+
+def build(src_dir=SRC_DIR, dist_dir=DIST_DIR, gzip_level=9, log=print):
+    """Build ``dist_dir`` from ``src_dir`` and return the manifest"""
+    sources = {}
+    for root, _, files in os.walk(src_dir):
+        for filename in files:
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, src_dir).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                sources[name] = f.read()
+
+    # Binary assets first, then stylesheets (which reference images), then
+    # scripts, and finally the HTML that references everything else
+    def stage(name):
+        if name.endswith('.html'):
+            return 3
+        if name.endswith('.js'):
+            return 2
+        if name.endswith('.css'):
+            return 1
+        return 0
+
+    manifest = {}
+    outputs = {}
+    for name in sorted(sources, key=lambda name: (stage(name), name)):
+        data = sources[name]
+        if stage(name):
+            text = rewrite_references(data.decode('utf-8'), manifest)
+            data = minify(name, text.encode('utf-8'))
+        if name in UNHASHED or name.endswith('.html'):
+            outputs[name] = data
+        else:
+            target = hashed_name(name, data)
+            manifest[name] = target
+            outputs[target] = data
+
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    total_before = sum(len(data) for data in sources.values())
+    total_after = 0
+    for name, data in sorted(outputs.items()):
+        path = os.path.join(dist_dir, name)
+        write_file(path, data)
+        siblings = precompress(path, data, gzip_level)
+        smallest = min([len(data)] + [size for _, size in siblings])
+        total_after += smallest
+        original = next((src for src, dst in manifest.items() if dst == name), name)
+        log(f'{original:24} {len(sources[original]):>9,} -> {name:32} {len(data):>9,}'
+            + ''.join(f'  {os.path.splitext(p)[1]} {size:,}' for p, size in siblings))
+    write_file(os.path.join(dist_dir, MANIFEST_NAME),
+               json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    log(f'total {total_before:,} bytes -> {total_after:,} bytes on the wire (best encoding)')
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--src', default=SRC_DIR)
+    parser.add_argument('--dist', default=DIST_DIR)
+    parser.add_argument('--gzip-level', type=int, default=9)
+    args = parser.parse_args(argv)
+    if brotli is None:
+        print('brotli not installed; skipping .br files', file=sys.stderr)
+    build(args.src, args.dist, args.gzip_level)
+
+
+if __name__ == '__main__':
+    main()
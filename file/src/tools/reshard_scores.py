@@ -0,0 +1,104 @@
+"""Split the game_score table of an existing SQLite database into the
+per-game shard files of src/score_shards.py.
+
+Run from the ``file`` directory with the app's database and the shard
+directory it is going to use, with the app stopped (scores recorded
+while this runs could be left behind in app.db):
+
+    DATABASE_URL=sqlite:////srv/arcade/app.db SCORE_SHARD_DIR=/srv/arcade/scores \\
+        python -m src.tools.reshard_scores
+
+For each game type in GAME_TYPES the scores are copied, ids included, into
+``scores_<game_type>.db`` in batches of ``--batch-size``, the copy is
+counted against the source and only then are they deleted from app.db
+(kept with ``--keep``). Scores of other game types stay in app.db. An
+interrupted run can simply be started again: each game resumes after the
+highest copied id, and games already moved have nothing left to copy.
+"""
+import argparse
+import sys
+import time
+
+
+def reshard(app, batch_size=50000, keep=False, progress=None):
+    """Move every game's scores into its shard; return {game_type: count}"""
+    from src import score_shards
+    from src.models.user import GameScore, db
+    from src.scores import GAME_TYPES
+
+    columns = ', '.join(column.name for column in GameScore.__table__.columns)
+    marks = ', '.join('?' for _ in GameScore.__table__.columns)
+    moved = {}
+    with app.app_context():
+        if not score_shards.enabled():
+            raise SystemExit('Set SCORE_SHARD_DIR to the directory for the shard files.')
+        if db.engine.dialect.name != 'sqlite':
+            raise SystemExit('reshard_scores only reads SQLite databases.')
+        score_shards.create_tables()
+
+        for game_type in GAME_TYPES:
+            shard = score_shards.engine(game_type)
+            with db.engine.connect() as source, shard.connect() as target:
+                # Copied ids are the source's own, below the shard's id block
+                last_id = target.exec_driver_sql(
+                    'SELECT coalesce(max(id), 0) FROM game_score WHERE id < ?',
+                    (score_shards.ID_BLOCK,)).scalar()
+                while True:
+                    # Raw rows: both ends are SQLite, so values copy as stored
+                    rows = source.exec_driver_sql(
+                        f'SELECT {columns} FROM game_score WHERE game_type = ? AND id > ? '
+                        'ORDER BY id LIMIT ?', (game_type, last_id, batch_size)).all()
+                    if not rows:
+                        break
+                    target.exec_driver_sql(
+                        f'INSERT INTO game_score ({columns}) VALUES ({marks})',
+                        [tuple(row) for row in rows])
+                    target.commit()
+                    last_id = rows[-1][0]
+                    if progress:
+                        progress(game_type, last_id)
+                source.rollback()
+
+                expected, first, last = source.exec_driver_sql(
+                    'SELECT count(*), min(id), max(id) FROM game_score WHERE game_type = ?',
+                    (game_type,)).one()
+                copied = target.exec_driver_sql(
+                    'SELECT count(*) FROM game_score WHERE id BETWEEN ? AND ?',
+                    (first, last)).scalar() if expected else 0
+                target.rollback()
+                if copied != expected:
+                    raise SystemExit(f'{game_type}: copied {copied} of {expected} scores; '
+                                     'app.db left as it was, run again.')
+                if not keep:
+                    source.exec_driver_sql('DELETE FROM game_score WHERE game_type = ?',
+                                           (game_type,))
+                    source.commit()
+            moved[game_type] = expected
+    return moved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=50000)
+    parser.add_argument('--keep', action='store_true',
+                        help='leave the copied scores in app.db as well')
+    args = parser.parse_args(argv)
+
+    from src.main import create_app
+
+    app = create_app()
+    started = time.perf_counter()
+
+    def progress(game_type, last_id):
+        print(f'\r{game_type}: copied through id {last_id}', end='', file=sys.stderr)
+
+    moved = reshard(app, args.batch_size, args.keep, progress)
+    print(file=sys.stderr)
+    for game_type, count in moved.items():
+        print(f'{game_type:14} {count:>12,} scores')
+    print(f'Done in {time.perf_counter() - started:.1f}s'
+          + (' (scores kept in app.db too)' if args.keep else ''))
+
+
+if __name__ == '__main__':
+    main()
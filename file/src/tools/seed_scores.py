@@ -0,0 +1,203 @@
+"""Fill the Player and GameScore tables with synthetic rows for scale testing.
+
+Run from the ``file`` directory against a throwaway database:
+
+    DATABASE_URL=sqlite:////tmp/arcade-scale.db \\
+        python -m src.tools.seed_scores --players 100000 --scores 1000000
+
+Game types are skewed by ``--skew`` (``snake=5,memory=2,...``), per-player
+activity follows a Zipf distribution (``--zipf``) and timestamps are spread
+over the last ``--months`` months.
+"""
+import argparse
+import itertools
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, text
+
+GAME_TYPES = ['number_guess', 'rps', 'tictactoe', 'memory', 'snake']
+
+# Relative share of scores per game type
+DEFAULT_SKEW = {
+    'number_guess': 3,
+    'rps': 4,
+    'tictactoe': 2,
+    'memory': 2,
+    'snake': 5
+}
+
+MEMORY_PAIRS = {'easy': 8, 'medium': 18, 'hard': 32}
+
+
+def parse_skew(value):
+    """Parse a ``game=weight,...`` string into a weight per game type"""
+    skew = dict(DEFAULT_SKEW)
+    if not value:
+        return skew
+    for part in value.split(','):
+        game_type, _, weight = part.partition('=')
+        game_type = game_type.strip()
+        if game_type not in GAME_TYPES:
+            raise argparse.ArgumentTypeError(f'Unknown game type: {game_type}')
+        skew[game_type] = float(weight)
+    return skew
+
+
+def random_result(game_type, rng):
+    """Return (points, attempts, difficulty) following the frontend scoring rules"""
+    if game_type == 'number_guess':
+        difficulty = rng.choice(('easy', 'medium', 'hard'))
+        attempts = rng.randint(1, 10)
+        if rng.random() < 0.8:
+            return max(1, 10 - attempts + 1), attempts, difficulty
+        return 0, 10, difficulty
+    if game_type == 'rps':
+        return (1 if rng.random() < 1 / 3 else 0), 1, 'normal'
+    if game_type == 'tictactoe':
+        roll = rng.random()
+        points = 3 if roll < 0.2 else (1 if roll < 0.6 else 0)
+        return points, 1, 'normal'
+    if game_type == 'memory':
+        difficulty = rng.choice(('easy', 'medium', 'hard'))
+        pairs = MEMORY_PAIRS[difficulty]
+        moves = rng.randint(pairs, pairs * 3)
+        return max(1, pairs * 3 - moves + 1), moves, difficulty
+    # snake: 10 points per food, long tail of good runs
+    return 10 * int(rng.expovariate(1 / 8)), 1, 'normal'
+
+
+def zipf_cum_weights(count, exponent, rng):
+    """Cumulative Zipf weights over ``count`` players in a shuffled rank order"""
+    ranks = list(range(1, count + 1))
+    rng.shuffle(ranks)
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in ranks))
+
+
+def seed_players(db, Player, count, prefix, start, end, rng, batch_size):
+    """Bulk insert ``count`` players and return [(id, created_at), ...]"""
+    span = (end - start).total_seconds()
+    table = Player.__table__
+    for offset in range(0, count, batch_size):
+        rows = []
+        for i in range(offset, min(offset + batch_size, count)):
+            rows.append({
+                'name': f'{prefix}{i:08d}',
+                'password': 'seeded',
+                'created_at': start + timedelta(seconds=rng.random() * span)
+            })
+        db.session.execute(insert(table), rows)
+        db.session.commit()
+
+    return db.session.execute(
+        select(Player.id, Player.created_at)
+        .where(Player.name.like(f'{prefix}%'))
+        .order_by(Player.id)
+    ).all()
+
+
+def seed_scores(db, GameScore, players, count, skew, exponent, end, rng, batch_size,
+                progress=None):
+    """Bulk insert ``count`` scores spread over ``players`` (into each
+    game's database when game_score is sharded)"""
+    from src import score_shards
+
+    table = GameScore.__table__
+    games = list(skew)
+    game_cum = list(itertools.accumulate(skew[g] for g in games))
+    player_cum = zipf_cum_weights(len(players), exponent, rng)
+
+    inserted = 0
+    while inserted < count:
+        size = min(batch_size, count - inserted)
+        picked_players = rng.choices(players, cum_weights=player_cum, k=size)
+        picked_games = rng.choices(games, cum_weights=game_cum, k=size)
+        rows = {game_type: [] for game_type in games}
+        for (player_id, joined), game_type in zip(picked_players, picked_games):
+            points, attempts, difficulty = random_result(game_type, rng)
+            active = (end - joined).total_seconds()
+            rows[game_type].append({
+                'player_id': player_id,
+                'game_type': game_type,
+                'points': points,
+                'attempts': attempts,
+                'difficulty': difficulty,
+                'created_at': joined + timedelta(seconds=rng.random() * active)
+            })
+        for game_type, game_rows in rows.items():
+            if game_rows:
+                score_shards.execute(insert(table), game_type, params=game_rows)
+        db.session.commit()
+        inserted += size
+        if progress:
+            progress(inserted)
+    return inserted
+
+
+def seed(app, players, scores, skew=None, exponent=1.1, months=6, prefix='bot',
+         batch_size=20000, random_seed=None, reset=False, progress=None):
+    """Populate the app database and return (player_count, score_count)"""
+    from src import cache_bus, score_shards
+    from src.models.user import db, Player, GameScore
+
+    rng = random.Random(random_seed)
+    end = datetime.utcnow()
+    start = end - timedelta(days=30 * months)
+
+    with app.app_context():
+        if reset:
+            db.drop_all()
+        db.create_all()
+        score_shards.create_tables(drop=reset)
+        if db.engine.dialect.name == 'sqlite':
+            # Bulk loading only; the database is disposable if the process dies
+            db.session.execute(text('PRAGMA synchronous=OFF'))
+
+        player_rows = seed_players(db, Player, players, prefix, start, end, rng, batch_size)
+        player_rows = [(row.id, row.created_at) for row in player_rows]
+        if not player_rows:
+            return 0, 0
+        inserted = seed_scores(db, GameScore, player_rows, scores, skew or DEFAULT_SKEW,
+                               exponent, end, rng, batch_size, progress)
+        # A running app on this host picks the new rows up right away
+        cache_bus.bump('players', 'scores')
+    return len(player_rows), inserted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=10000)
+    parser.add_argument('--scores', type=int, default=1000000)
+    parser.add_argument('--skew', type=parse_skew, default=None,
+                        help='relative weight per game type, e.g. snake=5,memory=2')
+    parser.add_argument('--zipf', type=float, default=1.1,
+                        help='Zipf exponent for per-player activity')
+    parser.add_argument('--months', type=int, default=6,
+                        help='spread timestamps over this many months')
+    parser.add_argument('--prefix', default='bot', help='player name prefix')
+    parser.add_argument('--batch-size', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=None, help='random seed')
+    parser.add_argument('--reset', action='store_true',
+                        help='drop and recreate all tables first')
+    args = parser.parse_args(argv)
+
+    from src.main import create_app
+
+    app = create_app()
+    started = time.perf_counter()
+
+    def progress(done):
+        elapsed = time.perf_counter() - started
+        print(f'\r{done:,} scores ({done / elapsed:,.0f} rows/s)', end='', file=sys.stderr)
+
+    players, scores = seed(app, args.players, args.scores, args.skew, args.zipf,
+                           args.months, args.prefix, args.batch_size, args.seed,
+                           args.reset, progress)
+    elapsed = time.perf_counter() - started
+    print(f'\nSeeded {players:,} players and {scores:,} scores in {elapsed:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
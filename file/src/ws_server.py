@@ -0,0 +1,153 @@
+"""Optional WebSocket game channel, served by asyncio next to the WSGI app.
+
+    python -m src.ws_server --port 5001
+
+(run from the ``file`` directory; needs the ``websockets`` package, 13 or
+newer). A logged-in browser opens one connection to ``/`` on that port (the
+Flask session cookie is read from the handshake, guests get a 401) and
+sends one JSON object per frame. Because the cookie alone would let any
+site's page connect as the player, handshakes whose Origin is not this
+host (on any port) or one of ``--allowed-origin`` (WS_ALLOWED_ORIGINS,
+comma separated) get a 403::
+
+    {"id": 7, "action": "memory.flip", "game_id": "...", "card_index": 12}
+
+The reply echoes ``id`` and carries either ``result`` (exactly what the HTTP
+endpoint would return) or ``error`` and ``status``. The actions are the
+ones listed in src/game_actions.py, shared with /api/games/batch.
+
+Games live in this process's own GameStore, so a game started over the
+socket is played over the socket. Engine calls are synchronous and run on
+the event loop, which makes each one atomic without locks; recording a
+finished game's score goes to a worker thread so the database never blocks
+the loop.
+"""
+import argparse
+import asyncio
+import http.cookies
+import json
+import os
+from urllib.parse import urlsplit
+
+from itsdangerous import BadSignature
+from src.game_actions import get_action
+from src.game_engine import GameError
+from src.game_store import GameStore
+
+# Frames are small game actions; anything bigger is a misbehaving client
+MAX_MESSAGE_SIZE = 4096
+
+
+def session_player(app, headers):
+    """player_id from the Flask session cookie in the handshake, or None"""
+    cookie = http.cookies.SimpleCookie(headers.get('Cookie', ''))
+    morsel = cookie.get(app.config['SESSION_COOKIE_NAME'])
+    if morsel is None:
+        return None
+    serializer = app.session_interface.get_signing_serializer(app)
+    try:
+        data = serializer.loads(morsel.value,
+                                max_age=int(app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return None
+    return data.get('player_id')
+
+
+def origin_allowed(headers, allowed=()):
+    """Whether the handshake comes from a page of this host (any port) or
+    of an ``allowed`` origin; clients sending no Origin are not browsers,
+    which always send it"""
+    origin = headers.get('Origin')
+    if origin is None or origin in allowed:
+        return True
+    host = urlsplit('//' + headers.get('Host', '')).hostname
+    return host is not None and urlsplit(origin).hostname == host
+
+
+class GameChannel:
+    """Connection handler dispatching framed actions to the game engine"""
+
+    def __init__(self, app, store=None, allowed_origins=()):
+        self.app = app
+        self.store = store if store is not None else GameStore()
+        self.allowed_origins = set(allowed_origins)
+
+    def _record(self, player_id, game_type, result):
+        from src.scores import record_for
+
+        with self.app.app_context():
+            return record_for(player_id, game_type, result)
+
+    async def dispatch(self, player_id, message):
+        game_type, result, score = get_action(message.get('action'))(self.store, message)
+        if score is not None:
+            try:
+                result['standing'] = await asyncio.to_thread(
+                    self._record, player_id, game_type, score)
+            except Exception:
+                self.app.logger.exception('recording a %s score failed', game_type)
+                raise GameError('Could not record the score', 500)
+        return result
+
+    async def handle(self, connection):
+        player_id = connection.request.player_id
+        async for frame in connection:
+            message = {}
+            try:
+                message = json.loads(frame)
+                reply = {'id': message.get('id')}
+                reply['result'] = await self.dispatch(player_id, message)
+            except GameError as e:
+                reply = {'id': message.get('id'), 'error': e.message, 'status': e.status}
+            except (ValueError, AttributeError, TypeError, KeyError, IndexError):
+                reply = {'id': message.get('id') if isinstance(message, dict) else None,
+                         'error': 'Malformed action', 'status': 400}
+            except Exception:
+                # Keep the connection; the player's other games are fine
+                self.app.logger.exception('websocket action failed')
+                reply = {'id': message.get('id') if isinstance(message, dict) else None,
+                         'error': 'Internal error', 'status': 500}
+            await connection.send(json.dumps(reply, separators=(',', ':')))
+
+    def authenticate(self, connection, request):
+        """Handshake hook: refuse other sites' pages and guests"""
+        if not origin_allowed(request.headers, self.allowed_origins):
+            return connection.respond(http.HTTPStatus.FORBIDDEN, 'Origin not allowed\n')
+        request.player_id = session_player(self.app, request.headers)
+        if request.player_id is None:
+            return connection.respond(http.HTTPStatus.UNAUTHORIZED, 'Not logged in\n')
+        return None
+
+
+async def serve_forever(app, host, port, ready=None, allowed_origins=()):
+    from websockets.asyncio.server import serve
+
+    channel = GameChannel(app, allowed_origins=allowed_origins)
+    async with serve(channel.handle, host, port, process_request=channel.authenticate,
+                     compression=None, max_size=MAX_MESSAGE_SIZE):
+        if ready is not None:
+            ready.set()
+        await asyncio.Future()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='WebSocket game channel')
+    parser.add_argument('--host', default=os.environ.get('WS_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('WS_PORT', 5001)))
+    parser.add_argument('--allowed-origin', action='append', dest='allowed_origins',
+                        default=[o for o in os.environ.get('WS_ALLOWED_ORIGINS', '').split(',') if o],
+                        help='page origin allowed besides this host, e.g. https://arcade.example')
+    args = parser.parse_args(argv)
+
+    try:
+        import websockets  # noqa: F401
+    except ImportError:
+        parser.exit(1, 'The WebSocket channel needs the websockets package\n')
+
+    from src.main import create_app
+    asyncio.run(serve_forever(create_app(), args.host, args.port,
+                              allowed_origins=args.allowed_origins))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Production WSGI entry point.
+
+    gunicorn -c gunicorn.conf.py src.wsgi:app
+
+(run from the ``file`` directory). With ``preload_app`` the app is built
+once in the gunicorn master and shared copy-on-write by the workers; see
+gunicorn.conf.py for the fork hooks.
+"""
+from src.main import create_app
+
+
+def warm_caches(app):
+    """Fill lazily built state before workers are forked.
+
+    Every extension in ``app.extensions`` with a ``warm()`` is asked to
+    populate itself: the player name index, score distributions, the live
+    leaderboard and (with ANALYTICS_CACHE) the analytics columns. Workers
+    then start from the master's copy, shared copy-on-write, and only catch
+    up with what changed since, instead of each loading it on its first
+    request. A cache that fails to warm is left to load lazily.
+    """
+    from sqlalchemy.orm import configure_mappers
+
+    configure_mappers()
+    with app.app_context():
+        for name, extension in list(app.extensions.items()):
+            warm = getattr(extension, 'warm', None)
+            if callable(warm):
+                try:
+                    warm()
+                except Exception:
+                    app.logger.exception('warming %s failed', name)
+
+
+def reset_after_fork(app):
+    """Drop connections inherited from the master; each worker opens its own"""
+    from src.models.user import db
+
+    with app.app_context():
+        # Every bind (replica, score shards), not just the primary: warm()
+        # opens shard connections too. close=False leaves the parent's
+        # sockets alone and just forgets them
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+app = create_app()